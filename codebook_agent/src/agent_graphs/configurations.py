@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, fields
-from typing import Optional
+from typing import Dict, Optional
 
 from langchain_core.runnables import RunnableConfig
 
@@ -13,6 +13,22 @@ class ExtractorConfiguration:
 
     model_name: str = "gpt-4o-mini"
     test_mode: bool = False
+    parser_backend: str = "html.parser"
+    table_format: str = "pretty"
+    extraction_workers: int = 0
+    # Re-fetch the codebook of an existing collection and re-embed only the changed sections
+    refresh: bool = False
+    # Workers per ingest pipeline stage, e.g. {"embed": 8}; unset stages keep their defaults
+    stage_workers: Optional[Dict[str, int]] = None
+    # "structure" (token-bounded, tables kept whole) or "character" (fixed-size splitter)
+    chunker: str = "structure"
+    # Upsert batches in flight; with upsert_wait off, Qdrant applies them asynchronously
+    # and the ingest ends with one waiting upsert as a barrier
+    upsert_in_flight: int = 4
+    upsert_wait: bool = True
+    # Storage layout of new collections: "ram", "balanced" (int8 in RAM, originals on
+    # disk) or "disk"; see qdrant_wrapper.collection_profiles
+    collection_profile: str = "ram"
 
     
     @classmethod
@@ -30,6 +46,10 @@ class QuerierConfiguration:
 
     model_name: str = "gpt-4o-mini"
     test_mode: bool = False
+    # Dimensional standards parsed at ingest below this confidence are asked of the LLM
+    standards_min_confidence: float = 0.8
+    # Add the sections cited by retrieved sections ("see § 154.032") to the context
+    expand_references: bool = False
 
     
     @classmethod
@@ -14,7 +14,18 @@ import json, re
 from langsmith import traceable
 # Import your existing helper functions
 from src.utils.alp_scraper import scrape_html_from_alp
-from src.utils.codebook_helpers import extract_table_of_contents, get_section_content
+from src.utils.codebook_helpers import (
+    extract_table_of_contents,
+    get_section_content,
+    get_codebook_index,
+    cache_codebook_html,
+    load_cached_codebook_html,
+    cached_codebook_path,
+)
+from src.utils.zone_codes import document_zone_codes
+from src.utils.permitted_uses import PermittedUseStore, extract_permitted_use_triples
+from src.utils.dimensional_standards import DimensionalStandardStore, extract_dimensional_standards
+from src.utils.corpus_store import CorpusStore, codebook_version
 from agent_graphs.configurations import ExtractorConfiguration
 from qdrant_wrapper.qdrant_base import DocumentStatus
 from qdrant_wrapper.qdrant_ingestor import QdrantIngestor
@@ -70,8 +81,9 @@ def init_state(state: ExtractorState, config: RunnableConfig) -> ExtractorState:
         "document_id": document_id
     }
 
-async def router_func(state: ExtractorState) -> Literal["get_codebook_alp", "final_node"]:
+async def router_func(state: ExtractorState, config: RunnableConfig) -> Literal["get_codebook_alp", "final_node"]:
     """Find the codebook for the given municipality and state."""
+    configuration = get_config(config)
     qclient = QdrantBase()
     if not state["document_id"]:
         raise ValueError("Missing required keys: document_id")
@@ -79,11 +91,16 @@ async def router_func(state: ExtractorState) -> Literal["get_codebook_alp", "fin
         codebook_exists = await qclient.document_exists_and_is_indexed(state["document_id"])
     except Exception as e:
         raise Exception(f"Error checking if document exists and is indexed: {e}")
+    if configuration.refresh and codebook_exists is not DocumentStatus.NOT_EXISTS:
+        return "get_codebook_alp"
     if codebook_exists is DocumentStatus.INDEXED:
         return "final_node"
-    elif codebook_exists is DocumentStatus.UDC:
-        return "final_node"
-    elif codebook_exists is DocumentStatus.EMPTY:
+    elif codebook_exists in (DocumentStatus.UDC, DocumentStatus.EMPTY):
+        # A small codebook is finished as it is; only an ingest the manifest shows as
+        # interrupted is resumed (point IDs are deterministic, so only missing chunks
+        # are ingested)
+        if qclient.ingest_unfinished(state["document_id"]):
+            return "get_codebook_alp"
         return "final_node"
     elif codebook_exists is DocumentStatus.NOT_EXISTS:
         print("NOT EXISTS NOT EXISTS NOT EXISTS")
@@ -96,8 +113,14 @@ async def get_codebook_alp(state: ExtractorState, config: RunnableConfig) -> Ext
     """Retrieve the HTML document from S3 or by scraping if not available in S3."""
     configuration = get_config(config)
     document_id = state["document_id"]
+    # A refresh is looking for a newer version than the cached one
+    document_content = None if configuration.refresh else load_cached_codebook_html(document_id)
+    if document_content is not None:
+        print("Loaded HTML document from local cache")
+        return {**state, "document_content": document_content}
     document_content = fetch_from_s3(document_id)
     if document_content is not None:
+        cache_codebook_html(document_id, document_content)
         return {**state, "document_content": document_content}
     try:
         html_url = scrape_html_from_alp(state["municipality"], state["state_code"])
@@ -106,6 +129,7 @@ async def get_codebook_alp(state: ExtractorState, config: RunnableConfig) -> Ext
         
         print("Successfully scraped HTML document directly")
         document_content = response.text
+        cache_codebook_html(document_id, document_content)
         return {**state, "document_content": document_content}
     except Exception as e:
         print(f"Error scraping document directly: {e}")
@@ -117,11 +141,12 @@ async def get_codebook_alp(state: ExtractorState, config: RunnableConfig) -> Ext
 async def get_section_names_alp(state: ExtractorState, config: RunnableConfig) -> ExtractorState:
     """Get the list of relevant sections by identifying the most relevant chapter."""
     configuration = get_config(config)
-    document_content = state["document_content"]
+    # Parse the document once; both TOC lookups below share the same index
+    codebook_index = get_codebook_index(state["document_content"], configuration.parser_backend)
     
     # Extract titles and chapters
     hierarchy = extract_table_of_contents(
-        html_content=document_content,
+        html_content=codebook_index,
         hierarchy_depth="titles_and_chapters"
     )
     llm = ChatOpenAI(model=configuration.model_name, temperature=0)
@@ -157,7 +182,7 @@ async def get_section_names_alp(state: ExtractorState, config: RunnableConfig) -
     
     # Get sections from selected chapter
     section_list = extract_table_of_contents(
-        html_content=document_content,
+        html_content=codebook_index,
         target_chapter=chapter_number  
     )
     
@@ -166,10 +191,42 @@ async def get_section_names_alp(state: ExtractorState, config: RunnableConfig) -
 
 async def chunk_alp(state: ExtractorState, config: RunnableConfig) -> ExtractorState:
     """Chunk the sections and ingest them into Qdrant."""
-    ingestor = QdrantIngestor(state["document_id"], state["document_content"])
-    await ingestor.create_empty_codebook()
+    # Sections are looked up in the index built during section selection, not re-parsed
+    configuration = get_config(config)
+    codebook_index = get_codebook_index(state["document_content"], configuration.parser_backend)
+    with PermittedUseStore() as store:
+        store.replace_document(state["document_id"], extract_permitted_use_triples(codebook_index))
+    with DimensionalStandardStore() as store:
+        store.replace_document(state["document_id"], extract_dimensional_standards(codebook_index))
     sections = state["section_list"]
-    await ingestor.process_all_sections(sections, get_section_content)
+    # Extracted sections are kept in the corpus store, so re-ingesting this version of the
+    # codebook (or rechunking it later) reads them instead of parsing the HTML again
+    with CorpusStore() as corpus:
+        ingestor = QdrantIngestor(
+            state["document_id"],
+            codebook_index,
+            table_format=configuration.table_format,
+            extraction_workers=configuration.extraction_workers,
+            document_path=cached_codebook_path(state["document_id"]),
+            zone_codes=document_zone_codes(codebook_index.soup, [state.get("zone_code")]),
+            corpus_document=corpus.document(
+                state["document_id"], codebook_version(codebook_index.document_hash), configuration.table_format
+            ),
+            stage_workers=configuration.stage_workers,
+            chunker=configuration.chunker,
+            upsert_in_flight=configuration.upsert_in_flight,
+            upsert_wait=configuration.upsert_wait,
+            collection_profile=configuration.collection_profile,
+            # Resumes an interrupted ingest; a new collection has nothing to skip
+            skip_existing=not configuration.refresh
+        )
+        if not await ingestor.async_client.collection_exists(collection_name=ingestor.collection_name):
+            await ingestor.create_empty_codebook()
+        elif configuration.refresh:
+            # A new version of an ingested codebook: only changed sections are re-embedded
+            await ingestor.sync_sections(sections, get_section_content)
+            return state
+        await ingestor.process_all_sections(sections, get_section_content)
     return state
 
 async def final_node(state: ExtractorState, config: RunnableConfig) -> ExtractorState:
@@ -17,6 +17,8 @@ from agent_graphs.queries import (
 )
 
 from agent_graphs.models import Answer
+from src.utils.permitted_uses import PermittedUseStore, permitted_uses_answer
+from src.utils.dimensional_standards import DimensionalStandardStore, standard_answer
 from agent_graphs.configurations import QuerierConfiguration
 from qdrant_wrapper.qdrant_retriever import QdrantRetriever
 
@@ -39,6 +41,30 @@ def get_config(config: RunnableConfig) -> QuerierConfiguration:
     """Get the full configuration object."""
     return QuerierConfiguration.from_runnable_config(config)
 
+async def answer_standards_queries(document_id: str, zone_code: str, queries: Dict[str, str],
+                                  configs: QuerierConfiguration) -> Dict[str, Any]:
+    """
+    Answer dimensional-standards queries from the standards parsed at ingest.
+
+    Only the queries without a confident standard are sent to the LLM, in parallel,
+    and the retriever is only connected when there are any.
+    """
+    with DimensionalStandardStore() as store:
+        standards = store.lookup(document_id, zone_code, list(queries))
+    results = {
+        query_var: standard_answer(standard)
+        for query_var, standard in standards.items()
+        if standard["confidence"] >= configs.standards_min_confidence
+    }
+    remaining = [query_var for query_var in queries if query_var not in results]
+    if remaining:
+        retriever = QdrantRetriever(document_id=document_id, expand_references=configs.expand_references)
+        await retriever.initialize()
+        questions = [queries[query_var] for query_var in remaining]
+        raw_results = await retriever.execute_queries_in_parallel(questions, Answer, zone_code=zone_code)
+        results.update(zip(remaining, raw_results))
+    return {query_var: results[query_var] for query_var in queries}
+
 def init_state(state: QuerierState, config: RunnableConfig) -> QuerierState:
     if "document_id" not in state.keys():
         raise ValueError("Missing required key: document_id")
@@ -53,6 +79,7 @@ async def building_requirements_node(state: QuerierState, config: RunnableConfig
     """Query building requirements from the municipal code."""
     document_id = state["document_id"]
     zone_code = state["zone_code"]  
+    configs = get_config(config)
    
     # Create a dictionary mapping query types to their queries
     queries = {
@@ -60,19 +87,7 @@ async def building_requirements_node(state: QuerierState, config: RunnableConfig
         "maximum_lot_coverage": format_query(BUILDING_REQUIREMENTS_QUERIES["maximum_lot_coverage"], zone_code=zone_code)
     }
     
-    retriever = QdrantRetriever(document_id=document_id)
-    await retriever.initialize()
-
-    # Get the questions list and keep track of which index corresponds to which query type
-    questions = list(queries.values())
-    query_vars = list(queries.keys())
-    
-    # Execute queries in parallel as before
-    raw_results = await retriever.execute_queries_in_parallel(questions, Answer)    
-    results = {
-        query_var: raw_results[i] 
-        for i, query_var in enumerate(query_vars)
-    }
+    results = await answer_standards_queries(document_id, zone_code, queries, configs)
     return {
         "results": {
             "building_requirements": results
@@ -83,6 +98,7 @@ async def parking_node(state: QuerierState, config: RunnableConfig) -> Dict[str,
     """Query parking requirements from the municipal code."""
     document_id = state["document_id"]
     zone_code = state["zone_code"]  
+    configs = get_config(config)
    
     queries = {
         "aisle_width": format_query(PARKING_QUERIES["aisle_width"], zone_code=zone_code),
@@ -92,7 +108,7 @@ async def parking_node(state: QuerierState, config: RunnableConfig) -> Dict[str,
         "parking_stalls": format_query(PARKING_QUERIES["parking_stalls"], zone_code=zone_code)
     }
     
-    retriever = QdrantRetriever(document_id=document_id)
+    retriever = QdrantRetriever(document_id=document_id, expand_references=configs.expand_references)
     await retriever.initialize()
 
     # Get the questions list and keep track of which index corresponds to which query type
@@ -114,6 +130,7 @@ async def signs_node(state: Dict[str, Any], config: RunnableConfig) -> Dict[str,
     """Query signage requirements from the municipal code."""
     document_id = state["document_id"]
     zone_code = state["zone_code"]  
+    configs = get_config(config)
    
     # Create a dictionary mapping query types to their queries
     queries = {
@@ -122,7 +139,7 @@ async def signs_node(state: Dict[str, Any], config: RunnableConfig) -> Dict[str,
         "design_requirements": format_query(SIGNAGE_QUERIES["design_requirements"], zone_code=zone_code)
     }
     
-    retriever = QdrantRetriever(document_id=document_id)
+    retriever = QdrantRetriever(document_id=document_id, expand_references=configs.expand_references)
     await retriever.initialize()
 
     # Get the questions list and keep track of which index corresponds to which query type
@@ -145,6 +162,7 @@ async def lot_requirements_node(state: Dict[str, Any], config: RunnableConfig) -
     """Query lot requirements from the municipal code."""
     document_id = state["document_id"]
     zone_code = state["zone_code"]
+    configs = get_config(config)
     
     queries = {
         "density": format_query(LOT_REQUIREMENTS_QUERIES["density"], zone_code=zone_code),
@@ -154,17 +172,7 @@ async def lot_requirements_node(state: Dict[str, Any], config: RunnableConfig) -
         "living_area": format_query(LOT_REQUIREMENTS_QUERIES["living_area"], zone_code=zone_code)
     }   
     
-    # Create a new retriever instance for this node
-    retriever = QdrantRetriever(document_id=document_id)
-    await retriever.initialize()
-    questions = list(queries.values())
-    query_vars = list(queries.keys())
-    
-    raw_results = await retriever.execute_queries_in_parallel(questions, Answer)    
-    results = {
-        query_var: raw_results[i] 
-        for i, query_var in enumerate(query_vars)
-    }
+    results = await answer_standards_queries(document_id, zone_code, queries, configs)
     return {
         "results": {
             "lot_requirements": results
@@ -175,10 +183,7 @@ async def building_placement_node(state: Dict[str, Any], config: RunnableConfig)
     """Query building placement requirements from the municipal code."""
     document_id = state["document_id"]
     zone_code = state["zone_code"]
-    
-    # Create a new retriever instance for this node
-    retriever = QdrantRetriever(document_id=document_id)
-    await retriever.initialize()
+    configs = get_config(config)
 
     queries = {
         "front_setback": format_query(BUILDING_PLACEMENT_QUERIES["front_setback"], zone_code=zone_code),
@@ -188,14 +193,7 @@ async def building_placement_node(state: Dict[str, Any], config: RunnableConfig)
         "accessory_building_setback": format_query(BUILDING_PLACEMENT_QUERIES["accessory_building_setback"], zone_code=zone_code)
     }
 
-    questions = list(queries.values())
-    query_vars = list(queries.keys())
-    
-    raw_results = await retriever.execute_queries_in_parallel(questions, Answer)    
-    results = {
-        query_var: raw_results[i] 
-        for i, query_var in enumerate(query_vars)
-    }
+    results = await answer_standards_queries(document_id, zone_code, queries, configs)
     return {
         "results": {
             "building_placement_requirements": results
@@ -206,9 +204,10 @@ async def landscaping_requirements_node(state: Dict[str, Any], config: RunnableC
     """Query landscaping requirements from the municipal code."""
     document_id = state["document_id"]
     zone_code = state["zone_code"]
+    configs = get_config(config)
     
     # Create a new retriever instance for this node
-    retriever = QdrantRetriever(document_id=document_id)
+    retriever = QdrantRetriever(document_id=document_id, expand_references=configs.expand_references)
     await retriever.initialize()
     
     queries = {
@@ -238,8 +237,19 @@ async def permitted_uses_node(state: QuerierState, config: RunnableConfig) -> Qu
     document_id = state["document_id"]
     zone_code = state["zone_code"]
     configs = get_config(config)
+    # Use tables parsed at ingest answer directly; the LLM only reads the codebook
+    # when no use table has a column for the zone
+    with PermittedUseStore() as store:
+        rows = store.lookup(document_id, zone_code)
+    if rows:
+        return {
+            "results": {
+                "permitted_uses": permitted_uses_answer(rows, zone_code)
+            }
+        }
+
     # Create a new retriever instance for this node
-    retriever = QdrantRetriever(document_id=document_id)
+    retriever = QdrantRetriever(document_id=document_id, expand_references=configs.expand_references)
     await retriever.initialize()
     
     queries = {
@@ -267,7 +277,7 @@ async def permitted_uses_node(state: QuerierState, config: RunnableConfig) -> Qu
     
     questions = list(queries.values())
     
-    raw_results = await retriever.send_query(questions[0], Answer, custom_assistant_prompt)
+    raw_results = await retriever.send_query(questions[0], Answer, custom_assistant_prompt, zone_code=zone_code)
     results = raw_results
     
     return {
@@ -299,7 +309,7 @@ def create_graph() -> StateGraph:
     querier_graph.add_node("building_placement_node", building_placement_node)
     querier_graph.add_node("landscaping_requirements_node", landscaping_requirements_node)
     querier_graph.add_node("combine_results_node", combine_results_node)
-    # querier_graph.add_node("permitted_uses_node", permitted_uses_node)
+    querier_graph.add_node("permitted_uses_node", permitted_uses_node)
     # Add edges
     querier_graph.add_edge(START, "init_state_node")    
     querier_graph.add_edge("init_state_node", "building_requirements_node")
@@ -308,7 +318,7 @@ def create_graph() -> StateGraph:
     querier_graph.add_edge("init_state_node", "lot_requirements_node")
     querier_graph.add_edge("init_state_node", "building_placement_node")
     querier_graph.add_edge("init_state_node", "landscaping_requirements_node")
-    # querier_graph.add_edge("init_state_node", "permitted_uses_node")
+    querier_graph.add_edge("init_state_node", "permitted_uses_node")
 
     querier_graph.add_edge("building_requirements_node", "combine_results_node")
     querier_graph.add_edge("parking_node", "combine_results_node")
@@ -316,7 +326,7 @@ def create_graph() -> StateGraph:
     querier_graph.add_edge("lot_requirements_node", "combine_results_node")
     querier_graph.add_edge("building_placement_node", "combine_results_node")
     querier_graph.add_edge("landscaping_requirements_node", "combine_results_node")
-    # querier_graph.add_edge("permitted_uses_node", "combine_results_node")
+    querier_graph.add_edge("permitted_uses_node", "combine_results_node")
     querier_graph.add_edge("combine_results_node", END)
     return querier_graph.compile()
 
@@ -0,0 +1,158 @@
+"""
+Chunk count, table integrity and section recall of the ingest chunkers.
+
+Every section of each codebook is chunked by the structure-aware chunker and by the
+character splitter it replaced. For each chunker the report gives the number of chunks,
+their mean and largest size in embedding tokens, the tables spread over more than one
+chunk, and the chunks holding table rows without the table's header. With --recall,
+every question of building_requirements_dataset_json whose codebook was loaded is
+embedded and matched against the chunks of its codebook, and the share of its
+reference sections among the top --k chunks is reported (calls the OpenAI embeddings
+API; vectors go through the local embedding cache).
+
+Codebooks come from HTML files given on the command line, from the local cache with
+--dataset, or from a generated codebook with --synthetic N.
+Usage: python -m src.evals.chunking_benchmark [path/to/codebook.html ...] [--dataset] [--synthetic 2000] [--recall]
+"""
+import argparse
+import asyncio
+
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_openai import OpenAIEmbeddings
+
+from qdrant_wrapper.qdrant_ingestor import CHUNK_OVERLAP, CHUNK_SIZE, SEPARATOR
+from src.datasets.building_requirements import building_requirements_dataset_json
+from src.evals.synthetic_codebook import generate_codebook
+from src.evals.table_format_benchmark import load_indexes
+from src.utils.chunking import StructuredChunker, token_length
+from src.utils.codebook_helpers import DEFAULT_TABLE_FORMAT, TABLE_FORMATS, get_codebook_index
+from src.utils.embedding_cache import CachedEmbeddings
+
+RECALL_K = 5
+EMBEDDING_BATCH_SIZE = 256
+
+
+def make_chunkers(table_format):
+    """Return the chunkers to compare, keyed by their QdrantIngestor name."""
+    return {
+        "structure": StructuredChunker(table_format),
+        "character": RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, separators=[SEPARATOR], keep_separator=False
+        )
+    }
+
+
+def section_chunks_by_chunker(index, table_format, chunkers):
+    """Return {chunker name: [(section number, chunk text), ...]} for every section of a codebook."""
+    chunks = {name: [] for name in chunkers}
+    for entry in index.section_entries:
+        number = f"{entry['chapter_number']}.{entry['section_number']}"
+        text = index.section_text(entry["element"], table_format)
+        for name, chunker in chunkers.items():
+            chunks[name].extend((number, chunk) for chunk in chunker.split_text(text))
+    return chunks
+
+
+def table_integrity(index, table_format, chunks):
+    """
+    Count split tables and orphaned rows in one chunker's chunks of a codebook.
+
+    Returns:
+        dict: {"tables", "split_tables", "orphan_chunks"}
+    """
+    parser = StructuredChunker(table_format)
+    by_section = {}
+    for number, chunk in chunks:
+        by_section.setdefault(number, []).append(chunk)
+    totals = {"tables": 0, "split_tables": 0, "orphan_chunks": 0}
+    for entry in index.section_entries:
+        number = f"{entry['chapter_number']}.{entry['section_number']}"
+        _, units = parser.section_units(index.section_text(entry["element"], table_format))
+        for unit in units:
+            if isinstance(unit, str) or not unit.rows:
+                continue
+            # The line with the column names
+            column_line = unit.header[1] if table_format == "pretty" else unit.header[0]
+            holding = [chunk for chunk in by_section.get(number, []) if any(row in chunk for row in unit.rows)]
+            totals["tables"] += 1
+            totals["split_tables"] += len(holding) > 1
+            totals["orphan_chunks"] += sum(1 for chunk in holding if column_line not in chunk)
+    return totals
+
+
+def _section_key(number):
+    # Dataset section lists drop trailing zeros ("153.04" for § 153.040)
+    chapter, _, section = str(number).partition(".")
+    return chapter, section.rstrip("0")
+
+
+async def section_recall(chunks_by_document, k=RECALL_K):
+    """
+    Embed the dataset questions and chunks and measure recall@k of the reference sections.
+
+    Args:
+        chunks_by_document: {document_id: [(section number, chunk text), ...]} of one chunker
+
+    Returns:
+        float: Mean recall over the questions whose codebook was chunked, or None
+    """
+    embeddings = CachedEmbeddings(OpenAIEmbeddings())
+    recalls = []
+    for document_id, chunks in chunks_by_document.items():
+        examples = [e for e in building_requirements_dataset_json if e["inputs"]["document_id"] == document_id]
+        if not examples or not chunks:
+            continue
+        vectors = []
+        texts = [text for _, text in chunks]
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            vectors.extend(await embeddings.aembed_documents(texts[start:start + EMBEDDING_BATCH_SIZE]))
+        matrix = np.array(vectors)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        for example in examples:
+            inputs = example["inputs"]
+            query = f"What is the {inputs['query_type'].replace('_', ' ')} in zone {inputs['zone_code']}?"
+            vector = np.array(await embeddings.aembed_query(query))
+            top = np.argsort(-(matrix @ (vector / np.linalg.norm(vector))))[:k]
+            retrieved = {_section_key(chunks[i][0]) for i in top}
+            expected = {_section_key(number) for number in example["outputs"]["section_list"]}
+            recalls.append(len(expected & retrieved) / len(expected))
+    print(f"Embedding cache: {embeddings.cache.stats()}")
+    return sum(recalls) / len(recalls) if recalls else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("html_paths", nargs="*", help="ALP HTML exports to chunk")
+    parser.add_argument("--dataset", action="store_true", help="Chunk the cached dataset codebooks")
+    parser.add_argument("--synthetic", type=int, default=0, help="Also chunk a generated codebook of this many sections")
+    parser.add_argument("--recall", action="store_true", help="Measure section recall on the dataset (calls the OpenAI API)")
+    parser.add_argument("--k", type=int, default=RECALL_K)
+    parser.add_argument("--format", default=DEFAULT_TABLE_FORMAT, choices=TABLE_FORMATS)
+    args = parser.parse_args()
+
+    indexes = load_indexes(args.html_paths, args.dataset or args.recall)
+    if args.synthetic:
+        indexes[f"synthetic-{args.synthetic}"] = get_codebook_index(generate_codebook(args.synthetic))
+    chunkers = make_chunkers(args.format)
+
+    chunks_by_chunker = {name: {} for name in chunkers}
+    for name, index in indexes.items():
+        print(f"\n{name}")
+        print(f"{'chunker':<12}{'chunks':>8}{'mean tok':>10}{'max tok':>9}{'tables':>8}{'split':>7}{'orphans':>9}")
+        for chunker_name, chunks in section_chunks_by_chunker(index, args.format, chunkers).items():
+            chunks_by_chunker[chunker_name][name] = chunks
+            sizes = [token_length(text) for _, text in chunks] or [0]
+            tables = table_integrity(index, args.format, chunks)
+            print(f"{chunker_name:<12}{len(chunks):>8}{sum(sizes) / len(sizes):>10.0f}{max(sizes):>9}"
+                  f"{tables['tables']:>8}{tables['split_tables']:>7}{tables['orphan_chunks']:>9}")
+
+    if args.recall:
+        print(f"\n{'chunker':<12}{f'recall@{args.k}':>10}")
+        for chunker_name, chunks_by_document in chunks_by_chunker.items():
+            recall = asyncio.run(section_recall(chunks_by_document, args.k))
+            print(f"{chunker_name:<12}{'n/a' if recall is None else f'{recall:.3f}':>10}")
+
+
+if __name__ == "__main__":
+    main()
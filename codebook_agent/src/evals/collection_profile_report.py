@@ -0,0 +1,139 @@
+"""
+Recall and memory of each collection profile on the eval dataset.
+
+For every document of building_requirements_dataset_json that is indexed on the
+configured Qdrant server, its points (vectors included) are copied into a temporary
+collection per profile of COLLECTION_PROFILES. Each dataset question of the document is
+then embedded and searched in every copy. The report gives per profile:
+
+  - recall@k against an exact (brute-force) search of the original collection
+  - recall@k of the question's reference sections
+  - median search latency
+  - the estimated resident memory of the copies (CollectionProfile.memory_estimate)
+
+Temporary collections are deleted afterwards. Query embeddings go through the local
+embedding cache, so repeated runs only call the API for new questions.
+Usage: python -m src.evals.collection_profile_report [--k 5] [--profiles ram balanced disk]
+"""
+import argparse
+import statistics
+import time
+
+from qdrant_client.http.models import PointStruct, SearchParams
+
+from qdrant_wrapper.collection_profiles import COLLECTION_PROFILES, search_params_for
+from qdrant_wrapper.qdrant_base import QdrantBase
+from qdrant_wrapper.qdrant_ingestor import VECTOR_DISTANCE, VECTOR_SIZE
+from src.datasets.building_requirements import building_requirements_dataset_json
+
+RECALL_K = 5
+SCROLL_PAGE_SIZE = 256
+INDEXING_POLL_SECONDS = 1
+INDEXING_TIMEOUT_SECONDS = 600
+
+
+def _section_key(number):
+    # Dataset section lists drop trailing zeros ("153.04" for § 153.040)
+    chapter, _, section = str(number).partition(".")
+    return chapter, section.rstrip("0")
+
+
+def _format(value, spec):
+    return "n/a" if value is None else format(value, spec)
+
+
+def copy_collection(client, source, target, profile):
+    """Create target with a profile's config, copy every point of source into it and wait for indexing."""
+    if client.collection_exists(target):
+        client.delete_collection(target)
+    client.create_collection(target, **profile.collection_config(VECTOR_SIZE, VECTOR_DISTANCE))
+    offset = None
+    count = 0
+    while True:
+        points, offset = client.scroll(source, limit=SCROLL_PAGE_SIZE, offset=offset, with_payload=True, with_vectors=True)
+        if points:
+            client.upsert(target, points=[PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points])
+            count += len(points)
+        if offset is None:
+            break
+    deadline = time.time() + INDEXING_TIMEOUT_SECONDS
+    while client.get_collection(target).status != "green" and time.time() < deadline:
+        time.sleep(INDEXING_POLL_SECONDS)
+    return count
+
+
+def profile_report(profiles, k=RECALL_K):
+    """
+    Measure every profile on the dataset documents indexed on the server.
+
+    Returns:
+        dict: profile name -> {"exact_recall", "section_recall", "latency_ms", "memory_bytes", "points"}
+    """
+    base = QdrantBase()
+    client = base.client
+    results = {name: {"exact": [], "sections": [], "latency": [], "memory_bytes": 0, "points": 0} for name in profiles}
+    document_ids = sorted({example["inputs"]["document_id"] for example in building_requirements_dataset_json})
+    for document_id in document_ids:
+        if not client.collection_exists(document_id):
+            print(f"Skipping {document_id}: not indexed")
+            continue
+        examples = [e for e in building_requirements_dataset_json if e["inputs"]["document_id"] == document_id]
+        queries = [
+            base.embeddings.embed_query(
+                f"What is the {e['inputs']['query_type'].replace('_', ' ')} in zone {e['inputs']['zone_code']}?"
+            )
+            for e in examples
+        ]
+        exact = [
+            {str(p.id) for p in client.query_points(
+                document_id, query=vector, limit=k, search_params=SearchParams(exact=True)
+            ).points}
+            for vector in queries
+        ]
+        for name in profiles:
+            profile = COLLECTION_PROFILES[name]
+            target = f"{document_id}__profile_{name}"
+            try:
+                points = copy_collection(client, document_id, target, profile)
+                params = search_params_for(client.get_collection(target))
+                stats = results[name]
+                stats["points"] += points
+                stats["memory_bytes"] += profile.memory_estimate(points, VECTOR_SIZE)
+                for example, vector, expected_ids in zip(examples, queries, exact):
+                    start = time.perf_counter()
+                    hits = client.query_points(target, query=vector, limit=k, search_params=params, with_payload=True).points
+                    stats["latency"].append((time.perf_counter() - start) * 1000)
+                    stats["exact"].append(len(expected_ids & {str(hit.id) for hit in hits}) / max(len(expected_ids), 1))
+                    retrieved = {_section_key(f"{hit.payload['chapter_number']}.{hit.payload['section_number']}") for hit in hits}
+                    expected = {_section_key(number) for number in example["outputs"]["section_list"]}
+                    stats["sections"].append(len(expected & retrieved) / len(expected))
+            finally:
+                client.delete_collection(target)
+    print(f"Embedding cache: {base.embeddings.cache.stats()}")
+    return {
+        name: {
+            "exact_recall": statistics.mean(stats["exact"]) if stats["exact"] else None,
+            "section_recall": statistics.mean(stats["sections"]) if stats["sections"] else None,
+            "latency_ms": statistics.median(stats["latency"]) if stats["latency"] else None,
+            "memory_bytes": stats["memory_bytes"],
+            "points": stats["points"],
+        }
+        for name, stats in results.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--k", type=int, default=RECALL_K)
+    parser.add_argument("--profiles", nargs="+", default=list(COLLECTION_PROFILES), choices=list(COLLECTION_PROFILES))
+    args = parser.parse_args()
+
+    report = profile_report(args.profiles, args.k)
+    print(f"\n{'profile':<10}{'points':>9}{'memory MB':>11}{f'exact@{args.k}':>10}{f'sections@{args.k}':>13}{'p50 ms':>9}")
+    for name, row in report.items():
+        print(f"{name:<10}{row['points']:>9}{row['memory_bytes'] / 2 ** 20:>11.1f}{_format(row['exact_recall'], '.3f'):>10}"
+              f"{_format(row['section_recall'], '.3f'):>13}{_format(row['latency_ms'], '.2f'):>9}")
+
+
+if __name__ == "__main__":
+    main()
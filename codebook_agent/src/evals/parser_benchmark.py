@@ -0,0 +1,70 @@
+"""
+Time and memory benchmark for the codebook parser backends.
+
+Each backend runs in a fresh process so peak RSS reflects that backend alone.
+Usage: python -m src.evals.parser_benchmark path/to/codebook.html [more.html ...]
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+
+from src.utils.codebook_helpers import PARSER_BACKENDS, iter_section_records
+
+
+def _measure_backend(html_path, parser_backend, results):
+    """Consume every section record of a document and report wall time and peak RSS."""
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    with open(html_path, "rb") as f:
+        if parser_backend == "lxml-stream":
+            records = sum(1 for _ in iter_section_records(f, parser_backend))
+        else:
+            records = sum(1 for _ in iter_section_records(f.read(), parser_backend))
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put({
+        "backend": parser_backend,
+        "records": records,
+        "seconds": elapsed,
+        "peak_mb": (peak_kb - baseline_kb) / 1024,
+    })
+
+
+def benchmark_document(html_path, backends=PARSER_BACKENDS):
+    """
+    Benchmark all parser backends on one document.
+
+    Args:
+        html_path (str): Path to an ALP HTML export
+        backends (list): Parser backends to measure
+
+    Returns:
+        list: One {"backend", "records", "seconds", "peak_mb"} dict per backend
+    """
+    context = multiprocessing.get_context("spawn")
+    measurements = []
+    for parser_backend in backends:
+        results = context.Queue()
+        process = context.Process(target=_measure_backend, args=(html_path, parser_backend, results))
+        process.start()
+        measurements.append(results.get())
+        process.join()
+    return measurements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("html_paths", nargs="+", help="ALP HTML exports to parse")
+    parser.add_argument("--backends", nargs="+", default=PARSER_BACKENDS, choices=PARSER_BACKENDS)
+    args = parser.parse_args()
+
+    for html_path in args.html_paths:
+        print(f"\n{html_path}")
+        print(f"{'backend':<14}{'records':>10}{'seconds':>12}{'peak MB':>12}")
+        for row in benchmark_document(html_path, args.backends):
+            print(f"{row['backend']:<14}{row['records']:>10}{row['seconds']:>12.2f}{row['peak_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
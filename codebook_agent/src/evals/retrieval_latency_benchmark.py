@@ -0,0 +1,157 @@
+"""
+Latency of section-filtered scrolls, before and after payload indexing.
+
+SectionBasedRetrieval and get_chunks_by_section fetch a section's chunks with a scroll
+filtered on chapter_number and section_number. This times those scrolls (and a zone
+filtered search) on the configured Qdrant server (QDRANT_URL):
+
+  - on existing collections given on the command line, as they are; with --migrate the
+    missing PAYLOAD_INDEXES are then created and the collections timed again
+  - with --synthetic N, on a temporary collection of N random points, without indexes
+    and then with them; the collection is deleted afterwards
+
+Usage: python -m src.evals.retrieval_latency_benchmark [collection ...] [--migrate] [--synthetic 50000]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from qdrant_wrapper.qdrant_base import QdrantBase
+from qdrant_wrapper.rag_strategies import SECTION_RETRIEVAL_LIMIT, section_filter, zone_filter
+from src.evals.synthetic_codebook import ZONES
+
+QUERIES = 200
+SYNTHETIC_COLLECTION = "retrieval_latency_benchmark"
+SYNTHETIC_VECTOR_SIZE = 1536
+SYNTHETIC_CHUNKS_PER_SECTION = 3
+UPLOAD_BATCH_SIZE = 256
+SAMPLE_SCROLL_LIMIT = 10000
+
+
+def sample_sections(client, collection_name, count, seed=0):
+    """Return up to count random (chapter_number, section_number) pairs present in a collection."""
+    points, _ = client.scroll(
+        collection_name=collection_name,
+        limit=SAMPLE_SCROLL_LIMIT,
+        with_payload=["chapter_number", "section_number"],
+        with_vectors=False
+    )
+    sections = sorted({
+        (p.payload["chapter_number"], p.payload["section_number"])
+        for p in points if p.payload and "chapter_number" in p.payload
+    })
+    rng = random.Random(seed)
+    return [rng.choice(sections) for _ in range(count)] if sections else []
+
+
+def time_queries(client, collection_name, sections, seed=0):
+    """
+    Time a section scroll and a zone-filtered search per sampled section.
+
+    Returns:
+        dict: {"section": [ms, ...], "zone": [ms, ...]}
+    """
+    rng = random.Random(seed)
+    vector_size = client.get_collection(collection_name).config.params.vectors.size
+    timings = {"section": [], "zone": []}
+    for chapter, section in sections:
+        start = time.perf_counter()
+        client.scroll(
+            collection_name=collection_name,
+            scroll_filter=section_filter(chapter, section),
+            limit=SECTION_RETRIEVAL_LIMIT,
+            with_payload=True
+        )
+        timings["section"].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        client.query_points(
+            collection_name=collection_name,
+            query=[rng.random() for _ in range(vector_size)],
+            query_filter=zone_filter(rng.choice(ZONES)),
+            limit=SECTION_RETRIEVAL_LIMIT
+        )
+        timings["zone"].append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def print_timings(label, timings):
+    for query, values in timings.items():
+        if not values:
+            continue
+        values = sorted(values)
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        print(f"{label:<40}{query:<10}{statistics.median(values):>10.2f}{p95:>10.2f}{statistics.mean(values):>10.2f}")
+
+
+def create_synthetic_collection(client, points, seed=0):
+    """Create SYNTHETIC_COLLECTION without payload indexes and fill it with random points."""
+    rng = random.Random(seed)
+    if client.collection_exists(SYNTHETIC_COLLECTION):
+        client.delete_collection(SYNTHETIC_COLLECTION)
+    client.create_collection(
+        SYNTHETIC_COLLECTION,
+        vectors_config=VectorParams(size=SYNTHETIC_VECTOR_SIZE, distance=Distance.COSINE)
+    )
+    batch = []
+    for i in range(points):
+        section = i // SYNTHETIC_CHUNKS_PER_SECTION
+        batch.append(PointStruct(
+            id=str(uuid.uuid4()),
+            vector=[rng.random() for _ in range(SYNTHETIC_VECTOR_SIZE)],
+            payload={
+                "chapter_number": str(150 + section // 40),
+                "section_number": f"{section % 40 + 1:03d}",
+                "zone_codes": rng.sample(ZONES, rng.randint(0, 2)),
+                "text": "synthetic chunk"
+            }
+        ))
+        if len(batch) == UPLOAD_BATCH_SIZE:
+            client.upsert(SYNTHETIC_COLLECTION, points=batch)
+            batch = []
+    if batch:
+        client.upsert(SYNTHETIC_COLLECTION, points=batch)
+
+
+async def run(collections, migrate, synthetic, queries, base=None):
+    """Time the requested collections; queries use the synchronous client, as retrieval does."""
+    base = base or QdrantBase()
+    client = base.client
+    print(f"{'collection':<40}{'query':<10}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+
+    for collection_name in collections:
+        sections = sample_sections(client, collection_name, queries)
+        print_timings(collection_name, time_queries(client, collection_name, sections))
+        if migrate:
+            created = await base.create_payload_indexes(collection_name)
+            print_timings(f"{collection_name} (+{len(created)} indexes)", time_queries(client, collection_name, sections))
+
+    if synthetic:
+        create_synthetic_collection(client, synthetic)
+        try:
+            sections = sample_sections(client, SYNTHETIC_COLLECTION, queries)
+            print_timings(f"synthetic-{synthetic} (no indexes)", time_queries(client, SYNTHETIC_COLLECTION, sections))
+            await base.create_payload_indexes(SYNTHETIC_COLLECTION)
+            print_timings(f"synthetic-{synthetic} (indexed)", time_queries(client, SYNTHETIC_COLLECTION, sections))
+        finally:
+            client.delete_collection(SYNTHETIC_COLLECTION)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("collections", nargs="*", help="Existing collections to time")
+    parser.add_argument("--migrate", action="store_true", help="Index the given collections and time them again")
+    parser.add_argument("--synthetic", type=int, default=0, help="Time a temporary collection of this many points")
+    parser.add_argument("--queries", type=int, default=QUERIES)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.collections, args.migrate, args.synthetic, args.queries))
+
+
+if __name__ == "__main__":
+    main()
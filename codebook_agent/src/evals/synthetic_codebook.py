@@ -0,0 +1,159 @@
+"""
+Synthetic ALP codebook exports for offline benchmarks.
+
+The generated HTML has the shape the parsers rely on: .Title.rbox, .Chapter.rbox and
+.Section.rbox headings, paragraphs citing other sections, and xsl-table tables with
+colspans, rowspans, xsl-table--header divs and tables nested in cells. Output is
+deterministic for a given size and seed, so runs on different machines compare.
+
+Usage: python -m src.evals.synthetic_codebook 5000 path/to/codebook.html [--seed 0]
+"""
+import argparse
+import random
+
+ZONES = ["AG", "R-1", "R-2", "R-3", "MF", "C-1", "C-2", "I-1", "I-2", "PUD"]
+USE_CELLS = ["P", "S", "C", "SE", "", "", "A*"]
+STANDARDS = [
+    ("Minimum Lot Area (sq. ft.)", ["43,560", "10,000", "7,500", "6,000", "5,000"]),
+    ("Minimum Lot Width", ["150", "80", "60 ft.", "50"]),
+    ("Front Yard Setback", ["50", "30 ft.", "25'", "10"]),
+    ("Side Yard Setback", ["15", "8", "6 (a)", "0"]),
+    ("Rear Yard Setback", ["50", "25", "20", "10"]),
+    ("Maximum Height", ["35 ft.", "45", "2.5 stories", "60"]),
+    ("Maximum Lot Coverage", ["25%", "35%", "60%", "80"]),
+]
+WORDS = (
+    "district lot use building structure shall permitted accessory yard parking sign "
+    "requirement commission approval plan development standard provided minimum maximum"
+).split()
+
+SECTIONS_PER_CHAPTER = 40
+CHAPTERS_PER_TITLE = 5
+FIRST_CHAPTER = 150
+# Share of sections with a use table, a standards table and a table nested in a cell
+USE_TABLE_SHARE = 0.05
+STANDARDS_TABLE_SHARE = 0.05
+NESTED_TABLE_SHARE = 0.03
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _paragraph(rng, chapter, sections_in_chapter):
+    text = " ".join(_sentence(rng) for _ in range(rng.randint(1, 4)))
+    if rng.random() < 0.4:
+        text += f" See &sect; {chapter}.{rng.randint(1, sections_in_chapter):03d}."
+    return f'<div class="para"><p>({rng.choice("ABCDEF")}) {text}&nbsp;</p></div>'
+
+
+def _use_table(rng):
+    zones = rng.sample(ZONES, rng.randint(3, len(ZONES)))
+    header = "".join(f"<th>{zone}</th>" for zone in zones)
+    rows = []
+    for group in range(rng.randint(1, 4)):
+        rows.append(f'<tr><td colspan="{len(zones) + 1}">Use Group {group + 1}</td></tr>')
+        for use in range(rng.randint(3, 15)):
+            cells = "".join(f"<td>{rng.choice(USE_CELLS)}</td>" for _ in zones)
+            rows.append(f"<tr><td>{rng.choice(WORDS).capitalize()} use {group}.{use}</td>{cells}</tr>")
+    return (
+        '<div class="xsl-table"><div class="xsl-table--header"><p>Permitted Use Table</p></div>'
+        f"<table><thead><tr><th>Use</th>{header}</tr></thead><tbody>{''.join(rows)}</tbody></table></div>"
+    )
+
+
+def _standards_table(rng):
+    zones = rng.sample(ZONES, rng.randint(2, 6))
+    rows = ['<tr><th rowspan="2">District</th><th colspan="2">Minimum Lot</th><th colspan="3">Minimum Yards</th></tr>',
+            "<tr><th>Area</th><th>Width</th><th>Front</th><th>Side</th><th>Rear</th></tr>"]
+    for zone in zones:
+        values = [rng.choice(options) for _, options in STANDARDS[:5]]
+        rows.append(f"<tr><td>{zone}</td>" + "".join(f"<td>{value}</td>" for value in values) + "</tr>")
+    return f'<div class="xsl-table"><table>{"".join(rows)}</table></div>'
+
+
+def _row_standards_table(rng):
+    zones = rng.sample(ZONES, rng.randint(2, 6))
+    header = "".join(f"<th>{zone}</th>" for zone in zones)
+    rows = [f"<tr><th>Standard</th>{header}</tr>"]
+    for label, options in STANDARDS:
+        if rng.random() < 0.3:
+            # Same value for every zone, written once
+            rows.append(f'<tr><td>{label}</td><td colspan="{len(zones)}">{rng.choice(options)}</td></tr>')
+        else:
+            rows.append(f"<tr><td>{label}</td>" + "".join(f"<td>{rng.choice(options)}</td>" for _ in zones) + "</tr>")
+    notes = rng.randint(2, 3)
+    rows.append(f'<tr><td rowspan="{notes}">Notes</td><td colspan="{len(zones)}">{_sentence(rng)}</td></tr>')
+    rows.extend(f'<tr><td colspan="{len(zones)}">{_sentence(rng)}</td></tr>' for _ in range(notes - 1))
+    return f'<div class="xsl-table"><table>{"".join(rows)}</table></div>'
+
+
+def _nested_table(rng):
+    inner = "".join(f"<tr><td>{rng.choice(WORDS)}</td><td>{rng.randint(1, 99)}</td></tr>" for _ in range(rng.randint(2, 5)))
+    return (
+        '<div class="xsl-table"><table>'
+        "<tr><th>Item</th><th>Detail</th></tr>"
+        f"<tr><td>{rng.choice(WORDS).capitalize()}</td><td><p>{_sentence(rng, 6)}</p>"
+        f'<div class="xsl-table"><table>{inner}</table></div></td></tr>'
+        f"<tr><td>{rng.choice(WORDS).capitalize()}</td><td>{_sentence(rng, 8)}</td></tr>"
+        "</table></div>"
+    )
+
+
+def generate_codebook(sections, seed=0):
+    """
+    Generate an ALP-shaped codebook export.
+
+    Args:
+        sections (int): Number of § sections, e.g. 100 to 50,000
+        seed (int): Random seed; the same size and seed give the same document
+
+    Returns:
+        str: The HTML document
+    """
+    rng = random.Random(seed)
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8"><title>Synthetic Code</title></head><body>']
+    chapter = FIRST_CHAPTER - 1
+    for index in range(sections):
+        section = index % SECTIONS_PER_CHAPTER + 1
+        if section == 1:
+            chapter += 1
+            chapter_index = chapter - FIRST_CHAPTER
+            if chapter_index % CHAPTERS_PER_TITLE == 0:
+                title = chapter_index // CHAPTERS_PER_TITLE + 1
+                parts.append(f'<div class="Title rbox">TITLE {title}: {rng.choice(WORDS).upper()} REGULATIONS</div>')
+            parts.append(f'<div class="Chapter rbox">CHAPTER {chapter}: {rng.choice(WORDS).upper()} CODE</div>')
+        sections_in_chapter = min(SECTIONS_PER_CHAPTER, sections - (index - section + 1))
+        name = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))).upper()
+        parts.append(f'<div class="Section toc-destination rbox">&sect; {chapter}.{section:03d} {name}.</div>')
+        for _ in range(rng.randint(1, 4)):
+            parts.append(_paragraph(rng, chapter, sections_in_chapter))
+        roll = rng.random()
+        if roll < USE_TABLE_SHARE:
+            parts.append(_use_table(rng))
+        elif roll < USE_TABLE_SHARE + STANDARDS_TABLE_SHARE:
+            parts.append(_standards_table(rng) if rng.random() < 0.5 else _row_standards_table(rng))
+        elif roll < USE_TABLE_SHARE + STANDARDS_TABLE_SHARE + NESTED_TABLE_SHARE:
+            parts.append(f'<div class="para">{_nested_table(rng)}</div>')
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def write_codebook(path, sections, seed=0):
+    """Write a generated codebook to path and return the path."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(generate_codebook(sections, seed))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("sections", type=int, help="Number of sections")
+    parser.add_argument("output", help="Path of the HTML file to write")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_codebook(args.output, args.sections, args.seed)
+
+
+if __name__ == "__main__":
+    main()
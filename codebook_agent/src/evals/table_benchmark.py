@@ -0,0 +1,61 @@
+"""
+Timing and equivalence benchmark for the normalize_table engines.
+
+Renders every table of a codebook with each engine, checks the outputs are identical
+and reports the time spent per engine.
+Usage: python -m src.evals.table_benchmark path/to/codebook.html [more.html ...]
+"""
+import argparse
+import time
+
+from src.utils.codebook_helpers import TABLE_ENGINES, load_html, normalize_table
+
+
+def benchmark_document(html_path, engines=TABLE_ENGINES):
+    """
+    Benchmark all table engines on one document.
+
+    Args:
+        html_path (str): Path to an ALP HTML export
+        engines (list): Table engines to measure; the first one is the reference output
+
+    Returns:
+        tuple: (table_count, timings, mismatches) where timings maps engine to seconds and
+               mismatches lists the indexes of tables whose output differs from the reference
+    """
+    with open(html_path, "r", encoding="utf-8") as f:
+        soup = load_html(f.read())
+    tables = soup.find_all("table")
+
+    timings = {}
+    outputs = {}
+    for engine in engines:
+        start = time.perf_counter()
+        outputs[engine] = [normalize_table(table, engine=engine) for table in tables]
+        timings[engine] = time.perf_counter() - start
+
+    reference = outputs[engines[0]]
+    mismatches = sorted({
+        i for engine in engines[1:] for i, output in enumerate(outputs[engine]) if output != reference[i]
+    })
+    return len(tables), timings, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("html_paths", nargs="+", help="ALP HTML exports to render")
+    parser.add_argument("--engines", nargs="+", default=TABLE_ENGINES, choices=TABLE_ENGINES)
+    args = parser.parse_args()
+
+    for html_path in args.html_paths:
+        table_count, timings, mismatches = benchmark_document(html_path, args.engines)
+        print(f"\n{html_path}: {table_count} tables, {len(mismatches)} mismatches")
+        print(f"{'engine':<10}{'seconds':>12}{'ms/table':>12}")
+        for engine, seconds in timings.items():
+            print(f"{engine:<10}{seconds:>12.2f}{1000 * seconds / max(table_count, 1):>12.2f}")
+        if mismatches:
+            print(f"Tables with differing output: {mismatches[:20]}")
+
+
+if __name__ == "__main__":
+    main()
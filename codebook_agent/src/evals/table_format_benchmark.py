@@ -0,0 +1,142 @@
+"""
+Token, chunk and answer-accuracy comparison of the table serialization formats.
+
+For every format in TABLE_FORMATS the sections of each codebook are extracted and
+measured in characters, embedding tokens and ingest chunks. With --answers, every
+question of building_requirements_dataset_json is also answered from its reference
+sections in each format and scored with the answer_matching evaluator.
+
+Codebooks come from HTML files given on the command line, or with --dataset from the
+local cache (see cache_codebook_html) of every document in the dataset. With --corpus,
+answers for documents that are not cached as HTML are scored from the sections in the
+corpus store, in whichever formats it holds.
+Usage: python -m src.evals.table_format_benchmark [path/to/codebook.html ...] [--dataset] [--answers] [--corpus]
+"""
+import argparse
+import asyncio
+
+import tiktoken
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_openai import ChatOpenAI
+
+from qdrant_wrapper.qdrant_ingestor import CHUNK_OVERLAP, CHUNK_SIZE, SEPARATOR
+from src.datasets.building_requirements import building_requirements_dataset_json
+from src.utils.corpus_store import CorpusStore
+from src.utils.codebook_helpers import (
+    TABLE_FORMATS,
+    get_codebook_index,
+    get_section_content,
+    load_cached_codebook_html,
+)
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+ANSWER_MODEL = "gpt-4o-mini"
+ANSWER_PROMPT = """Answer the question using only the municipal code sections below.
+Reply with the value only (for example "35 feet" or "60%").
+
+Question: What is the {query_type} in zone {zone_code}?
+
+Sections:
+{context}"""
+
+
+def measure_sections(index, table_format, encoding, text_splitter):
+    """
+    Measure the text of every section of a codebook in one table format.
+
+    Returns:
+        dict: {"sections", "chars", "tokens", "chunks"} totals
+    """
+    totals = {"sections": 0, "chars": 0, "tokens": 0, "chunks": 0}
+    for entry in index.section_entries:
+        text = index.section_text(entry["element"], table_format)
+        totals["sections"] += 1
+        totals["chars"] += len(text)
+        totals["tokens"] += len(encoding.encode(text))
+        totals["chunks"] += len(text_splitter.split_text(text))
+    return totals
+
+
+async def score_answers(indexes, table_format, corpus=None):
+    """
+    Answer every dataset question from its reference sections and score the answers.
+
+    Sections come from the parsed codebook, or from the corpus store for documents
+    that were not parsed.
+
+    Returns:
+        float: Mean answer_matching score over the questions that could be scored, or None
+    """
+    # Imported here so token counting works without the querier graph's dependencies
+    from src.evals.langchain_eval import answer_matching_evaluator
+
+    llm = ChatOpenAI(model=ANSWER_MODEL, temperature=0)
+    scores = []
+    for example in building_requirements_dataset_json:
+        inputs, outputs = example["inputs"], example["outputs"]
+        source = indexes.get(inputs["document_id"])
+        if source is None and corpus is not None:
+            source = corpus.document(inputs["document_id"], table_format=table_format)
+        if source is None:
+            continue
+        sections = [get_section_content(source, number, table_format=table_format) for number in outputs["section_list"]]
+        context = "\n\n".join(section["content"] for section in sections if "error" not in section)
+        response = await llm.ainvoke(ANSWER_PROMPT.format(
+            query_type=inputs["query_type"].replace("_", " "),
+            zone_code=inputs["zone_code"],
+            context=context
+        ))
+        result = await answer_matching_evaluator({"answer": response.content}, outputs)
+        if result.get("score") is not None:
+            scores.append(result["score"])
+    return sum(scores) / len(scores) if scores else None
+
+
+def load_indexes(html_paths, use_dataset):
+    """Parse the requested codebooks, keyed by file path or dataset document_id."""
+    indexes = {}
+    for html_path in html_paths:
+        with open(html_path, "r", encoding="utf-8") as f:
+            indexes[html_path] = get_codebook_index(f.read())
+    if use_dataset:
+        for document_id in sorted({example["inputs"]["document_id"] for example in building_requirements_dataset_json}):
+            html_content = load_cached_codebook_html(document_id)
+            if html_content is None:
+                print(f"Skipping {document_id}: not in the local codebook cache")
+                continue
+            indexes[document_id] = get_codebook_index(html_content)
+    return indexes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("html_paths", nargs="*", help="ALP HTML exports to measure")
+    parser.add_argument("--dataset", action="store_true", help="Measure the cached dataset codebooks")
+    parser.add_argument("--answers", action="store_true", help="Score answers on the dataset (calls the OpenAI API)")
+    parser.add_argument("--corpus", action="store_true", help="Read uncached documents' sections from the corpus store")
+    parser.add_argument("--formats", nargs="+", default=TABLE_FORMATS, choices=TABLE_FORMATS)
+    args = parser.parse_args()
+
+    indexes = load_indexes(args.html_paths, args.dataset or args.answers)
+    encoding = tiktoken.encoding_for_model(EMBEDDING_MODEL)
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, separators=[SEPARATOR], keep_separator=False
+    )
+
+    for name, index in indexes.items():
+        print(f"\n{name}")
+        print(f"{'format':<12}{'sections':>10}{'chars':>12}{'tokens':>12}{'chunks':>10}")
+        for table_format in args.formats:
+            totals = measure_sections(index, table_format, encoding, text_splitter)
+            print(f"{table_format:<12}{totals['sections']:>10}{totals['chars']:>12}{totals['tokens']:>12}{totals['chunks']:>10}")
+
+    if args.answers:
+        corpus = CorpusStore() if args.corpus else None
+        print(f"\n{'format':<12}{'answer_matching':>16}")
+        for table_format in args.formats:
+            score = asyncio.run(score_answers(indexes, table_format, corpus))
+            print(f"{table_format:<12}{'n/a' if score is None else f'{score:.3f}':>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Named storage layouts for codebook collections.
+
+"ram" is the original layout: float32 vectors and the HNSW graph in memory. "balanced"
+keeps int8-quantized vectors in RAM and the float32 originals on disk; searches run on
+the quantized vectors and rescore an oversampled candidate list with the originals.
+"disk" also moves the quantized vectors and the HNSW graph to disk and uses a sparser
+graph, for collections that are rarely queried. A shared collection (one for every
+codebook) builds one HNSW graph per document instead of a global one. See src/evals/collection_profile_report.py
+for the recall and memory of each on the eval dataset.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from qdrant_client.http.models import (
+    Distance,
+    HnswConfigDiff,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
+
+DEFAULT_COLLECTION_PROFILE = "ram"
+# Share of the value distribution kept when choosing the int8 range; outliers are clipped
+QUANTIZATION_QUANTILE = 0.99
+# Candidates fetched from the quantized index per requested result, then rescored
+RESCORE_OVERSAMPLING = 2.0
+# Bytes per HNSW link; each point has up to 2 * m links on layer 0
+HNSW_LINK_BYTES = 4
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """Vector storage, quantization and HNSW settings of a collection."""
+
+    name: str
+    vectors_on_disk: bool = False
+    quantized: bool = False
+    quantized_in_ram: bool = True
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_on_disk: bool = False
+
+    def collection_config(self, vector_size: int, distance: Distance, multitenant: bool = False) -> Dict:
+        """
+        Return the create_collection arguments of the profile.
+
+        With multitenant, the global graph is disabled (m=0) and each value of the tenant
+        index gets its own graph of hnsw_m links (payload_m), since every search is
+        filtered to one document.
+        """
+        hnsw_config = HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.hnsw_on_disk)
+        if multitenant:
+            hnsw_config = HnswConfigDiff(
+                m=0, payload_m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.hnsw_on_disk
+            )
+        config = {
+            "vectors_config": VectorParams(size=vector_size, distance=distance, on_disk=self.vectors_on_disk),
+            "hnsw_config": hnsw_config,
+        }
+        if self.quantized:
+            config["quantization_config"] = ScalarQuantization(scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8, quantile=QUANTIZATION_QUANTILE, always_ram=self.quantized_in_ram
+            ))
+        return config
+
+    def memory_estimate(self, points: int, vector_size: int) -> int:
+        """
+        Estimate the resident bytes of a collection of this profile.
+
+        Counts the float32 vectors when they are in RAM, the int8 vectors when they are
+        kept in RAM and the HNSW links when the graph is in RAM; payloads and the page
+        cache of on-disk data are left out.
+        """
+        total = 0
+        if not self.vectors_on_disk:
+            total += points * vector_size * 4
+        if self.quantized and self.quantized_in_ram:
+            total += points * vector_size
+        if not self.hnsw_on_disk:
+            total += points * self.hnsw_m * 2 * HNSW_LINK_BYTES
+        return total
+
+
+COLLECTION_PROFILES = {
+    "ram": CollectionProfile("ram"),
+    "balanced": CollectionProfile("balanced", vectors_on_disk=True, quantized=True),
+    "disk": CollectionProfile(
+        "disk", vectors_on_disk=True, quantized=True, quantized_in_ram=False,
+        hnsw_m=8, hnsw_ef_construct=64, hnsw_on_disk=True
+    ),
+}
+
+
+def get_collection_profile(name: str) -> CollectionProfile:
+    """Return a profile of COLLECTION_PROFILES by name."""
+    if name not in COLLECTION_PROFILES:
+        raise ValueError(f"Invalid collection profile. Must be one of {list(COLLECTION_PROFILES)}")
+    return COLLECTION_PROFILES[name]
+
+
+def search_params_for(collection_info) -> Optional[SearchParams]:
+    """
+    Return the search parameters for an existing collection.
+
+    Quantized collections search the int8 vectors and rescore the oversampled
+    candidates with the original vectors; other collections use the defaults.
+
+    Args:
+        collection_info: The result of get_collection
+    """
+    if collection_info.config.quantization_config is None:
+        return None
+    return SearchParams(quantization=QuantizationSearchParams(rescore=True, oversampling=RESCORE_OVERSAMPLING))
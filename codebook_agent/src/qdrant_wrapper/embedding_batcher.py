@@ -0,0 +1,121 @@
+"""
+Embedding requests shared across sections.
+
+Most sections split into one to three chunks, so embedding per section sends one small
+request per section. The batcher collects the chunks of every section being ingested
+into requests filled up to a token and item budget, keeps a bounded number of requests
+in flight, and hands each caller the vectors of its own texts.
+"""
+import asyncio
+from typing import List
+
+from openai import APIConnectionError, APITimeoutError, RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+# One request stays well below the embeddings API limit of 300k tokens and 2048 inputs
+MAX_BATCH_TOKENS = 200_000
+MAX_BATCH_ITEMS = 256
+MAX_CONCURRENT_REQUESTS = 4
+# How long a partly filled batch waits for more texts before it is sent
+BATCH_LINGER_SECONDS = 0.05
+# Conservative characters per token for the budget; code text runs ~4
+CHARS_PER_TOKEN = 3
+MAX_RETRY_ATTEMPTS = 5
+# Errors a later attempt can succeed after; auth and bad-request errors fail at once
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text without a tokenizer."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class EmbeddingBatcher:
+    """Coalesce embed calls from concurrent callers into budget-filled requests."""
+
+    def __init__(self, embeddings, max_tokens: int = MAX_BATCH_TOKENS, max_items: int = MAX_BATCH_ITEMS,
+                 max_concurrency: int = MAX_CONCURRENT_REQUESTS, linger: float = BATCH_LINGER_SECONDS):
+        self.embeddings = embeddings
+        self.max_tokens = max_tokens
+        self.max_items = max_items
+        self.linger = linger
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # (text, future) pairs of the batch being filled, and its token estimate
+        self._pending = []
+        self._pending_tokens = 0
+        self._linger_task = None
+        self._requests = set()
+        self.request_count = 0
+        self.item_count = 0
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts as part of the shared batches.
+
+        Args:
+            texts: Texts of one caller, e.g. the chunks of one section
+
+        Returns:
+            list: One vector per text, in order
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if self._pending and (len(self._pending) >= self.max_items or self._pending_tokens + tokens > self.max_tokens):
+                self._dispatch()
+            future = loop.create_future()
+            self._pending.append((text, future))
+            self._pending_tokens += tokens
+            futures.append(future)
+        if len(self._pending) >= self.max_items:
+            self._dispatch()
+        elif self._pending and self._linger_task is None:
+            self._linger_task = asyncio.create_task(self._send_after_linger())
+        return list(await asyncio.gather(*futures))
+
+    async def flush(self):
+        """Send the partly filled batch and wait for every request in flight."""
+        self._dispatch()
+        if self._requests:
+            await asyncio.gather(*self._requests, return_exceptions=True)
+
+    async def _send_after_linger(self):
+        await asyncio.sleep(self.linger)
+        self._linger_task = None
+        self._dispatch()
+
+    def _dispatch(self):
+        if self._linger_task is not None:
+            self._linger_task.cancel()
+            self._linger_task = None
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        request = asyncio.create_task(self._send(batch))
+        self._requests.add(request)
+        request.add_done_callback(self._requests.discard)
+
+    @retry(
+        stop=stop_after_attempt(MAX_RETRY_ATTEMPTS),
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        retry=retry_if_exception_type(RETRYABLE_ERRORS),
+        reraise=True
+    )
+    async def _request(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    async def _send(self, batch):
+        async with self._semaphore:
+            try:
+                vectors = await self._request([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        self.request_count += 1
+        self.item_count += len(batch)
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
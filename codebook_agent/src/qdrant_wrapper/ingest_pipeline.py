@@ -0,0 +1,184 @@
+"""
+Staged ingestion pipeline: extract -> split -> embed -> upsert.
+
+Stages are connected by bounded asyncio queues and each runs a fixed number of
+workers, so a slow stage (usually the embeddings API) fills the queue in front of it
+and the stages upstream wait instead of piling up requests. Per-stage counts and
+timings are collected while the pipeline runs. A failed item does not stop the other
+sections, but run raises once everything else is stored, so a partial ingest is never
+reported as a success.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from more_itertools import chunked
+
+from src.utils.codebook_helpers import EXTRACTION_BATCH_SIZE
+
+PIPELINE_STAGES = ("extract", "split", "embed", "upsert")
+# Embed workers only wait on the ingestor's EmbeddingBatcher, which limits the requests
+# in flight; many of them let chunks of many sections share a request
+DEFAULT_STAGE_WORKERS = {"extract": 1, "split": 1, "embed": 64, "upsert": 1}
+DEFAULT_QUEUE_SIZE = 32
+
+
+@dataclass
+class StageStats:
+    """Counters of one pipeline stage."""
+
+    name: str
+    workers: int
+    items_in: int = 0
+    items_out: int = 0
+    errors: int = 0
+    # Time spent in the stage's own work, and waiting for room in the next queue
+    busy_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+    def throughput(self, elapsed: float) -> float:
+        """Items completed per second of pipeline wall time."""
+        return self.items_in / elapsed if elapsed > 0 else 0.0
+
+
+class IngestPipeline:
+    """
+    Run sections of one document through the ingestor's stages concurrently.
+
+    Items are: sections (extract), extracted contents (split), chunk payloads of one
+    section (embed) and points of one section (upsert). The upsert stage hands points to
+    the ingestor's UpsertWriter, which is flushed once every stage has drained; only then
+are the manifest entries of the sections that got through committed.
+    """
+
+    def __init__(self, ingestor, extract_section_content, stage_workers: Optional[Dict[str, int]] = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.ingestor = ingestor
+        self.extract_section_content = extract_section_content
+        self.stage_workers = {**DEFAULT_STAGE_WORKERS, **(stage_workers or {})}
+        self.queue_size = queue_size
+        self.stats = {stage: StageStats(stage, self.stage_workers[stage]) for stage in PIPELINE_STAGES}
+        self.elapsed = 0.0
+        self.chunks = 0
+        self.errors = []
+        # "chapter.section" of the sections whose points were all handed to the writer
+        self.completed = []
+        self._pool = None
+
+    async def run(self, sections_list: List[Dict], contents: Optional[List[Dict]] = None) -> int:
+        """
+        Ingest sections and wait until every point is upserted.
+
+        Args:
+            sections_list: section_list entries (chapterNumber, sectionNumber, sectionName)
+            contents: Already extracted contents, in the order of sections_list; the
+                      extract stage then passes them through
+
+        Returns:
+            int: Number of chunks upserted
+
+        Raises:
+            RuntimeError: If any item failed in any stage; the other items are stored first
+        """
+        start = time.perf_counter()
+        queues = {stage: asyncio.Queue(maxsize=self.queue_size) for stage in PIPELINE_STAGES}
+        handlers = {"extract": self._extract, "split": self._split, "embed": self._embed, "upsert": self._upsert}
+        items = list(zip(sections_list, contents if contents is not None else [None] * len(sections_list)))
+
+        with self.ingestor.extraction_pool() as pool:
+            self._pool = pool
+            workers = {
+                stage: [
+                    asyncio.create_task(self._worker(stage, handlers[stage], queues[stage], queues.get(next_stage)))
+                    for _ in range(self.stage_workers[stage])
+                ]
+                for stage, next_stage in zip(PIPELINE_STAGES, PIPELINE_STAGES[1:] + (None,))
+            }
+            try:
+                for batch in chunked(items, EXTRACTION_BATCH_SIZE):
+                    await queues["extract"].put(list(batch))
+                # Drain stage by stage: once a queue is empty and its workers idle,
+                # nothing more can reach the next one
+                for stage in PIPELINE_STAGES:
+                    await queues[stage].join()
+                    for task in workers[stage]:
+                        task.cancel()
+                # Upserts are only handed to the writer; wait until they are stored
+                await self.ingestor.upsert_writer.flush()
+                self.ingestor.commit_sections(self.completed)
+            finally:
+                for tasks in workers.values():
+                    for task in tasks:
+                        task.cancel()
+                await asyncio.gather(*[task for tasks in workers.values() for task in tasks], return_exceptions=True)
+                self._pool = None
+
+        self.elapsed = time.perf_counter() - start
+        if self.errors:
+            raise RuntimeError(
+                f"{len(self.errors)} items failed in the ingest pipeline of {self.ingestor.document_id}: {self.errors[0]}"
+            ) from self.errors[0]
+        return self.chunks
+
+    async def _worker(self, stage, handler, inbox, outbox):
+        stats = self.stats[stage]
+        while True:
+            item = await inbox.get()
+            try:
+                started = time.perf_counter()
+                results = await handler(item)
+                stats.busy_seconds += time.perf_counter() - started
+                stats.items_in += 1
+                for result in results:
+                    if outbox is not None:
+                        waited = time.perf_counter()
+                        await outbox.put(result)
+                        stats.blocked_seconds += time.perf_counter() - waited
+                    stats.items_out += 1
+            except Exception as e:
+                stats.errors += 1
+                self.errors.append(e)
+                print(f"Error in {stage} stage of {self.ingestor.document_id}: {e}")
+            finally:
+                inbox.task_done()
+
+    async def _extract(self, batch):
+        missing = [section for section, content in batch if content is None]
+        if missing:
+            numbers = [f"{s['chapterNumber']}.{s['sectionNumber']}" for s in missing]
+            extracted = iter(await self.ingestor.extract_sections(numbers, self.extract_section_content, self._pool))
+            batch = [(section, content if content is not None else next(extracted)) for section, content in batch]
+        return batch
+
+    async def _split(self, item):
+        section_info, content_dict = item
+        payloads = self.ingestor.split_section(section_info, content_dict)
+        if self.ingestor.skip_existing:
+            payloads = self.ingestor.missing_payloads(payloads)
+        if not payloads:
+            # Nothing (left) to store for the section
+            self.completed.append(f"{section_info['chapterNumber']}.{section_info['sectionNumber']}")
+            return []
+        return [payloads]
+
+    async def _embed(self, payloads):
+        vectors = await self.ingestor.embed_texts([payload["text"] for payload in payloads])
+        return [self.ingestor.section_points(payloads, vectors)]
+
+    async def _upsert(self, points):
+        await self.ingestor.upsert_writer.write(points)
+        self.chunks += len(points)
+        self.completed.append(f"{points[0].payload['chapter_number']}.{points[0].payload['section_number']}")
+        return []
+
+    def format_stats(self) -> str:
+        """Return a table of per-stage counts, timings and throughput."""
+        lines = [f"{'stage':<9}{'workers':>8}{'in':>8}{'out':>8}{'errors':>8}{'busy s':>9}{'blocked s':>11}{'items/s':>9}"]
+        for stats in self.stats.values():
+            lines.append(
+                f"{stats.name:<9}{stats.workers:>8}{stats.items_in:>8}{stats.items_out:>8}{stats.errors:>8}"
+                f"{stats.busy_seconds:>9.2f}{stats.blocked_seconds:>11.2f}{stats.throughput(self.elapsed):>9.1f}"
+            )
+        lines.append(f"{self.chunks} chunks in {self.elapsed:.2f}s")
+        return "\n".join(lines)
@@ -0,0 +1,22 @@
+"""
+Add the payload indexes of PAYLOAD_INDEXES to existing municipality collections.
+
+Usage: python -m qdrant_wrapper.migrate_payload_indexes [collection ...]
+"""
+import argparse
+import asyncio
+
+from qdrant_wrapper.qdrant_rechunk import QdrantRechunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("collections", nargs="*", help="Collections to migrate; defaults to all of them")
+    args = parser.parse_args()
+    results = asyncio.run(QdrantRechunk().migrate_payload_indexes(args.collections or None))
+    failed = [name for name, fields in results.items() if fields is None]
+    print(f"Migrated {len(results) - len(failed)} collections, {len(failed)} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,45 @@
+import contextlib
+import json
 import os
-from typing import Optional
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 from langchain_openai import OpenAIEmbeddings
 from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.http.models import KeywordIndexParams, KeywordIndexType, PayloadSchemaType
 from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
 import httpx
 from qdrant_client.http.exceptions import ResponseHandlingException
+
+from qdrant_wrapper.rag_strategies import document_filter
+from src.utils.codebook_helpers import CODEBOOK_DATA_DIR
+from src.utils.embedding_cache import CachedEmbeddings
 # Load environment variables    
 load_dotenv()
 
 # Constants
+# Payload fields that retrieval, sync and deletes filter on; each gets a keyword index
+# so those filters don't scan the whole collection
+PAYLOAD_INDEXES = {
+    "chapter_number": PayloadSchemaType.KEYWORD,
+    "section_number": PayloadSchemaType.KEYWORD,
+    "zone_codes": PayloadSchemaType.KEYWORD,
+}
+# When set, every codebook is stored in this one collection and told apart by the
+# document_id payload; otherwise each document_id is its own collection
+SHARED_COLLECTION = os.getenv("QDRANT_SHARED_COLLECTION") or None
+# Tenant index of the shared collection: Qdrant groups each document's points into
+# their own segments and builds a per-document HNSW graph (see payload_m)
+TENANT_INDEX = KeywordIndexParams(type=KeywordIndexType.KEYWORD, is_tenant=True)
+
+
+def manifest_path(document_id: str, data_dir: str = CODEBOOK_DATA_DIR) -> str:
+    """Return the path of the local section manifest of a collection."""
+    return os.path.join(data_dir, "manifests", f"{document_id}.json")
 
 
 from enum import Enum
-from dataclasses import dataclass
 
-@dataclass
 class DocumentStatus(Enum):
     NOT_EXISTS = 0
     EMPTY = 1
@@ -38,7 +61,52 @@ class QdrantBase:
             url=os.getenv("QDRANT_URL"),
             api_key=os.getenv("QDRANT_API_KEY"),
         )
-        self.embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
+        # Vectors of texts embedded before (by any collection) are read from the local cache
+        self.embeddings = CachedEmbeddings(OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY")))
+        self.shared_collection = SHARED_COLLECTION
+        # Where ingestors keep the section manifests of documents (see manifest_path)
+        self.data_dir = CODEBOOK_DATA_DIR
+
+    def read_manifest(self, document_id: str) -> Optional[Dict]:
+        """Read the local manifest of a document, or None if there is none."""
+        try:
+            with open(manifest_path(document_id, self.data_dir), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def ingest_unfinished(self, document_id: str) -> bool:
+        """
+        Whether the last ingest of a document started but did not finish.
+
+        Manifests written before ingests recorded completion count as finished.
+        """
+        manifest = self.read_manifest(document_id)
+        return manifest is not None and not manifest.get("complete", True)
+
+    def remove_manifest(self, document_id: Optional[str] = None):
+        """
+        Delete the local section manifest of a document, or of every document.
+
+        Needed whenever points are deleted outside an ingestor: a sync trusts the
+        manifest over the collection and would skip the deleted sections.
+        """
+        if document_id is not None:
+            paths = [manifest_path(document_id, self.data_dir)]
+        else:
+            directory = os.path.dirname(manifest_path("", self.data_dir))
+            paths = [os.path.join(directory, name) for name in os.listdir(directory)] if os.path.isdir(directory) else []
+        for path in paths:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+    def collection_for(self, document_id: str) -> str:
+        """Return the collection holding a document's points."""
+        return self.shared_collection or document_id
+
+    def scoped_filter(self, document_id: str, filter_=None):
+        """Restrict a filter to one document's points; unchanged without a shared collection."""
+        return document_filter(filter_, document_id if self.shared_collection else None)
     
    
     @retry(
@@ -47,17 +115,50 @@ class QdrantBase:
         retry=retry_if_exception_type((httpx.ConnectTimeout, ResponseHandlingException))
     )
     async def document_exists_and_is_indexed(self, document_id: str) -> DocumentStatus:
-        """Check if a collection exists and has indexed documents."""
+        """Check if a document's collection exists and how many of its points are indexed."""
         try:
-            exists = await self.async_client.collection_exists(collection_name=document_id)
+            collection_name = self.collection_for(document_id)
+            exists = await self.async_client.collection_exists(collection_name=collection_name)
             if not exists:
                 return DocumentStatus.NOT_EXISTS
-            stats = await self.async_client.count(collection_name=document_id)
+            stats = await self.async_client.count(
+                collection_name=collection_name, count_filter=self.scoped_filter(document_id), exact=True
+            )
             if stats.count == 0:
+                # The shared collection exists for other documents; without a manifest
+                # this one was never ingested, rather than interrupted
+                if self.shared_collection and self.read_manifest(document_id) is None:
+                    return DocumentStatus.NOT_EXISTS
                 return DocumentStatus.EMPTY
             if stats.count < 10:
                 return DocumentStatus.UDC
             return DocumentStatus.INDEXED
         except Exception as e:
             raise Exception(f"Error checking if document exists and is indexed: {e}") from e
-    
+
+    async def create_payload_indexes(self, collection_name: str) -> list:
+        """
+        Create the PAYLOAD_INDEXES a collection does not have yet.
+
+        The shared collection also gets the document_id tenant index, created first.
+
+        Returns:
+            list: The fields that were indexed
+        """
+        info = await self.async_client.get_collection(collection_name=collection_name)
+        existing = set(info.payload_schema or {})
+        indexes = dict(PAYLOAD_INDEXES)
+        if collection_name == self.shared_collection:
+            indexes = {"document_id": TENANT_INDEX, **indexes}
+        created = []
+        for field_name, field_schema in indexes.items():
+            if field_name in existing:
+                continue
+            await self.async_client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+                wait=True
+            )
+            created.append(field_name)
+        return created
@@ -1,129 +1,475 @@
 import os
+import json
 import uuid
 import asyncio
-import threading
+import hashlib
+import contextlib
 from typing import List, Dict, Optional
 
 from dotenv import load_dotenv
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
-from qdrant_client.http.models import PointStruct
+from qdrant_client.http.models import PointStruct, Filter, FieldCondition, MatchValue, FilterSelector
 from more_itertools import chunked
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from qdrant_client.http.exceptions import ResponseHandlingException
 
-from qdrant_wrapper.qdrant_base import QdrantBase
-from qdrant_client.http.models import VectorParams, Distance
+from qdrant_wrapper.collection_profiles import DEFAULT_COLLECTION_PROFILE, get_collection_profile
+from qdrant_wrapper.embedding_batcher import EmbeddingBatcher
+from qdrant_wrapper.ingest_pipeline import DEFAULT_QUEUE_SIZE, IngestPipeline
+from qdrant_wrapper.qdrant_base import QdrantBase, manifest_path
+from qdrant_wrapper.upsert_writer import UPSERT_IN_FLIGHT, UpsertWriter
+from src.utils.codebook_helpers import (
+    CODEBOOK_DATA_DIR,
+    EXTRACTION_BATCH_SIZE,
+    create_extraction_pool,
+    extract_section_batch,
+    section_references,
+)
+from src.utils.chunking import StructuredChunker
+from src.utils.corpus_store import CorpusDocument
+from src.utils.zone_codes import zone_code_matcher, zone_codes_in_text
+from qdrant_client.http.models import Distance
 
 load_dotenv()
 # Constants
 CHUNK_SIZE = 8000
 CHUNK_OVERLAP = 500
 SEPARATOR = "块"
-BATCH_SIZE = 50
-EMBEDDING_BATCH_SIZE = 32
-MAX_RETRY_ATTEMPTS = 5
-RETRY_MULTIPLIER = 1
-MIN_RETRY_WAIT = 1
-MAX_RETRY_WAIT = 10
+CHUNKERS = ["structure", "character"]
+DEFAULT_CHUNKER = "structure"
 VECTOR_SIZE = 1536
 VECTOR_DISTANCE = Distance.COSINE
+SCROLL_PAGE_SIZE = 1000
+POINT_ID_NAMESPACE = uuid.UUID("3251d39f-3981-42c8-8745-f3e70b97820d")
+
+
+def section_content_hash(content_text: str) -> str:
+    """Return the hash that identifies one version of a section's extracted text."""
+    return hashlib.sha256(content_text.encode("utf-8")).hexdigest()
+
+
+def chunk_point_id(document_id: str, payload: Dict) -> str:
+    """
+    Return the point ID of a chunk: a uuid5 of the document, section, chunk position and chunk text.
+
+    Re-ingesting the same text gives the same IDs, so upserts overwrite instead of
+    duplicating points and existing chunks can be recognised before embedding.
+    """
+    name = "/".join([
+        document_id,
+        f"{payload['chapter_number']}.{payload['section_number']}",
+        str(payload["chunk_index"]),
+        section_content_hash(payload["text"])
+    ])
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, name))
+
 
 class QdrantIngestor(QdrantBase):
     """Class for ingesting documents into Qdrant."""
     
-    def __init__(self, document_id: str, document_content: str):
+    def __init__(self, document_id: str, document_content, table_format: str = "pretty",
+                 extraction_workers: int = 0, document_path: Optional[str] = None,
+                 data_dir: str = CODEBOOK_DATA_DIR, zone_codes: Optional[List[str]] = None,
+                 corpus_document: Optional[CorpusDocument] = None,
+                 stage_workers: Optional[Dict[str, int]] = None, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 skip_existing: bool = False, chunker: str = DEFAULT_CHUNKER,
+                 upsert_in_flight: int = UPSERT_IN_FLIGHT, upsert_wait: bool = True,
+                 collection_profile: str = DEFAULT_COLLECTION_PROFILE):
         super().__init__()
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE, 
-            chunk_overlap=CHUNK_OVERLAP, 
-            separators=[SEPARATOR], 
-            keep_separator=False
-        )
+        if chunker not in CHUNKERS:
+            raise ValueError(f"Invalid chunker. Must be one of {CHUNKERS}")
+        # "structure" packs whole tables and sub-sections into token-bounded chunks;
+        # "character" is the original fixed-size character splitter
+        if chunker == "structure":
+            self.text_splitter = StructuredChunker(table_format)
+        else:
+            self.text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=CHUNK_SIZE, 
+                chunk_overlap=CHUNK_OVERLAP, 
+                separators=[SEPARATOR], 
+                keep_separator=False
+            )
         self.document_id = document_id
+        # Raw HTML or a parsed CodebookIndex; passed through unchanged to the section extractor
         self.document_content = document_content
+        # Serialization used for tables in chunk text; recorded on every point
+        self.table_format = table_format
+        # With workers and a cached export on disk, sections are extracted in a process pool
+        self.extraction_workers = extraction_workers
+        self.document_path = document_path
+        # "chapter.section" -> {chapter_number, section_number, section_name, content_hash}
+        # for every section ingested by this instance; sections that are split but not
+        # stored yet wait in pending_sections (see commit_sections)
+        self.manifest: Dict[str, Dict] = {}
+        self.pending_sections: Dict[str, Dict] = {}
+        self.data_dir = data_dir
+        # Zone code vocabulary of the document; chunks are tagged with the codes they mention
+        self.zone_matcher = zone_code_matcher(zone_codes)
+        # Corpus store version of the document: sections are read from it when stored and
+        # written to it when they had to be extracted
+        self.corpus_document = corpus_document
+        # Workers per pipeline stage (see ingest_pipeline.DEFAULT_STAGE_WORKERS) and the
+        # capacity of the queues between stages
+        self.stage_workers = stage_workers
+        self.queue_size = queue_size
+        self._embedding_batcher = None
+        # Only embed and upsert chunks whose point ID is not in the collection yet, so an
+        # interrupted ingest can be resumed
+        self.skip_existing = skip_existing
+        # Concurrent upsert batches of the shared writer, and whether each waits to be applied
+        self.upsert_in_flight = upsert_in_flight
+        self.upsert_wait = upsert_wait
+        self._upsert_writer = None
+        # Storage layout of a collection this ingestor creates (see collection_profiles)
+        self.collection_profile = get_collection_profile(collection_profile)
+        self.existing_ids = set()
+        self.skipped_chunks = 0
 
-    @retry(
-        stop=stop_after_attempt(MAX_RETRY_ATTEMPTS),
-        wait=wait_exponential(multiplier=RETRY_MULTIPLIER, min=MIN_RETRY_WAIT, max=MAX_RETRY_WAIT),
-        retry=retry_if_exception_type(ResponseHandlingException)
-    )
-    async def _upsert_batch(self, batch: List[PointStruct]):
-        """Upsert a batch of points with retry logic."""
-        await self.async_client.upsert(
-            collection_name=self.document_id,
-            points=batch
-        )
-    
-    async def upsert_in_batches(self, points: List[PointStruct], batch_size: int = BATCH_SIZE):
-        """Upsert points in batches to avoid overloading the service."""
-        for batch in chunked(points, batch_size):
-            await self._upsert_batch(list(batch))
-    
-    async def process_section(self, section_info: Dict, extract_section_content) -> int:
-        """Process a single section from the document."""
-        if not self.document_content:
-            raise ValueError("HTML content must be loaded before processing sections")
-            
+    @property
+    def collection_name(self) -> str:
+        """The collection this document is written to: its own, or the shared one."""
+        return self.collection_for(self.document_id)
+
+    def split_section(self, section_info: Dict, content_dict: Dict) -> List[Dict]:
+        """
+        Split one extracted section into chunk payloads and hold its manifest entry
+        until its points are stored.
+
+        Returns:
+            list: One payload per chunk; empty if the section could not be extracted
+        """
         section_name = section_info['sectionName']
         section_number = section_info['sectionNumber']
         chapter_number = section_info['chapterNumber']
-        full_number = f"{chapter_number}.{section_number}"
 
-        content_dict = extract_section_content(self.document_content, full_number)
         if "error" in content_dict:
             print(f"Error extracting content: {content_dict['error']}")
-            return 0
+            return []
 
         content_text = content_dict["content"]
-        chunks = self.text_splitter.split_text(content_text)
-        if not chunks:
-            return 0
-        
-        thread_name = threading.current_thread().name
-        print(f"[{thread_name}] Starting section {chapter_number}.{section_number}")
-
-        embeddings = []
-        for batch in chunked(chunks, EMBEDDING_BATCH_SIZE):
-            batch_embeddings = await self.embeddings.aembed_documents(list(batch))
-            embeddings.extend(batch_embeddings)
-
-        payloads = [{
+        content_hash = section_content_hash(content_text)
+        # The sections this one cites; the manifest doubles as the document's reference graph
+        references = section_references(content_text, f"{chapter_number}.{section_number}")
+        self.pending_sections[f"{chapter_number}.{section_number}"] = {
+            "chapter_number": chapter_number,
+            "section_number": section_number,
+            "section_name": section_name,
+            "content_hash": content_hash,
+            "references": references
+        }
+        return [{
             "chapter_number": chapter_number,
             "section_name": section_name,
             "section_number": section_number,
+            "document_id": self.document_id,
+            "table_format": self.table_format,
+            "content_hash": content_hash,
+            "zone_codes": zone_codes_in_text(chunk, self.zone_matcher),
+            "references": references,
+            "chunk_index": chunk_index,
             "text": chunk
-        } for chunk in chunks]
+        } for chunk_index, chunk in enumerate(self.text_splitter.split_text(content_text))]
+
+    def commit_sections(self, full_numbers: List[str]):
+        """Move the manifest entries of sections whose points are stored out of pending_sections."""
+        for full_number in full_numbers:
+            if full_number in self.pending_sections:
+                self.manifest[full_number] = self.pending_sections.pop(full_number)
 
-        points = [
+    def missing_payloads(self, payloads: List[Dict]) -> List[Dict]:
+        """Drop the payloads whose points are already in the collection (see existing_point_ids)."""
+        missing = [p for p in payloads if chunk_point_id(self.document_id, p) not in self.existing_ids]
+        self.skipped_chunks += len(payloads) - len(missing)
+        return missing
+
+    async def existing_point_ids(self) -> set:
+        """Return the IDs of every point of the document, scrolled without payloads or vectors."""
+        ids = set()
+        offset = None
+        while True:
+            points, offset = await self.async_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self.scoped_filter(self.document_id),
+                limit=SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False
+            )
+            ids.update(str(point.id) for point in points)
+            if offset is None:
+                return ids
+
+    @property
+    def embedding_batcher(self) -> EmbeddingBatcher:
+        """The batcher all sections of this ingestor embed through, created on first use."""
+        if self._embedding_batcher is None:
+            self._embedding_batcher = EmbeddingBatcher(self.embeddings)
+        return self._embedding_batcher
+
+    @property
+    def upsert_writer(self) -> UpsertWriter:
+        """The writer all sections of this ingestor upsert through, created on first use."""
+        if self._upsert_writer is None:
+            self._upsert_writer = UpsertWriter(
+                self.async_client, self.collection_name, self.upsert_in_flight, self.upsert_wait
+            )
+        return self._upsert_writer
+
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed chunk texts in requests shared with the other sections being ingested."""
+        return await self.embedding_batcher.embed(texts)
+
+    def section_points(self, payloads: List[Dict], embeddings: List[List[float]]) -> List[PointStruct]:
+        """Pair chunk payloads with their embeddings."""
+        return [
             PointStruct(
-                id=str(uuid.uuid4()),
+                id=chunk_point_id(self.document_id, payload),
                 vector=embedding,
-                payload=payloads[i]
-            ) for i, embedding in enumerate(embeddings)
+                payload=payload
+            ) for payload, embedding in zip(payloads, embeddings)
         ]
 
-        await self.upsert_in_batches(points)
-        print(f"[{thread_name}] Finished section {section_info['chapterNumber']}.{section_info['sectionNumber']}")
-        return len(chunks)
-    
+    def ingest_pipeline(self, extract_section_content) -> IngestPipeline:
+        """Return a staged pipeline over this ingestor with its configured workers and queue size."""
+        return IngestPipeline(self, extract_section_content, self.stage_workers, self.queue_size)
+
     async def process_all_sections(self, sections_list: List[Dict], extract_section_content) -> int:
-        """Process all sections in the document asynchronously."""
-        print("Processing all sections asynchronously...")
-        tasks = [
-            self.process_section(section, extract_section_content)
-            for section in sections_list
-        ]
-        results = await asyncio.gather(*tasks)
-        return sum(results)
+        """
+        Ingest every section through the extract -> split -> embed -> upsert pipeline.
+
+        Sections are read from the corpus document when one is set and extracted in the
+        process pool when one is configured. With skip_existing, chunks whose points are
+        already in the collection are not embedded again.
+        """
+        if not self.document_content and self.corpus_document is None:
+            raise ValueError("HTML content must be loaded before processing sections")
+        print(f"Processing {len(sections_list)} sections...")
+        if self.skip_existing:
+            self.existing_ids = await self.existing_point_ids()
+        self.save_manifest(complete=False)
+        pipeline = self.ingest_pipeline(extract_section_content)
+        complete = False
+        try:
+            chunks = await pipeline.run(sections_list)
+            complete = True
+        finally:
+            # Only the sections that were stored; a failed one is ingested again by a sync
+            self.save_manifest(complete)
+            print(pipeline.format_stats())
+        if self.skip_existing:
+            print(f"Skipped {self.skipped_chunks} chunks already in {self.document_id}")
+        print(f"{self.embedding_batcher.request_count} embedding requests for {self.embedding_batcher.item_count} chunks, "
+              f"{self.upsert_writer.batch_count} upsert batches")
+        return chunks
+
+    def load_manifest(self) -> Optional[Dict[str, Dict]]:
+        """Read the local section manifest of the collection, or None if there is none."""
+        manifest = self.read_manifest(self.document_id)
+        return manifest.get("sections") if manifest else None
+
+    def save_manifest(self, complete: bool = True):
+        """
+        Write the sections ingested by this instance to the local manifest.
+
+        Args:
+            complete: False while an ingest is running or after it failed, so the
+                      extractor graph resumes it (see QdrantBase.ingest_unfinished)
+        """
+        path = manifest_path(self.document_id, self.data_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"document_id": self.document_id, "complete": complete, "sections": self.manifest}, f, indent=2)
+
+    async def indexed_sections(self) -> Dict[str, Dict]:
+        """
+        Return the sections currently in the collection, keyed by "chapter.section".
+
+        The local manifest is used when there is one; otherwise the section payloads
+        are scrolled from Qdrant. Points ingested before content hashes existed have
+        a content_hash of None, so they always count as changed.
+        """
+        manifest = self.load_manifest()
+        if manifest is not None:
+            return manifest
+
+        sections = {}
+        offset = None
+        while True:
+            points, offset = await self.async_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self.scoped_filter(self.document_id),
+                limit=SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=["chapter_number", "section_number", "section_name", "content_hash", "references"],
+                with_vectors=False
+            )
+            for point in points:
+                payload = point.payload or {}
+                full_number = f"{payload.get('chapter_number')}.{payload.get('section_number')}"
+                sections.setdefault(full_number, {
+                    "chapter_number": payload.get("chapter_number"),
+                    "section_number": payload.get("section_number"),
+                    "section_name": payload.get("section_name"),
+                    "content_hash": payload.get("content_hash"),
+                    "references": payload.get("references", [])
+                })
+            if offset is None:
+                return sections
+
+    async def delete_section_points(self, chapter_number: str, section_number: str, keep_hash: Optional[str] = None):
+        """
+        Delete the points of one section from the collection.
+
+        Args:
+            keep_hash: Keep the points of this content_hash, i.e. only delete the
+                       points of the section's other versions
+        """
+        await self.async_client.delete(
+            collection_name=self.collection_name,
+            points_selector=FilterSelector(filter=self.scoped_filter(self.document_id, Filter(
+                must=[
+                    FieldCondition(key="chapter_number", match=MatchValue(value=chapter_number)),
+                    FieldCondition(key="section_number", match=MatchValue(value=section_number))
+                ],
+                must_not=[FieldCondition(key="content_hash", match=MatchValue(value=keep_hash))] if keep_hash else None
+            )))
+        )
+
+    def extraction_pool(self):
+        """Open the extraction process pool when one is configured, else a context yielding None."""
+        if self.extraction_workers > 0 and self.document_path:
+            return create_extraction_pool(self.document_path, self.extraction_workers)
+        return contextlib.nullcontext()
+
+    async def extract_sections(self, section_numbers: List[str], extract_section_content, pool=None) -> List[Dict]:
+        """
+        Extract sections in order, in the extraction pool when one is configured.
+
+        With a corpus document, stored sections are read from the corpus and only the
+        missing ones are extracted, then stored for the next run.
+
+        Args:
+            pool: An open extraction pool to reuse; one is opened for this call otherwise
+        """
+        if self.corpus_document is not None:
+            stored = self.corpus_document.get_sections(section_numbers, self.table_format)
+            missing = [number for number in section_numbers if number not in stored]
+            if missing:
+                extracted = await self._extract_from_document(missing, extract_section_content, pool)
+                self.corpus_document.put_sections(extracted, self.table_format)
+                stored.update(zip(missing, extracted))
+            return [stored[number] for number in section_numbers]
+        return await self._extract_from_document(section_numbers, extract_section_content, pool)
+
+    async def _extract_from_document(self, section_numbers: List[str], extract_section_content, pool=None) -> List[Dict]:
+        """Extract sections from the document itself, in the extraction pool when one is configured."""
+        if pool is None and self.extraction_workers > 0 and self.document_path:
+            with self.extraction_pool() as pool:
+                return await self._extract_from_document(section_numbers, extract_section_content, pool)
+        if pool is not None:
+            loop = asyncio.get_running_loop()
+            batches = await asyncio.gather(*[
+                loop.run_in_executor(pool, extract_section_batch, list(batch), self.table_format)
+                for batch in chunked(section_numbers, EXTRACTION_BATCH_SIZE)
+            ])
+            return [content for batch in batches for content in batch]
+        # In a thread, so the embed and upsert stages keep running during extraction
+        return await asyncio.to_thread(lambda: [
+            extract_section_content(self.document_content, number, table_format=self.table_format)
+            for number in section_numbers
+        ])
+
+    async def sync_sections(self, sections_list: List[Dict], extract_section_content) -> Dict[str, int]:
+        """
+        Bring an existing collection up to date with a new version of the document.
+
+        Every requested section and every section already in the collection is
+        extracted and hashed. Only sections whose hash is new or different are
+        re-embedded; a changed section's old points are deleted once its new points
+        are stored, so a failed sync leaves the old version searchable. Sections no
+        longer in the document have their points deleted. Unchanged sections are not
+        touched.
+
+        Returns:
+            dict: Counts of "added", "changed", "removed" and "unchanged" sections, and
+                  the number of "chunks" embedded
+        """
+        indexed = await self.indexed_sections()
+        sections_by_number = {
+            f"{s['chapterNumber']}.{s['sectionNumber']}": s for s in sections_list
+        }
+        for full_number, entry in indexed.items():
+            sections_by_number.setdefault(full_number, {
+                "chapterNumber": entry["chapter_number"],
+                "sectionNumber": entry["section_number"],
+                "sectionName": entry["section_name"]
+            })
+
+        section_numbers = list(sections_by_number)
+        contents = await self.extract_sections(section_numbers, extract_section_content)
+
+        stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0, "chunks": 0}
+        changed_sections, changed_contents, replaced = [], [], {}
+        for full_number, content_dict in zip(section_numbers, contents):
+            section_info = sections_by_number[full_number]
+            if content_dict.get("section_title"):
+                section_info = {**section_info, "sectionName": content_dict["section_title"]}
+            previous = indexed.get(full_number)
+            if "error" in content_dict:
+                if previous is not None:
+                    await self.delete_section_points(previous["chapter_number"], previous["section_number"])
+                    stats["removed"] += 1
+                continue
+
+            content_hash = section_content_hash(content_dict["content"])
+            if previous is not None and previous.get("content_hash") == content_hash:
+                self.manifest[full_number] = previous
+                stats["unchanged"] += 1
+                continue
+
+            if previous is not None:
+                # Until the new version is stored, the manifest keeps the old one
+                self.manifest[full_number] = previous
+                replaced[full_number] = previous
+                stats["changed"] += 1
+            else:
+                stats["added"] += 1
+            changed_sections.append(section_info)
+            changed_contents.append(content_dict)
+
+        complete = False
+        try:
+            if changed_sections:
+                pipeline = self.ingest_pipeline(extract_section_content)
+                stats["chunks"] = await pipeline.run(changed_sections, changed_contents)
+                print(pipeline.format_stats())
+            complete = True
+        finally:
+            for full_number, previous in replaced.items():
+                entry = self.manifest[full_number]
+                if entry["content_hash"] != previous.get("content_hash"):
+                    await self.delete_section_points(entry["chapter_number"], entry["section_number"], entry["content_hash"])
+            self.save_manifest(complete)
+        print(f"Synced {self.document_id}: {stats}")
+        return stats
 
     async def create_empty_codebook(self) -> bool:
-        """Create a new codebook collection."""
+        """
+        Create a new codebook collection.
+
+        With a shared collection, it is created (with per-document HNSW) only if no
+        codebook has created it yet.
+        """
         try:
+            if self.shared_collection and await self.async_client.collection_exists(self.shared_collection):
+                return True
             await self.async_client.create_collection(
-                collection_name=self.document_id,
-                vectors_config=VectorParams(size=VECTOR_SIZE, distance=VECTOR_DISTANCE)
+                collection_name=self.collection_name,
+                **self.collection_profile.collection_config(
+                    VECTOR_SIZE, VECTOR_DISTANCE, multitenant=bool(self.shared_collection)
+                )
             )
+            # Keyword indexes so section and zone filters don't scan every payload
+            await self.create_payload_indexes(self.collection_name)
             return True
         except Exception as e:
             print(f"Error creating codebook: {e}")
@@ -5,8 +5,12 @@ from dotenv import load_dotenv
 from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
 import httpx
 from qdrant_client.http.exceptions import ResponseHandlingException
+from qdrant_client.http.models import Filter, FilterSelector, PointStruct
 
+from qdrant_wrapper.collection_profiles import DEFAULT_COLLECTION_PROFILE, get_collection_profile
 from qdrant_wrapper.qdrant_base import QdrantBase, DocumentStatus
+from src.utils.codebook_helpers import DEFAULT_TABLE_FORMAT, get_section_content
+from src.utils.corpus_store import CorpusStore
 
 # Load environment variables
 load_dotenv()
@@ -24,7 +28,9 @@ class QdrantRechunk(QdrantBase):
     )
     async def purge_collection(self, document_id: str) -> bool:
         """
-        Purge a collection from Qdrant.
+        Purge a collection from Qdrant, and the document's local section manifest.
+
+        With a shared collection, only the document's points are deleted.
         
         Args:
             document_id: The ID of the document/collection to purge
@@ -33,8 +39,17 @@ class QdrantRechunk(QdrantBase):
             bool: True if the collection was successfully purged, False otherwise
         """
         try:
+            if self.shared_collection:
+                await self.async_client.delete(
+                    collection_name=self.shared_collection,
+                    points_selector=FilterSelector(filter=self.scoped_filter(document_id))
+                )
+                self.remove_manifest(document_id)
+                print(f"Successfully purged {document_id} from {self.shared_collection}")
+                return True
             # Delete the collection
             await self.async_client.delete_collection(collection_name=document_id)
+            self.remove_manifest(document_id)
             print(f"Successfully purged collection {document_id}")
             return True
             
@@ -50,6 +65,9 @@ class QdrantRechunk(QdrantBase):
     async def clear_collection_points(self, document_id: str) -> bool:
         """
         Clear all points from a collection without deleting the collection itself.
+
+        The document's local section manifest is deleted too, so a later sync
+        re-ingests every section.
         
         Args:
             document_id: The ID of the document/collection to clear
@@ -58,6 +76,7 @@ class QdrantRechunk(QdrantBase):
             bool: True if the points were successfully cleared, False otherwise
         """
         try:
+            self.remove_manifest(document_id)
             # Check if collection exists first
             status = await self.document_exists_and_is_indexed(document_id)
             
@@ -69,10 +88,19 @@ class QdrantRechunk(QdrantBase):
                 print(f"Collection {document_id} is already empty.")
                 return True
                 
+            if self.shared_collection:
+                # Same as a purge: the shared collection stays for the other documents
+                await self.async_client.delete(
+                    collection_name=self.shared_collection,
+                    points_selector=FilterSelector(filter=self.scoped_filter(document_id))
+                )
+                print(f"Successfully cleared all points of {document_id} from {self.shared_collection}")
+                return True
+
             # Delete all points in the collection
             await self.async_client.delete(
                 collection_name=document_id,
-                points_selector=None  # None means delete all points
+                points_selector=FilterSelector(filter=Filter())  # An empty filter matches all points
             )
             print(f"Successfully cleared all points from collection {document_id}")
             return True
@@ -89,6 +117,9 @@ class QdrantRechunk(QdrantBase):
     async def purge_all_collections(self) -> bool:
         """
         Purge all collections from Qdrant.
+
+        The shared collection, if any, is dropped as a whole rather than per document;
+        per-document collections left from before it are dropped too.
         
         Returns:
             bool: True if all collections were successfully purged, False if any failed
@@ -107,8 +138,22 @@ class QdrantRechunk(QdrantBase):
             # Purge each collection
             results = []
             for collection_name in collections:
-                result = await self.purge_collection(collection_name)
-                results.append(result)
+                if collection_name == self.shared_collection:
+                    await self.async_client.delete_collection(collection_name=collection_name)
+                    self.remove_manifest()
+                    print(f"Successfully purged collection {collection_name}")
+                    results.append(True)
+                    continue
+                # A per-document collection, also in shared mode; purge_collection would
+                # only delete the document's points from the shared collection there
+                try:
+                    await self.async_client.delete_collection(collection_name=collection_name)
+                    self.remove_manifest(collection_name)
+                    print(f"Successfully purged collection {collection_name}")
+                    results.append(True)
+                except Exception as e:
+                    print(f"Error purging collection {collection_name}: {e}")
+                    results.append(False)
             
             # Return True only if all purges were successful
             return all(results)
@@ -125,6 +170,8 @@ class QdrantRechunk(QdrantBase):
     async def clear_all_collection_points(self) -> bool:
         """
         Clear all points from all collections without deleting the collections themselves.
+
+        Per-document collections are cleared in place, also alongside a shared collection.
         
         Returns:
             bool: True if all collections were successfully cleared, False if any failed
@@ -143,8 +190,28 @@ class QdrantRechunk(QdrantBase):
             # Clear each collection
             results = []
             for collection_name in collections:
-                result = await self.clear_collection_points(collection_name)
-                results.append(result)
+                if collection_name == self.shared_collection:
+                    # One delete for every document; an empty filter matches all points
+                    await self.async_client.delete(
+                        collection_name=collection_name,
+                        points_selector=FilterSelector(filter=Filter())
+                    )
+                    self.remove_manifest()
+                    print(f"Successfully cleared all points from collection {collection_name}")
+                    results.append(True)
+                    continue
+                # A per-document collection, cleared in place also in shared mode
+                try:
+                    await self.async_client.delete(
+                        collection_name=collection_name,
+                        points_selector=FilterSelector(filter=Filter())
+                    )
+                    self.remove_manifest(collection_name)
+                    print(f"Successfully cleared all points from collection {collection_name}")
+                    results.append(True)
+                except Exception as e:
+                    print(f"Error clearing points from collection {collection_name}: {e}")
+                    results.append(False)
             
             # Return True only if all clears were successful
             return all(results)
@@ -281,8 +348,133 @@ class QdrantRechunk(QdrantBase):
         print(f"- Total counties processed: {len(counties)}")
         print(f"- Successfully added: {successful_counties}")
         print(f"- Failed to add: {len(counties) - successful_counties}")
+        print(f"- Embedding cache: {self.embeddings.cache.stats()}")
         
         return result_summary 
+
+    async def migrate_payload_indexes(self, document_ids: Optional[list[str]] = None) -> dict:
+        """
+        Add the PAYLOAD_INDEXES that existing collections are missing.
+
+        Collections created before the section fields were indexed scan every payload
+        on section-filtered scrolls; indexing them needs no re-ingest.
+
+        Args:
+            document_ids: Collections to migrate; defaults to every collection. With a
+                          shared collection, the shared collection is migrated instead
+
+        Returns:
+            dict: Fields indexed per collection, or None where migration failed
+        """
+        if document_ids is None:
+            collections = await self.async_client.get_collections()
+            document_ids = [collection.name for collection in collections.collections]
+        else:
+            document_ids = list(dict.fromkeys(self.collection_for(document_id) for document_id in document_ids))
+        results = {}
+        for document_id in document_ids:
+            try:
+                results[document_id] = await self.create_payload_indexes(document_id)
+                print(f"Indexed {results[document_id] or 'nothing new'} in {document_id}")
+            except Exception as e:
+                print(f"Error indexing {document_id}: {e}")
+                results[document_id] = None
+        return results
+
+    async def move_to_shared_collection(self, document_ids: Optional[list[str]] = None,
+                                        collection_profile: str = DEFAULT_COLLECTION_PROFILE) -> dict:
+        """
+        Copy per-document collections into the shared collection, then delete them.
+
+        Points keep their IDs and vectors, so nothing is re-embedded; each payload gets
+        the document_id it is partitioned by. The shared collection is created with the
+        given profile if it does not exist yet.
+
+        Args:
+            document_ids: Collections to move; defaults to every collection but the shared one
+            collection_profile: Profile of the shared collection when it has to be created
+
+        Returns:
+            dict: Number of points moved per document_id, or None where the move failed
+        """
+        from qdrant_wrapper.qdrant_ingestor import SCROLL_PAGE_SIZE, VECTOR_DISTANCE, VECTOR_SIZE
+
+        if not self.shared_collection:
+            raise ValueError("QDRANT_SHARED_COLLECTION is not set")
+        if not await self.async_client.collection_exists(self.shared_collection):
+            await self.async_client.create_collection(
+                collection_name=self.shared_collection,
+                **get_collection_profile(collection_profile).collection_config(VECTOR_SIZE, VECTOR_DISTANCE, multitenant=True)
+            )
+        await self.create_payload_indexes(self.shared_collection)
+        if document_ids is None:
+            collections = await self.async_client.get_collections()
+            document_ids = [c.name for c in collections.collections if c.name != self.shared_collection]
+
+        results = {}
+        for document_id in document_ids:
+            try:
+                moved = 0
+                offset = None
+                while True:
+                    points, offset = await self.async_client.scroll(
+                        collection_name=document_id,
+                        limit=SCROLL_PAGE_SIZE,
+                        offset=offset,
+                        with_payload=True,
+                        with_vectors=True
+                    )
+                    if points:
+                        await self.async_client.upsert(collection_name=self.shared_collection, points=[
+                            PointStruct(id=p.id, vector=p.vector, payload={**(p.payload or {}), "document_id": document_id})
+                            for p in points
+                        ])
+                        moved += len(points)
+                    if offset is None:
+                        break
+                await self.async_client.delete_collection(collection_name=document_id)
+                results[document_id] = moved
+                print(f"Moved {moved} points of {document_id} to {self.shared_collection}")
+            except Exception as e:
+                print(f"Error moving {document_id} to {self.shared_collection}: {e}")
+                results[document_id] = None
+        return results
+
+    async def rechunk_from_corpus(self, document_ids: Optional[list[str]] = None,
+                                  table_format: str = DEFAULT_TABLE_FORMAT) -> dict:
+        """
+        Rebuild collections from the sections in the local corpus store.
+
+        Nothing is downloaded or parsed: the latest stored version of each document is
+        re-chunked and re-embedded from its stored section text.
+
+        Args:
+            document_ids: Documents to rebuild; defaults to every document in the store
+            table_format: Table serialization of the stored sections to ingest
+
+        Returns:
+            dict: Number of chunks ingested per document_id, or None for documents
+                  with no stored sections in that format
+        """
+        from qdrant_wrapper.qdrant_ingestor import QdrantIngestor
+
+        results = {}
+        with CorpusStore() as corpus:
+            for document_id in document_ids or corpus.documents():
+                document = corpus.document(document_id, table_format=table_format)
+                sections = document.sections() if document else []
+                if not sections:
+                    print(f"No {table_format} sections of {document_id} in the corpus store. Skipping.")
+                    results[document_id] = None
+                    continue
+
+                await self.purge_collection(document_id)
+                ingestor = QdrantIngestor(document_id, document, table_format=table_format, corpus_document=document)
+                await ingestor.create_empty_codebook()
+                results[document_id] = await ingestor.process_all_sections(sections, get_section_content)
+                print(f"Rechunked {document_id} version {document.version}: {results[document_id]} chunks")
+        print(f"Embedding cache: {self.embeddings.cache.stats()}")
+        return results
     
 
 if __name__ == "__main__":
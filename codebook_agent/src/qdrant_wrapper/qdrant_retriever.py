@@ -11,6 +11,7 @@ from langchain_core.runnables import RunnablePassthrough
 from qdrant_client.http.models import Filter, FieldCondition, MatchValue
 from langchain_qdrant import QdrantVectorStore
 
+from qdrant_wrapper.collection_profiles import search_params_for
 from qdrant_wrapper.qdrant_base import QdrantBase, DocumentStatus
 from qdrant_wrapper.rag_strategies import RetrievalStrategy, SectionBasedRetrieval
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
@@ -30,7 +31,7 @@ STANDARD_QUERY_PROMPT = """Answer the question based only on the following conte
 class QdrantRetriever(QdrantBase):
     """Class for retrieving and querying documents from Qdrant."""
     
-    def __init__(self, document_id: str = None):
+    def __init__(self, document_id: str = None, expand_references: bool = False):
         super().__init__()
         
         if not os.getenv("OPENAI_API_KEY"):
@@ -41,6 +42,8 @@ class QdrantRetriever(QdrantBase):
             raise ValueError("document_id is not set")
     
         self.document_id = document_id
+        # Add the sections cited by retrieved sections to the context (one hop)
+        self.expand_references = expand_references
         # Initialize LLMs for query processing
         self.openai_llm = ChatOpenAI(
             temperature=0,
@@ -64,16 +67,21 @@ class QdrantRetriever(QdrantBase):
             raise ValueError("Codebook is not indexed. Cannot retrieve from codebook")
             
         # Initialize the default retrieval strategy
+        collection_name = self.collection_for(self.document_id)
         self.retrieval_strategy = SectionBasedRetrieval(
             client=self.client,
-            collection_name=self.document_id
+            collection_name=collection_name,
+            expand_references=self.expand_references,
+            document_id=self.document_id if self.shared_collection else None
         )
 
+        # Quantized collections (see collection_profiles) rescore with the original vectors
+        collection_info = await self.async_client.get_collection(collection_name=collection_name)
         self.retriever = QdrantVectorStore(
             client=self.client,
-            collection_name=self.document_id,
+            collection_name=collection_name,
             embedding=self.embeddings,
-        ).as_retriever(search_kwargs={"k": DEFAULT_RETRIEVAL_K})
+        ).as_retriever(search_kwargs={"k": DEFAULT_RETRIEVAL_K, "search_params": search_params_for(collection_info)})
         return self
     
     async def get_chunks_by_section(self, section_number: str) -> List[Dict]:
@@ -87,8 +95,8 @@ class QdrantRetriever(QdrantBase):
             ]
         )
         result, _ = await self.async_client.scroll(
-            collection_name=self.document_id,
-            scroll_filter=filter_,
+            collection_name=self.collection_for(self.document_id),
+            scroll_filter=self.scoped_filter(self.document_id, filter_),
             limit=SCROLL_LIMIT,
             with_payload=True
         )
@@ -99,9 +107,10 @@ class QdrantRetriever(QdrantBase):
     wait=wait_fixed(60),
         retry=retry_if_exception_type((httpx.ConnectTimeout, ResponseHandlingException))
     )
-    async def send_query(self, question: str, structured_output, custom_prompt: str = None, model_name: str = OPENAI_MODEL):
+    async def send_query(self, question: str, structured_output, custom_prompt: str = None, model_name: str = OPENAI_MODEL,
+                         zone_code: str = None):
         """Query the codebook with a question and return structured output."""
-        rag_result = self.retrieval_strategy.retrieve(self.retriever, question)
+        rag_result = self.retrieval_strategy.retrieve(self.retriever, question, zone_code=zone_code)
         raw_context = rag_result['raw_content']
         chunks = rag_result['chunks']
         section_list = rag_result['section_list']
@@ -134,14 +143,17 @@ class QdrantRetriever(QdrantBase):
         return result
     
     ## you can also change this to take a list of structured outputs.
-    async def execute_queries_in_parallel(self, questions: List[str], structured_output) -> List[Tuple[Any, Dict]]:
+    async def execute_queries_in_parallel(self, questions: List[str], structured_output,
+                                          zone_code: str = None) -> List[Tuple[Any, Dict]]:
         """
         Execute multiple queries in parallel and return all results when complete.
+
+        With a zone_code, retrieval is restricted to chunks about that zone or about no zone.
         """
         # Create a task for each query
         tasks = []
         for question in questions:
-            task = self.send_query(question, structured_output)
+            task = self.send_query(question, structured_output, zone_code=zone_code)
             tasks.append(task)
         
         # Wait for all tasks to complete
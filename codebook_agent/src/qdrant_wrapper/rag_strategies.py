@@ -1,14 +1,58 @@
-from typing import Dict, Any, Protocol
-from qdrant_client.http.models import Filter, FieldCondition, MatchValue
+from collections import Counter
+from typing import Dict, Any, Optional, Protocol
+from qdrant_client.http.models import Filter, FieldCondition, MatchValue, MatchAny, IsEmptyCondition, PayloadField
+
+from src.utils.zone_codes import normalize_zone_code
 
 # Configuration constants
 SECTION_RETRIEVAL_LIMIT = 5
 SCROLL_LIMIT = 100
+# Most referenced sections added to the context by one expansion hop
+REFERENCE_EXPANSION_LIMIT = 5
+
+def zone_filter(zone_code: str) -> Filter:
+    """
+    Restrict a search to chunks that mention the zone code or mention no zone at all.
+
+    Chunks ingested before zone tagging have no zone_codes field and also match.
+    """
+    return Filter(
+        should=[
+            FieldCondition(key="zone_codes", match=MatchAny(any=[normalize_zone_code(zone_code)])),
+            IsEmptyCondition(is_empty=PayloadField(key="zone_codes"))
+        ]
+    )
+
+def section_filter(chapter_number: str, section_number: str) -> Filter:
+    """Select every chunk of one section."""
+    return Filter(
+        must=[
+            FieldCondition(
+                key="chapter_number",
+                match=MatchValue(value=chapter_number)
+            ),
+            FieldCondition(
+                key="section_number",
+                match=MatchValue(value=section_number)
+            )
+        ]
+    )
+
+def document_filter(filter_: Optional[Filter], document_id: Optional[str]) -> Optional[Filter]:
+    """
+    Restrict a filter to the points of one document in a shared collection.
+
+    Returns the filter unchanged when document_id is None (one collection per document).
+    """
+    if document_id is None:
+        return filter_
+    condition = FieldCondition(key="document_id", match=MatchValue(value=document_id))
+    return Filter(must=[condition] if filter_ is None else [condition, filter_])
 
 class RetrievalStrategy(Protocol):
     """Protocol defining the interface for document retrieval strategies."""
     
-    def retrieve(self, retriever: Any, query: str) -> Dict[str, Any]:
+    def retrieve(self, retriever: Any, query: str, zone_code: Optional[str] = None) -> Dict[str, Any]:
         """Retrieve relevant content based on the query."""
         ...
 
@@ -20,12 +64,17 @@ class SectionBasedRetrieval:
     the complete context of a section is important for accurate interpretation.
     """
     
-    def __init__(self, client, collection_name, section_limit=SECTION_RETRIEVAL_LIMIT):
+    def __init__(self, client, collection_name, section_limit=SECTION_RETRIEVAL_LIMIT,
+                 expand_references=False, reference_limit=REFERENCE_EXPANSION_LIMIT, document_id=None):
         self.client = client
         self.collection_name = collection_name
+        # Set when the collection is shared by every codebook; all searches are scoped to it
+        self.document_id = document_id
         self.section_limit = section_limit
+        self.expand_references = expand_references
+        self.reference_limit = reference_limit
     
-    def retrieve(self, retriever, query: str) -> Dict[str, Any]:
+    def retrieve(self, retriever, query: str, zone_code: Optional[str] = None) -> Dict[str, Any]:
         """
         Retrieve all chunks from sections identified by the initial query.
         
@@ -35,13 +84,27 @@ class SectionBasedRetrieval:
         2. Identifies which sections those chunks belong to
         3. Retrieves ALL chunks from those sections
         
-        This ensures complete context at the section level.
+        This ensures complete context at the section level. With a zone_code, the
+        initial search only considers chunks about that zone or about no zone, and is
+        repeated without the zone filter if that finds nothing. With
+        expand_references, the sections cited by the hits ("see § 154.032") are added
+        too, read from the references payload written at ingest rather than searched.
         """
         # Initialize unique sections set
         unique_sections = set()
+        cited_sections = []
 
         # Get initial search results
-        search_docs = retriever.invoke(query)
+        search_filter = document_filter(zone_filter(zone_code) if zone_code else None, self.document_id)
+        if search_filter is not None:
+            search_docs = retriever.invoke(query, filter=search_filter)
+        else:
+            search_docs = retriever.invoke(query)
+        if zone_code and not search_docs:
+            # The zone may be missing from the ingest vocabulary, so no chunk is tagged with it
+            print(f"No chunks for zone {zone_code}; searching without the zone filter")
+            unzoned_filter = document_filter(None, self.document_id)
+            search_docs = retriever.invoke(query, filter=unzoned_filter) if unzoned_filter else retriever.invoke(query)
         doc_ids = [doc.metadata.get("_id") for doc in search_docs if doc.metadata.get("_id")]
         all_points = []
         
@@ -61,20 +124,10 @@ class SectionBasedRetrieval:
                         if chapter is not None and section is not None:
                             # Add to unique sections
                             unique_sections.add(f"{chapter}.{section}")
+                            cited_sections.extend(point[0].payload.get("references") or [])
                         
                             # Create filter to get chunks from the same section
-                            filter_ = Filter(
-                                must=[
-                                    FieldCondition(
-                                        key="chapter_number",
-                                        match=MatchValue(value=chapter)
-                                    ),
-                                    FieldCondition(
-                                        key="section_number",
-                                        match=MatchValue(value=section)
-                                    )
-                                ]
-                            )
+                            filter_ = document_filter(section_filter(chapter, section), self.document_id)
                             
                             # Get all chunks from this section (limited by section_limit)
                             section_points, _ = self.client.scroll(
@@ -90,6 +143,9 @@ class SectionBasedRetrieval:
                 except Exception as e:
                     print(f"Error retrieving document {doc_id}: {e}")
         
+        if self.expand_references:
+            all_points.extend(self._referenced_points(cited_sections, unique_sections))
+        
         # Process the retrieved content
         context_texts = [doc.page_content for doc in search_docs if doc.page_content]
         
@@ -120,4 +176,42 @@ class SectionBasedRetrieval:
             "chunks": chunks,
             "raw_content": combined_context,
             "section_list": section_list
-        }
\ No newline at end of file
+        }
+
+    def _referenced_points(self, cited_sections, unique_sections):
+        """
+        Fetch the chunks of sections cited by the hits, one hop deep.
+
+        Sections cited by more hits come first; ties keep first-cited order.
+
+        Args:
+            cited_sections (list): "chapter.section" numbers from the hits' references
+            unique_sections (set): Sections already retrieved; cited ones found are added
+
+        Returns:
+            list: Points of up to reference_limit most cited sections
+        """
+        points = []
+        expanded = 0
+        for reference, _ in Counter(cited_sections).most_common():
+            if expanded >= self.reference_limit:
+                break
+            if reference in unique_sections or "." not in reference:
+                continue
+            chapter, section = reference.split(".", 1)
+            try:
+                section_points, _ = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=document_filter(section_filter(chapter, section), self.document_id),
+                    limit=self.section_limit,
+                    with_payload=True
+                )
+            except Exception as e:
+                print(f"Error retrieving referenced section {reference}: {e}")
+                continue
+            if section_points:
+                print(f"Found {len(section_points)} points in referenced section {reference}")
+                unique_sections.add(reference)
+                points.extend(section_points)
+                expanded += 1
+        return points
@@ -0,0 +1,105 @@
+"""
+Pipelined upserts shared by every section of an ingest.
+
+Points are collected into batches sized by their encoded bytes rather than a fixed
+count, and up to max_in_flight batches are sent at once, so writes overlap with
+embedding instead of each section waiting for its own upsert. With wait=False, Qdrant
+acknowledges batches before applying them; flush then re-sends the last batch with
+wait=True as a barrier, since a collection applies its updates in order.
+"""
+import asyncio
+import json
+from typing import List
+
+from qdrant_client.http.exceptions import ResponseHandlingException
+from qdrant_client.http.models import PointStruct
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+UPSERT_IN_FLIGHT = 4
+# Qdrant rejects requests over 32 MB by default
+MAX_BATCH_BYTES = 8 * 1024 * 1024
+MAX_BATCH_POINTS = 256
+# A float written as JSON text, e.g. "-0.012345678,"
+VECTOR_VALUE_BYTES = 14
+MAX_RETRY_ATTEMPTS = 5
+
+
+def point_bytes(point: PointStruct) -> int:
+    """Estimate the request bytes of a point: its JSON payload and its vector as JSON numbers."""
+    vector = point.vector if isinstance(point.vector, list) else []
+    return len(json.dumps(point.payload, ensure_ascii=False).encode("utf-8")) + len(vector) * VECTOR_VALUE_BYTES
+
+
+class UpsertWriter:
+    """Batch points by size and keep a bounded number of upserts in flight."""
+
+    def __init__(self, client, collection_name: str, max_in_flight: int = UPSERT_IN_FLIGHT,
+                 wait: bool = True, max_batch_bytes: int = MAX_BATCH_BYTES, max_batch_points: int = MAX_BATCH_POINTS):
+        self.client = client
+        self.collection_name = collection_name
+        self.wait = wait
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_points = max_batch_points
+        self._window = asyncio.Semaphore(max_in_flight)
+        self._pending = []
+        self._pending_bytes = 0
+        self._requests = set()
+        self._errors = []
+        self._last_batch = None
+        self.batch_count = 0
+        self.point_count = 0
+
+    async def write(self, points: List[PointStruct]):
+        """Add points to the current batch; waits only while the in-flight window is full."""
+        for point in points:
+            size = point_bytes(point)
+            if self._pending and (len(self._pending) >= self.max_batch_points
+                                  or self._pending_bytes + size > self.max_batch_bytes):
+                await self._dispatch()
+            self._pending.append(point)
+            self._pending_bytes += size
+
+    async def flush(self):
+        """
+        Send the last partial batch and wait until every point written so far is stored.
+
+        Raises:
+            RuntimeError: If any batch failed after its retries
+        """
+        if self._pending:
+            await self._dispatch()
+        if self._requests:
+            await asyncio.gather(*self._requests)
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise RuntimeError(f"{len(errors)} upsert batches to {self.collection_name} failed: {errors[0]}") from errors[0]
+        if not self.wait and self._last_batch is not None:
+            await self._upsert(self._last_batch, True)
+        self._last_batch = None
+
+    async def _dispatch(self):
+        batch, self._pending, self._pending_bytes = self._pending, [], 0
+        await self._window.acquire()
+        request = asyncio.create_task(self._send(batch))
+        self._requests.add(request)
+        request.add_done_callback(self._requests.discard)
+
+    async def _send(self, batch):
+        try:
+            await self._upsert(batch, self.wait)
+            self._last_batch = batch
+            self.batch_count += 1
+            self.point_count += len(batch)
+        except Exception as e:
+            print(f"Error upserting {len(batch)} points to {self.collection_name}: {e}")
+            self._errors.append(e)
+        finally:
+            self._window.release()
+
+    @retry(
+        stop=stop_after_attempt(MAX_RETRY_ATTEMPTS),
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        retry=retry_if_exception_type(ResponseHandlingException)
+    )
+    async def _upsert(self, batch, wait):
+        await self.client.upsert(collection_name=self.collection_name, points=batch, wait=wait)
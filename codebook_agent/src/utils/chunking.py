@@ -0,0 +1,184 @@
+"""
+Structure-aware chunking of section text, measured in embedding tokens.
+
+Section text (see render_section_text) is a title line followed by paragraphs, with
+tables set apart by blank lines. The chunker splits it into units (whole tables, and
+lettered sub-sections together with their numbered items) and packs whole units into
+chunks of at most max_tokens. A unit is only split when it alone is over the budget:
+tables between rows, with the header repeated in every part, and paragraphs between
+lines, then words. Every chunk starts with the section title.
+"""
+import csv
+import re
+from typing import Callable, List, Optional
+
+import tiktoken
+
+from src.utils.codebook_helpers import DEFAULT_TABLE_FORMAT
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+# About the size of the 8,000-character chunks of the character splitter
+CHUNK_TOKENS = 2000
+SECTION_SEPARATOR = "块"
+BLOCK_SEPARATOR_PATTERN = re.compile(r"\n{2,}")
+# "(A) ..." starts a sub-section; "(1) ...", "(a) ...", "(iv) ..." items belong to it
+SUBSECTION_PATTERN = re.compile(r"^\([A-Z]\)")
+NESTED_ITEM_PATTERN = re.compile(r"^\((?:\d{1,2}|[a-z]|[ivx]+)\)")
+PRETTY_BORDER_PATTERN = re.compile(r"^\+[-+]+\+$")
+PIPE_RULE_PATTERN = re.compile(r"^\|(?:---\|)+$")
+# Leading and trailing lines of a serialized table that every part of it repeats
+TABLE_HEADER_LINES = {"pretty": 3, "pipe": 2, "csv": 1, "zone_rows": 1}
+TABLE_FOOTER_LINES = {"pretty": 1, "pipe": 0, "csv": 0, "zone_rows": 0}
+# Used when the tokenizer's vocabulary can't be downloaded
+CHARS_PER_TOKEN = 4
+
+_encodings = {}
+
+
+def token_length(text: str, model: str = EMBEDDING_MODEL) -> int:
+    """Return the number of embedding tokens of a text."""
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except Exception as e:
+            print(f"Could not load the {model} tokenizer, estimating token counts from length: {e}")
+            _encodings[model] = None
+    encoding = _encodings[model]
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def is_table_block(lines: List[str], table_format: str = DEFAULT_TABLE_FORMAT) -> bool:
+    """Return True if the lines of a blank-line-delimited block are a table serialized in table_format."""
+    if len(lines) < 2:
+        return False
+    if table_format == "pretty":
+        return bool(PRETTY_BORDER_PATTERN.match(lines[0]) and PRETTY_BORDER_PATTERN.match(lines[-1]))
+    if table_format == "pipe":
+        return all(line.startswith("|") for line in lines) and bool(PIPE_RULE_PATTERN.match(lines[1]))
+    if table_format == "csv":
+        widths = {len(row) for row in csv.reader(lines)}
+        return len(widths) == 1 and widths.pop() > 1
+    if table_format == "zone_rows":
+        return " | " in lines[0]
+    return False
+
+
+class TableUnit:
+    """A serialized table: header lines, row lines and footer lines."""
+
+    def __init__(self, lines: List[str], table_format: str):
+        header_size = TABLE_HEADER_LINES[table_format]
+        footer_size = TABLE_FOOTER_LINES[table_format]
+        self.header = lines[:header_size]
+        self.rows = lines[header_size:len(lines) - footer_size]
+        self.footer = lines[len(lines) - footer_size:] if footer_size else []
+
+    def text(self, rows: Optional[List[str]] = None) -> str:
+        return "\n".join(self.header + (self.rows if rows is None else rows) + self.footer)
+
+
+class StructuredChunker:
+    """Split section text into token-bounded chunks without breaking tables or sub-sections."""
+
+    def __init__(self, table_format: str = DEFAULT_TABLE_FORMAT, max_tokens: int = CHUNK_TOKENS,
+                 length_function: Callable[[str], int] = token_length):
+        self.table_format = table_format
+        self.max_tokens = max_tokens
+        self.length_function = length_function
+
+    def section_units(self, text: str):
+        """
+        Split section text into its title and structural units.
+
+        Returns:
+            tuple: (title, units) where units are TableUnit objects and paragraph strings
+        """
+        text = text.rstrip()
+        if text.endswith(SECTION_SEPARATOR):
+            text = text[:-len(SECTION_SEPARATOR)]
+        title, _, body = text.partition("\n")
+        units = []
+        for block in BLOCK_SEPARATOR_PATTERN.split(body):
+            lines = [line for line in block.split("\n") if line.strip()]
+            if not lines:
+                continue
+            if is_table_block(lines, self.table_format):
+                units.append(TableUnit(lines, self.table_format))
+                continue
+            for line in lines:
+                if units and isinstance(units[-1], str) and NESTED_ITEM_PATTERN.match(line.lstrip()) \
+                        and SUBSECTION_PATTERN.match(units[-1]):
+                    units[-1] += "\n" + line
+                else:
+                    units.append(line)
+        return title.strip(), units
+
+    def split_text(self, text: str) -> List[str]:
+        """Split one section's text into chunks, each starting with the section title."""
+        title, units = self.section_units(text)
+        if not units:
+            return [title] if title else []
+        budget = max(self.max_tokens - self.length_function(title), 1)
+
+        chunks = []
+        parts, used = [], 0
+        for unit in units:
+            is_table = isinstance(unit, TableUnit)
+            for piece in self._fit(unit, budget):
+                size = self.length_function(piece)
+                if parts and used + size > budget:
+                    chunks.append(self._join(title, parts))
+                    parts, used = [], 0
+                parts.append((piece, is_table))
+                used += size
+        chunks.append(self._join(title, parts))
+        return chunks
+
+    def _fit(self, unit, budget):
+        """Return the pieces of a unit: the unit itself if it fits, else parts that each fit where possible."""
+        if isinstance(unit, TableUnit):
+            text = unit.text()
+            if self.length_function(text) <= budget:
+                return [text]
+            # Each part repeats the header; a single row over the budget stays whole
+            overhead = self.length_function(unit.text([]))
+            pieces, rows, used = [], [], overhead
+            for row in unit.rows:
+                size = self.length_function(row) + 1
+                if rows and used + size > budget:
+                    pieces.append(unit.text(rows))
+                    rows, used = [], overhead
+                rows.append(row)
+                used += size
+            pieces.append(unit.text(rows))
+            return pieces
+        if self.length_function(unit) <= budget:
+            return [unit]
+        pieces = []
+        for line in unit.split("\n"):
+            pieces.extend([line] if self.length_function(line) <= budget else self._split_words(line, budget))
+        return pieces
+
+    def _split_words(self, text, budget):
+        pieces, words, used = [], [], 0
+        for word in text.split(" "):
+            size = self.length_function(word) + 1
+            if words and used + size > budget:
+                pieces.append(" ".join(words))
+                words, used = [], 0
+            words.append(word)
+            used += size
+        pieces.append(" ".join(words))
+        return pieces
+
+    @staticmethod
+    def _join(title, parts):
+        # Tables keep a blank line on either side, as in the section text
+        text = title
+        previous_table = False
+        for part, is_table in parts:
+            text += ("\n\n" if is_table or previous_table else "\n") + part
+            previous_table = is_table
+        return text
@@ -1,25 +1,84 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag, NavigableString, CData
+import os
 import re
+import csv
+import json
 import math
-from io import StringIO
+import mmap
+import hashlib
+import html as html_lib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO, BytesIO
 import pandas as pd
+from lxml import etree
 from tabulate import tabulate
 
-def parse_table(table_element, output_dir="./tables"):
+from src.utils.table_store import get_default_table_store
+
+SECTION_SELECTOR = '.Section.toc-destination.rbox, .Section.rbox, .rbox.Section'
+SECTION_PATTERN = re.compile(r"§\s*(\d+)\.(\d+)\s*(.*)")
+# "§ 154.032", "§§ 154.030 through 154.035", "§ 154.032(B)"; every number of a list is a reference
+SECTION_REFERENCE_PATTERN = re.compile(r"§+\s*(\d+\.\d+(?:(?:\s*(?:,|;|and|or|through|to|-|–)\s*)+\d+\.\d+)*)")
+SECTION_NUMBER_PATTERN = re.compile(r"\d+\.\d+")
+CHAPTER_PATTERN = re.compile(r"CHAPTER\s+(\d+):\s*(.*)", re.IGNORECASE)
+INDEX_CACHE_SIZE = 4
+
+# Parser backends: two BeautifulSoup tree builders, and a streaming lxml mode that never
+# holds more than the current section in memory (only usable through iter_section_records)
+PARSER_BACKENDS = ["html.parser", "lxml", "lxml-stream"]
+DEFAULT_PARSER_BACKEND = "html.parser"
+STREAM_PARSER_BACKEND = "lxml-stream"
+RBOX_KINDS = ["Title", "Chapter", "Section"]
+HEADING_SELECTOR = ', '.join(f'.{kind}.rbox' for kind in RBOX_KINDS)
+BLOCK_TAGS = ['div', 'p', 'ul', 'ol', 'table']
+
+# Table engines for normalize_table, and the pandas.read_html conventions the grid
+# engine reproduces (missing-value strings, thousands separators, number syntax)
+TABLE_ENGINES = ["grid", "pandas"]
+DEFAULT_TABLE_ENGINE = "grid"
+# How tables are serialized into section text. "pretty" is the bordered tabulate
+# layout; "pipe" and "csv" drop the padding; "zone_rows" writes one
+# "row label: column=value; ..." line per row, keyed by the column headers (zones)
+TABLE_FORMATS = ["pretty", "pipe", "csv", "zone_rows"]
+DEFAULT_TABLE_FORMAT = "pretty"
+TABLE_NA_VALUES = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+}
+TABLE_BOOL_VALUES = {'True', 'TRUE', 'true', 'False', 'FALSE', 'false'}
+TABLE_SPECIAL_FLOATS = {'inf', 'infinity'}
+TABLE_WHITESPACE_PATTERN = re.compile(r"[\r\n]+|\s{2,}")
+TABLE_THOUSANDS_PATTERN = re.compile(r"^[\-\+]?([0-9]+,|[0-9])*(\.[0-9]*)?([0-9]?(E|e)\-?[0-9]+)?$")
+TABLE_INTEGER_PATTERN = re.compile(r"^[\-\+]?[0-9]+$")
+TABLE_FLOAT_PATTERN = re.compile(r"^[\-\+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][\-\+]?[0-9]+)?$")
+
+# Local cache of downloaded codebook exports and their byte-offset sidecars
+CODEBOOK_DATA_DIR = os.getenv("CODEBOOK_DATA_DIR", "./codebook_data")
+OFFSET_INDEX_SUFFIX = ".offsets.json"
+OFFSET_INDEX_VERSION = 1
+# Sections extracted per task when extraction runs in a process pool
+EXTRACTION_BATCH_SIZE = 16
+# Bump when get_section_content or a table serialization changes its output, so
+# section text stored by an older extractor (see corpus_store) is not served again
+SECTION_EXTRACTOR_VERSION = 1
+DIV_TAG_PATTERN = re.compile(rb'<(/?)div\b([^>]*)>', re.IGNORECASE)
+CLASS_ATTR_PATTERN = re.compile(rb'class\s*=\s*(["\'])(.*?)\1', re.IGNORECASE | re.DOTALL)
+MARKUP_PATTERN = re.compile(rb'<!--.*?-->|<[^>]*>', re.DOTALL)
+BODY_CLOSE_PATTERN = re.compile(rb'</body\s*>', re.IGNORECASE)
+
+def parse_table(table_element, store=None):
     """
     Parse an HTML table into a structured format that's easily readable by LLMs.
     
     Args:
         table_element: A BeautifulSoup table element
-        output_dir: Directory to save the parsed table
+        store (TableStore, optional): Store the parsed table is added to; defaults to
+                                      the process-wide store (see get_default_table_store)
         
     Returns:
-        A dictionary containing the structured table data
+        A dictionary containing the structured table data, with its store key as "table_id"
     """
-    import os
-    import json
-    import uuid
-    
     # Extract all rows
     rows = table_element.find_all('tr')
     if not rows:
@@ -81,23 +140,321 @@ def parse_table(table_element, output_dir="./tables"):
         }
     }
     
-    # Save to file
-    filename = f"table_{uuid.uuid4().hex[:8]}.json"
-    filepath = os.path.join(output_dir, filename)
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Write to file
+    # Identical tables share one key, so repeats are stored once
+    if store is None:
+        store = get_default_table_store()
+    table_id = store.put(result)
+    return {**result, "table_id": table_id}
+
+def _table_cell_text(cell):
+    """
+    Return a cell's text the way pandas.read_html sees it.
+
+    <br> tags become line breaks, then line breaks and whitespace runs collapse to a
+    single space.
+    """
+    parts = []
+    for descendant in cell.descendants:
+        if isinstance(descendant, Tag):
+            if descendant.name == 'br':
+                parts.append("\n")
+        elif type(descendant) in (NavigableString, CData):
+            parts.append(descendant)
+    return TABLE_WHITESPACE_PATTERN.sub(" ", "".join(parts).strip())
+
+def _table_text_rows(rows):
+    """Expand colspan and rowspan of a list of <tr> elements into rows of cell text."""
+    all_texts = []
+    remainder = []  # (column index, text, rows left) carried down by rowspans
+
+    for tr in rows:
+        texts = []
+        next_remainder = []
+        index = 0
+        for td in _child_tags(tr, ('td', 'th')):
+            while remainder and remainder[0][0] <= index:
+                prev_i, prev_text, prev_rowspan = remainder.pop(0)
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+                index += 1
+
+            text = _table_cell_text(td)
+            rowspan = int(td.get('rowspan') or 1)
+            colspan = int(td.get('colspan') or 1)
+            for _ in range(colspan):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+
+        for prev_i, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+        all_texts.append(texts)
+        remainder = next_remainder
+
+    # Rows that only exist because an earlier rowspan runs past the last <tr>
+    while remainder:
+        next_remainder = []
+        texts = []
+        for prev_i, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+        all_texts.append(texts)
+        remainder = next_remainder
+
+    return all_texts
+
+def _child_tags(element, names):
+    """Return the direct children of an element whose tag name is in names."""
+    return [child for child in element.children if isinstance(child, Tag) and child.name in names]
+
+def _table_grid(table):
+    """
+    Build the expanded cell grid of a table the way pandas.read_html lays it out.
+
+    Args:
+        table: BeautifulSoup <table> element
+
+    Returns:
+        tuple: (header_row_count, rows) where rows is a rectangular list of cell texts,
+               or None if the table has a shape only pandas.read_html handles exactly
+    """
+    if table.get('style'):
+        return None
+
+    # One walk over the table instead of a find_all per row group
+    theads, tbodies = [], []
+    for element in table.descendants:
+        if not isinstance(element, Tag):
+            continue
+        if element.name in ('table', 'style', 'tfoot') or element.get('style'):
+            return None
+        if element.name == 'thead':
+            theads.append(element)
+        elif element.name == 'tbody':
+            tbodies.append(element)
+
+    header_rows = []
+    for thead in theads:
+        header_rows.extend(_child_tags(thead, ('tr',)))
+        if _child_tags(thead, ('td', 'th')):
+            return None
+    body_rows = [tr for tbody in tbodies for tr in tbody.descendants if isinstance(tr, Tag) and tr.name == 'tr']
+    body_rows += _child_tags(table, ('tr',))
+    if not header_rows:
+        while body_rows and all(td.name == 'th' for td in _child_tags(body_rows[0], ('td', 'th'))):
+            header_rows.append(body_rows.pop(0))
+
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
-        print(f"Table saved to {filepath}")
-    except Exception as e:
-        print(f"Error saving table to file: {e}")
-        
-    return result
+        # Head and body are expanded separately, so a rowspan never crosses into the body
+        head = _table_text_rows(header_rows)
+        rows = head + _table_text_rows(body_rows)
+    except ValueError:
+        return None
+    width = max((len(row) for row in rows), default=0)
+    if width < 2 or not any(text for row in rows for text in row):
+        return None
+    for row in rows:
+        row.extend([""] * (width - len(row)))
+    return len(head), rows
+
+def table_cell_grid(table_element):
+    """
+    Return every row of a table, header rows included, as a rectangular list of cell texts.
+
+    Spanned cells are repeated across the rows and columns they cover. Unlike
+    table_rows, no row is dropped, so the grid keeps the table's column structure.
+
+    Args:
+        table_element: BeautifulSoup <table> element
+
+    Returns:
+        list: Rows of cell strings, or None for shapes only pandas.read_html handles
+    """
+    grid = _table_grid(table_element)
+    return grid[1] if grid else None
+
+def _parse_table_value(text):
+    """
+    Classify one cell the way pandas' type inference does.
+
+    Returns:
+        tuple: (kind, value) with kind one of "na", "int", "float", "str", or
+               ("unknown", None) for values whose conversion pandas handles specially
+    """
+    if text in TABLE_NA_VALUES:
+        return "na", None
+    if ',' in text and TABLE_THOUSANDS_PATTERN.search(text):
+        text = text.replace(',', '')
+    if TABLE_INTEGER_PATTERN.match(text):
+        value = int(text)
+        return ("int", value) if abs(value) < 2 ** 63 else ("unknown", None)
+    if TABLE_FLOAT_PATTERN.match(text):
+        value = float(text)
+        return ("float", value) if math.isfinite(value) else ("unknown", None)
+    if text in TABLE_BOOL_VALUES or text.lower().lstrip('+-') in TABLE_SPECIAL_FLOATS:
+        return "unknown", None
+    return "str", text
+
+def _typed_table_rows(data_rows):
+    """
+    Convert text rows to the typed values a DataFrame row would hold.
+
+    Columns are typed as a whole like pandas does: all-numeric columns become numbers
+    (floats if any cell is a float or missing), anything else keeps its strings. Rows of
+    an all-numeric table are upcast to float when any column is float.
+
+    Returns:
+        list: Rows of typed values (None for missing), or None when a column needs
+              pandas' own inference
+    """
+    columns = []
+    numeric_table = True
+    any_float = False
+    for column_texts in zip(*data_rows):
+        parsed = [_parse_table_value(text) for text in column_texts]
+        kinds = {kind for kind, _ in parsed}
+        if "unknown" in kinds:
+            return None
+        if "str" in kinds:
+            # Object column: strings keep their (thousands-stripped) text, numbers too
+            values = [None if kind == "na" else (value if kind == "str" else _stripped_number(text))
+                      for (kind, value), text in zip(parsed, column_texts)]
+            numeric_table = False
+        elif kinds <= {"int"}:
+            values = [value for _, value in parsed]
+        else:
+            values = [None if kind == "na" else float(_stripped_number(text))
+                      for (kind, _), text in zip(parsed, column_texts)]
+            any_float = True
+        columns.append(values)
+
+    rows = [list(row) for row in zip(*columns)]
+    if numeric_table and any_float:
+        rows = [[None if value is None else float(value) for value in row] for row in rows]
+    return rows
+
+def _stripped_number(text):
+    """Return a numeric-looking string with its thousands separators removed."""
+    if ',' in text and TABLE_THOUSANDS_PATTERN.search(text):
+        return text.replace(',', '')
+    return text
+
+def table_rows(table_element):
+    """
+    Return the distinct, non-uniform rows of a table as lists of cell strings.
+
+    The first row returned is used as the header by normalize_table. Rows whose cells
+    are all the same (section dividers spanning the whole table) or all empty are
+    dropped, as are exact duplicates.
+
+    Args:
+        table_element: BeautifulSoup <table> element, or its HTML
+
+    Returns:
+        list: Rows of cell strings, or None if the table has no data rows
+    """
+    if not isinstance(table_element, Tag):
+        table_element = BeautifulSoup(str(table_element), 'html.parser').find('table')
+    grid = _table_grid(table_element) if table_element is not None else None
+    if grid is None:
+        return _table_rows_pandas(table_element)
+
+    header_count, rows = grid
+    if header_count > 1:
+        header = [i for i, row in enumerate(rows[:header_count]) if any(row)]
+        if not header:
+            return _table_rows_pandas(table_element)
+        data_rows = rows[header[-1] + 1:]
+    else:
+        data_rows = rows[header_count:]
+    if not data_rows:
+        return None
+
+    typed_rows = _typed_table_rows(data_rows)
+    if typed_rows is None:
+        return _table_rows_pandas(table_element)
+
+    seen_rows = set()
+    combined_rows = []
+    for row in typed_rows:
+        # Skip rows where all values are the same
+        if len({value for value in row if value is not None}) == 1:
+            continue
+
+        row_tuple = tuple(
+            '' if value is None or (isinstance(value, str) and value.lower() in ['nan', 'na']) else str(value)
+            for value in row
+        )
+        # Skip rows where all values are empty, then duplicates
+        if not any(row_tuple) or row_tuple in seen_rows:
+            continue
+        seen_rows.add(row_tuple)
+        combined_rows.append(list(row_tuple))
+    return combined_rows
+
+def render_table_rows(combined_rows, table_format=DEFAULT_TABLE_FORMAT):
+    """
+    Serialize table rows (as returned by table_rows) in one of TABLE_FORMATS.
+
+    Args:
+        combined_rows (list): Rows of cell strings; the first row is the header
+        table_format (str): One of TABLE_FORMATS
+
+    Returns:
+        str: The serialized table ("" for no rows), or None if combined_rows is None
+    """
+    if combined_rows is None:
+        return None
+    if not combined_rows:
+        return ""
+
+    headers, data = combined_rows[0], combined_rows[1:]
+    if table_format == "pretty":
+        return tabulate(data, headers=headers, tablefmt='pretty')
+    if table_format == "pipe":
+        lines = [headers, ["---"] * len(headers)] + data
+        return "\n".join("|" + "|".join(cell.replace("|", "\\|") for cell in row) + "|" for row in lines)
+    if table_format == "csv":
+        buffer = StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(combined_rows)
+        return buffer.getvalue().rstrip("\n")
+    if table_format == "zone_rows":
+        keys = [header or f"column {i + 1}" for i, header in enumerate(headers)]
+        lines = [" | ".join(headers)]
+        for row in data:
+            values = "; ".join(f"{key}={value}" for key, value in zip(keys[1:], row[1:]) if value)
+            lines.append(f"{row[0]}: {values}" if row[0] and values else row[0] or values)
+        return "\n".join(lines)
+    raise ValueError(f"Invalid table_format. Must be one of {TABLE_FORMATS}")
+
+def normalize_table(html_content, engine=DEFAULT_TABLE_ENGINE, table_format=DEFAULT_TABLE_FORMAT):
+    """
+    Render an HTML table as a text table for section content.
+
+    Args:
+        html_content: BeautifulSoup <table> element, or its HTML
+        engine (str): "grid" builds the cell grid straight from the parsed element;
+                      "pandas" is the original pandas.read_html implementation.
+                      Both produce identical output.
+        table_format (str): One of TABLE_FORMATS
+
+    Returns:
+        str: The rendered table ("" if every row was filtered out), or None if the
+             table has no data rows
+    """
+    if engine not in TABLE_ENGINES:
+        raise ValueError(f"Invalid engine. Must be one of {TABLE_ENGINES}")
+    if engine == "pandas":
+        return render_table_rows(_table_rows_pandas(html_content), table_format)
+    return render_table_rows(table_rows(html_content), table_format)
 
-def normalize_table(html_content):
+def _table_rows_pandas(html_content):
+    """table_rows built on pandas.read_html; the reference the grid builder reproduces."""
     html_content = StringIO(str(html_content))
     # Load tables
     tables = pd.read_html(html_content)
@@ -141,26 +498,199 @@ def normalize_table(html_content):
             seen_rows.add(row_tuple)
             combined_rows.append(row_data)
 
-    # Implement tabulate with the combined rows
-    if combined_rows:
-        # Assuming first row contains headers
-        headers = combined_rows[0]
-        data = combined_rows[1:] if len(combined_rows) > 1 else []
-        
-        # Create and print the table
-        markdown_table = tabulate(data, headers=headers, tablefmt='pretty')
-    else:
-        markdown_table = ""
-
-    return markdown_table
+    return combined_rows
 
-def load_html(html_content):
+def load_html(html_content, parser_backend=DEFAULT_PARSER_BACKEND):
+    """
+    Parse an HTML document into a BeautifulSoup tree.
+    
+    Args:
+        html_content (str): Raw HTML of the document
+        parser_backend (str): Tree builder to use, "html.parser" or "lxml". The lxml
+                              builder is several times faster on large ALP exports.
+    
+    Returns:
+        BeautifulSoup: The parsed document, or None if it could not be parsed
+    """
+    if parser_backend == STREAM_PARSER_BACKEND:
+        raise ValueError("The lxml-stream backend does not build a tree; use iter_section_records instead")
+    if parser_backend not in PARSER_BACKENDS:
+        raise ValueError(f"Invalid parser_backend. Must be one of {PARSER_BACKENDS}")
 
     try:
-        return BeautifulSoup(html_content, 'html.parser')
+        return BeautifulSoup(html_content, parser_backend)
     except Exception as e:
         print(f"Error loading HTML document: {e}")
         return None
+
+def _rbox_kind(classes):
+    """Return "Title", "Chapter" or "Section" for an rbox heading's class list, else None."""
+    if 'rbox' not in classes:
+        return None
+    for kind in RBOX_KINDS:
+        if kind in classes:
+            return kind
+    return None
+
+def _heading_record(kind, heading_text):
+    """Build the record emitted by iter_section_records for a Title, Chapter or Section heading."""
+    record = {"type": kind, "title": heading_text}
+    if kind == "Chapter":
+        chapter_match = CHAPTER_PATTERN.search(heading_text)
+        record["chapterNumber"] = chapter_match.group(1) if chapter_match else None
+        record["chapterName"] = chapter_match.group(2).strip() if chapter_match else ""
+    elif kind == "Section":
+        section_match = SECTION_PATTERN.search(heading_text)
+        if not section_match:
+            return None
+        record["chapterNumber"] = section_match.group(1)
+        record["sectionNumber"] = section_match.group(2)
+        record["sectionName"] = section_match.group(3).strip()
+    return record
+
+def _lxml_strings(element, excluded):
+    """Yield the text nodes of an lxml element in document order, skipping excluded subtrees."""
+    if element.text and isinstance(element.tag, str):
+        yield element.text
+    for child in element:
+        if child not in excluded:
+            yield from _lxml_strings(child, excluded)
+        if child.tail:
+            yield child.tail
+
+def _lxml_block_chunks(block):
+    """
+    Convert one content block of a section into chunks, mirroring section_chunks.
+    
+    Args:
+        block: lxml element that is a sibling following a section heading
+    
+    Returns:
+        list: Table rows (lists) and leftover text (strings) for the block
+    """
+    chunks = []
+    if block.tag == 'table':
+        table_data = table_rows(etree.tostring(block, encoding='unicode', with_tail=False))
+        if table_data:
+            chunks.append(table_data)
+        return chunks
+
+    nested_tables = []
+    for table in block.iter('table'):
+        ancestors = list(table.iterancestors())
+        header_parent = any(
+            ancestor.tag == 'div' and 'xsl-table--header' in (ancestor.get('class') or '').split()
+            for ancestor in ancestors
+        )
+        # Tables inside an emitted table are part of its rendering
+        if not header_parent and not any(ancestor in nested_tables for ancestor in ancestors):
+            nested_tables.append(table)
+    for tbl in nested_tables:
+        tbl_data = table_rows(etree.tostring(tbl, encoding='unicode', with_tail=False))
+        if tbl_data:
+            chunks.append(tbl_data)
+
+    excluded = set(nested_tables)
+    leftover = "".join(
+        text.strip() for text in _lxml_strings(block, excluded) if text.strip()
+    ).replace('\xa0', ' ')
+    if leftover:
+        chunks.append(leftover)
+    return chunks
+
+def _release(element):
+    """Free a fully processed lxml element and the already processed siblings before it."""
+    element.clear(keep_tail=True)
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+def _iter_stream_records(html_content, table_format=DEFAULT_TABLE_FORMAT):
+    """Stream heading records out of an ALP export with lxml.etree.iterparse."""
+    if isinstance(html_content, str):
+        html_content = html_content.encode("utf-8")
+    source = BytesIO(html_content) if isinstance(html_content, bytes) else html_content
+
+    current = None
+    content_parent = None
+    pending = []
+
+    for _, element in etree.iterparse(source, events=("end",), html=True, encoding="utf-8", huge_tree=True):
+        if not isinstance(element.tag, str):
+            continue
+        classes = (element.get('class') or '').split()
+        parent = element.getparent()
+        kind = _rbox_kind(classes)
+
+        # A new .Section div (rbox or not) ends the content of the open section
+        if current is not None and element.tag == 'div' and 'Section' in classes and parent is content_parent:
+            current["content"] = render_section_text(current["title"], current.pop("chunks"), table_format)
+            yield current
+            yield from pending
+            current, pending = None, []
+        elif current is not None and parent is content_parent and element.tag in BLOCK_TAGS:
+            current["chunks"].extend(_lxml_block_chunks(element))
+        elif current is not None and element is content_parent:
+            # The container holding the section ended, so did the section
+            current["content"] = render_section_text(current["title"], current.pop("chunks"), table_format)
+            yield current
+            yield from pending
+            current, pending = None, []
+
+        if kind:
+            record = _heading_record(kind, "".join(element.itertext()).strip())
+            if record is not None and kind == "Section":
+                current = {**record, "chunks": []}
+            elif record is not None and current is not None:
+                # Title and Chapter headings inside an open section are emitted after it
+                pending.append(record)
+            elif record is not None:
+                yield record
+            content_parent = parent
+
+        if parent is content_parent or element is content_parent:
+            _release(element)
+
+    if current is not None:
+        current["content"] = render_section_text(current["title"], current.pop("chunks"), table_format)
+        yield current
+    yield from pending
+
+def iter_section_records(html_content, parser_backend=DEFAULT_PARSER_BACKEND, table_format=DEFAULT_TABLE_FORMAT):
+    """
+    Walk the Title, Chapter and Section headings of an ALP export in document order.
+    
+    With the "lxml-stream" backend the document is parsed incrementally and every
+    section is released as soon as its record is emitted, so memory stays bounded by
+    the largest section instead of the whole export.
+    
+    Args:
+        html_content (str, bytes or file object): Raw HTML of the codebook
+        parser_backend (str): One of PARSER_BACKENDS
+        table_format (str): One of TABLE_FORMATS, used for tables in section content
+    
+    Yields:
+        dict: {"type": "Title" | "Chapter" | "Section", "title": heading text, ...}.
+              Chapters carry chapterNumber/chapterName; sections carry chapterNumber,
+              sectionNumber, sectionName and the extracted "content".
+    """
+    if parser_backend == STREAM_PARSER_BACKEND:
+        yield from _iter_stream_records(html_content, table_format)
+        return
+
+    if not isinstance(html_content, str):
+        html_content = html_content.decode("utf-8") if isinstance(html_content, bytes) else html_content.read()
+    index = get_codebook_index(html_content, parser_backend)
+    if not index.soup:
+        return
+    for kind, element, heading_text in index.headings:
+        record = _heading_record(kind, heading_text)
+        if record is None:
+            continue
+        if kind == "Section":
+            record["content"] = index.section_text(element, table_format)
+        yield record
     
 def clean_nans(obj):
     if isinstance(obj, float) and math.isnan(obj):
@@ -172,74 +702,639 @@ def clean_nans(obj):
     else:
         return obj
 
-def extract_section_text(section_element):
+def _stripped_strings_outside(element, excluded):
     """
-    Extract the content text from a section element, including any nested tables,
-    until the next section.
+    Yield what element.get_text(strip=True) joins, skipping the subtrees of excluded tags.
+
+    Args:
+        element: BeautifulSoup Tag
+        excluded (set): id() of the descendant tags whose text is left out
+    """
+    types = element.interesting_string_types or Tag.MAIN_CONTENT_STRING_TYPES
+    if isinstance(types, type):
+        types = (types,)
+    stack = [iter(element.children)]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+        elif isinstance(child, Tag):
+            if id(child) not in excluded:
+                stack.append(iter(child.children))
+        elif type(child) in types:
+            stripped = child.strip()
+            if stripped:
+                yield stripped
+
+def _section_blocks(section_element):
+    """Yield the content blocks that follow a section heading, up to the next section."""
+    next_element = section_element.next_sibling
+    while next_element:
+        # If we hit another .Section, that means a new section is starting
+        if next_element.name == 'div' and 'Section' in (next_element.get('class') or []):
+            break
+        if next_element.name in ['div', 'p', 'ul', 'ol', 'table']:
+            yield next_element
+        next_element = next_element.next_sibling
+
+def _block_tables(block):
+    """
+    Yield the tables of a content block that section text renders, in document order.
+
+    Tables inside an xsl-table header and tables nested in an already yielded table are
+    skipped; the outer table's rows carry their text.
+    """
+    if block.name == 'table':
+        yield block
+        return
+    emitted = set()
+    for tbl in block.find_all('table', recursive=True):
+        header_parent = tbl.find_parent('div', class_='xsl-table--header')
+        if header_parent or any(id(parent) in emitted for parent in tbl.parents):
+            continue
+        emitted.add(id(tbl))
+        yield tbl
+
+def section_tables(section_element):
+    """
+    Return the tables of a section, as rendered by section_chunks.
+
+    Args:
+        section_element: BeautifulSoup element representing a section heading
+
+    Returns:
+        list: BeautifulSoup <table> elements in document order
+    """
+    return [tbl for block in _section_blocks(section_element) for tbl in _block_tables(block)]
+
+def section_chunks(section_element):
+    """
+    Collect the content of a section element, including any nested tables, until the
+    next section.
     
     Args:
         section_element: BeautifulSoup element representing a section
     
     Returns:
-        str: Text content of the section with preserved structure
+        tuple: (section_title, chunks) where chunks holds table rows (lists, see
+               table_rows) and leftover text (strings) in document order. The tree is
+               only read, so one parsed document can serve any number of extractions.
     """
     # The heading (e.g. "§ 154.040 PERMITTED USE TABLE.")
     section_title = section_element.get_text(strip=True)
     
     content_chunks = []
-    next_element = section_element.next_sibling
-    
-    while next_element:
-        # If we hit another .Section, that means a new section is starting
-        if next_element.name == 'div' and 'Section' in (next_element.get('class') or []):
-            break
-        
-        if next_element.name in ['div', 'p', 'ul', 'ol', 'table']:
-            # If it's a <table> directly
-            if next_element.name == 'table':
-                table_data = normalize_table(next_element)
-                if table_data:
-                    # Convert to JSON, then wrap with delimiters
-                    # table_json = json.dumps(table_data)
-                    content_chunks.append(f"\n\n{table_data}\n\n")
-            else:
-                nested_tables = []
-                for table in next_element.find_all('table', recursive=True):
-                    header_parent = table.find_parent('div', class_='xsl-table--header')
-                    if not header_parent:
-                        nested_tables.append(table)
-                for tbl in nested_tables:
-                    tbl_data = normalize_table(tbl)
-                    if tbl_data:
-                        # table_json = json.dumps(tbl_data)
-                        content_chunks.append(f"\n\n{tbl_data}\n\n")
-                    tbl.decompose()
-                
-                # After removing tables, any leftover text remains
-                leftover = next_element.get_text(strip=True).replace('\xa0', ' ')
-                if leftover:
-                    content_chunks.append(leftover)
+    for block in _section_blocks(section_element):
+        emitted = set()
+        for tbl in _block_tables(block):
+            emitted.add(id(tbl))
+            tbl_data = table_rows(tbl)
+            if tbl_data:
+                content_chunks.append(tbl_data)
+        if block.name == 'table':
+            continue
         
-        next_element = next_element.next_sibling
+        # Emitted tables are skipped by the leftover text walk instead of being removed,
+        # so extraction never mutates the shared tree
+        leftover = "".join(_stripped_strings_outside(block, emitted)).replace('\xa0', ' ')
+        if leftover:
+            content_chunks.append(leftover)
     
+    return section_title, content_chunks
+
+def render_section_text(section_title, content_chunks, table_format=DEFAULT_TABLE_FORMAT):
+    """
+    Join a section's title and chunks into the text that gets chunked and embedded.
+    
+    Args:
+        section_title (str): The section heading
+        content_chunks (list): Chunks as returned by section_chunks
+        table_format (str): One of TABLE_FORMATS
+    
+    Returns:
+        str: Section text, tables set apart by blank lines, ending with the "块" separator
+    """
+    rendered = [
+        f"\n\n{render_table_rows(chunk, table_format)}\n\n" if isinstance(chunk, list) else chunk
+        for chunk in content_chunks
+    ]
     # Merge them all into one giant string. Prepend the section title at the top.
-    final_string = section_title + "\n" + "\n".join(content_chunks) + "块"
-    return final_string
+    return section_title + "\n" + "\n".join(rendered) + "块"
+
+def extract_section_text(section_element, table_format=DEFAULT_TABLE_FORMAT):
+    """
+    Extract the content text from a section element, including any nested tables,
+    until the next section.
+    
+    Args:
+        section_element: BeautifulSoup element representing a section
+        table_format (str): One of TABLE_FORMATS
+    
+    Returns:
+        str: Text content of the section with preserved structure
+    """
+    return render_section_text(*section_chunks(section_element), table_format)
+
+class CodebookIndex:
+    """
+    Parsed view of an ALP codebook export, built once per document.
+
+    Parsing the HTML is by far the most expensive part of a section lookup, so the
+    index parses the document a single time and maps every "chapter.section" number
+    to its heading element, name and (lazily) extracted text. All lookup helpers in
+    this module accept an index wherever they accept raw HTML.
+    """
+
+    def __init__(self, html_content, parser_backend=DEFAULT_PARSER_BACKEND, document_hash=None):
+        self.document_hash = document_hash or hashlib.sha256(html_content.encode("utf-8")).hexdigest()
+        self.parser_backend = parser_backend
+        self.soup = load_html(html_content, parser_backend)
+        # Every Title/Chapter/Section heading in document order
+        self.headings = []
+        # Every parsed section heading in document order, and the first heading per number
+        self.section_entries = []
+        self.sections = {}
+        self._entries_by_element = {}
+        self._outline = None
+
+        if not self.soup:
+            return
+
+        for element in self.soup.select(HEADING_SELECTOR):
+            kind = _rbox_kind(element.get('class') or [])
+            heading_text = element.text.strip() or ""
+            self.headings.append((kind, element, heading_text))
+            if kind != "Section":
+                continue
+
+            section_match = SECTION_PATTERN.search(heading_text)
+            if not section_match:
+                continue
+
+            entry = {
+                "element": element,
+                "title": heading_text,
+                "chapter_number": section_match.group(1),
+                "section_number": section_match.group(2),
+                "name": section_match.group(3).strip(),
+                "chunks": None,
+                "texts": {}
+            }
+            self.section_entries.append(entry)
+            self._entries_by_element[id(element)] = entry
+            self.sections.setdefault(f"{entry['chapter_number']}.{entry['section_number']}", entry)
+
+    def outline(self):
+        """
+        Return the document's title/chapter/section hierarchy, built in a single pass.
+
+        Each heading is visited exactly once: chapters attach to the title before them,
+        and sections are grouped under their chapter number from the § heading, the same
+        membership the sibling-walking builder used to compute per chapter. The result
+        is memoized, so every extract_table_of_contents view of a document shares it.
+
+        Returns:
+            tuple: (titles, sections_by_chapter) where titles is a list of
+                   (title_entry, [chapter_entry, ...]) pairs and sections_by_chapter maps a
+                   chapter number to its section index entries in document order
+        """
+        if self._outline is not None:
+            return self._outline
+
+        titles = []
+        sections_by_chapter = {}
+        title_count = 0
+        for kind, element, heading_text in self.headings:
+            if kind == "Title":
+                title_entry = {
+                    "title": heading_text or f"Title {title_count + 1}",
+                    "type": "Title",
+                    "level": 0,
+                    "id": f"title-{title_count}"
+                }
+                title_count += 1
+                titles.append((title_entry, []))
+            elif kind == "Chapter":
+                chapter_match = CHAPTER_PATTERN.search(heading_text)
+                if not chapter_match or not titles:
+                    continue
+                titles[-1][1].append({
+                    "title": heading_text,
+                    "type": "Chapter",
+                    "level": 1,
+                    "id": f"chapter-{chapter_match.group(1)}",
+                    "chapterNumber": chapter_match.group(1),
+                    "chapterName": chapter_match.group(2).strip()
+                })
+            else:
+                entry = self._entries_by_element.get(id(element))
+                if entry is not None:
+                    sections_by_chapter.setdefault(entry["chapter_number"], []).append(entry)
+
+        self._outline = (titles, sections_by_chapter)
+        return self._outline
+
+    def get_section(self, chapter_number, section_number):
+        """Return the index entry for a section, or None if it is not in the document."""
+        return self.sections.get(f"{chapter_number}.{section_number}")
+
+    def section_text(self, section_element, table_format=DEFAULT_TABLE_FORMAT):
+        """
+        Return the extracted text of a section heading element, extracting it at most once.
+
+        The section's chunks are cached on the entry, and each table format is rendered
+        from those chunks once.
+        """
+        entry = self._entries_by_element.get(id(section_element))
+        if entry is None:
+            return extract_section_text(section_element, table_format)
+        if entry["chunks"] is None:
+            entry["chunks"] = section_chunks(section_element)
+        if table_format not in entry["texts"]:
+            entry["texts"][table_format] = render_section_text(*entry["chunks"], table_format)
+        return entry["texts"][table_format]
+
+
+_index_cache = OrderedDict()
+
+def get_codebook_index(html_content, parser_backend=DEFAULT_PARSER_BACKEND):
+    """
+    Return the CodebookIndex for an HTML document, reusing a cached one for identical content.
+
+    Args:
+        html_content (str or CodebookIndex): Raw HTML of the codebook, or an existing index
+        parser_backend (str): Tree builder used when the document has to be parsed
+
+    Returns:
+        CodebookIndex: The parsed index for the document
+    """
+    if isinstance(html_content, CodebookIndex):
+        return html_content
+
+    document_hash = hashlib.sha256(html_content.encode("utf-8")).hexdigest()
+    cache_key = (document_hash, parser_backend)
+    index = _index_cache.get(cache_key)
+    if index is not None:
+        _index_cache.move_to_end(cache_key)
+        return index
+
+    index = CodebookIndex(html_content, parser_backend=parser_backend, document_hash=document_hash)
+    _index_cache[cache_key] = index
+    while len(_index_cache) > INDEX_CACHE_SIZE:
+        _index_cache.popitem(last=False)
+    return index
+
+class SectionOffsetIndex:
+    """
+    Byte-offset index of the Title, Chapter and Section boundaries in a cached ALP export.
+
+    The index is built with a single regex scan over the raw bytes (no HTML parse) and
+    persisted to a compact JSON sidecar next to the HTML file. A section lookup then
+    memory-maps the file, slices out only that section's byte range and parses just
+    that fragment, so it costs milliseconds regardless of the document size.
+
+    Each heading is stored as [kind, key, start, end]: kind is "T", "C" or "S", key is
+    the title text, chapter number or "chapter.section" number, and [start, end) covers
+    the heading and the content that extract_section_text would read after it.
+    """
+
+    def __init__(self, html_path, headings):
+        self.html_path = html_path
+        self.headings = headings
+        self.sections = {}
+        for kind, key, start, end in headings:
+            if kind == "S":
+                self.sections.setdefault(key, (start, end))
+        self._mmap = None
+
+    @staticmethod
+    def sidecar_path(html_path):
+        """Return the path of the offset sidecar for an HTML file."""
+        return html_path + OFFSET_INDEX_SUFFIX
+
+    @classmethod
+    def build(cls, html_path):
+        """
+        Scan an HTML export for heading boundaries and write the sidecar file.
+
+        Args:
+            html_path (str): Path to the cached ALP HTML export
+
+        Returns:
+            SectionOffsetIndex: The freshly built index
+        """
+        with open(html_path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size == 0:
+                headings = []
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    headings = _scan_heading_offsets(data)
+
+        sidecar = {
+            "version": OFFSET_INDEX_VERSION,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "headings": headings
+        }
+        with open(cls.sidecar_path(html_path), "w", encoding="utf-8") as f:
+            json.dump(sidecar, f, separators=(",", ":"), ensure_ascii=False)
+        return cls(html_path, headings)
+
+    @classmethod
+    def load(cls, html_path):
+        """
+        Load the sidecar for an HTML file, rebuilding it if it is missing or stale.
+
+        Args:
+            html_path (str): Path to the cached ALP HTML export
+
+        Returns:
+            SectionOffsetIndex: The index for the file
+        """
+        stat = os.stat(html_path)
+        try:
+            with open(cls.sidecar_path(html_path), encoding="utf-8") as f:
+                sidecar = json.load(f)
+            if (sidecar.get("version") == OFFSET_INDEX_VERSION
+                    and sidecar.get("size") == stat.st_size
+                    and sidecar.get("mtime_ns") == stat.st_mtime_ns):
+                return cls(html_path, sidecar["headings"])
+        except (OSError, ValueError):
+            pass
+        return cls.build(html_path)
+
+    def read_fragment(self, start, end):
+        """Return the decoded bytes [start, end) of the HTML file via a shared memory map."""
+        if self._mmap is None:
+            with open(self.html_path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap[start:end].decode("utf-8", errors="replace")
+
+    def close(self):
+        """Release the memory map, if one is open."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def get_section_content(self, section_number, table_format=DEFAULT_TABLE_FORMAT):
+        """
+        Extract one section by parsing only its byte range.
+
+        Args:
+            section_number (str): The section number to extract (e.g., "154.040")
+            table_format (str): One of TABLE_FORMATS
+
+        Returns:
+            dict: Same shape as get_section_content
+        """
+        section_parts = section_number.split(".")
+        if len(section_parts) != 2:
+            return {"error": f"Invalid section number format: {section_number}"}
+
+        chapter_number, section_num = section_parts
+        section_range = self.sections.get(section_number)
+        section_element, section_name = None, None
+        if section_range is not None:
+            fragment = load_html(self.read_fragment(*section_range))
+            if fragment:
+                section_element, section_name = find_section_element(fragment, chapter_number, section_num)
+
+        if not section_element:
+            return {
+                "error": f"Section {section_number} not found in the document",
+                "section_number": section_number,
+                "content": ""
+            }
+
+        return {
+            "section_number": section_number,
+            "section_title": section_name,
+            "chapter_number": chapter_number,
+            "content": extract_section_text(section_element, table_format)
+        }
+
+
+def _scan_heading_offsets(data):
+    """
+    Find the byte ranges of every rbox heading in a raw HTML export.
+
+    Only <div> tags are tokenized. A section's range ends where extract_section_text
+    stops reading: at the next .Section div or at the end of the heading's parent.
+
+    Args:
+        data (bytes or mmap): Raw HTML
+
+    Returns:
+        list: [kind, key, start, end] entries in document order
+    """
+    stack = []          # open divs: (start offset, index into raw_headings or None)
+    closed_at = {}      # div start offset -> offset of its closing tag
+    raw_headings = []   # [kind, start, heading_end, parent_start]
+    section_starts = []
+
+    for match in DIV_TAG_PATTERN.finditer(data):
+        if match.group(1):
+            if not stack:
+                continue
+            start, heading_slot = stack.pop()
+            closed_at[start] = match.start()
+            if heading_slot is not None:
+                raw_headings[heading_slot][2] = match.end()
+            continue
+
+        class_match = CLASS_ATTR_PATTERN.search(match.group(2))
+        classes = class_match.group(2).decode("utf-8", errors="replace").split() if class_match else []
+        if 'Section' in classes:
+            section_starts.append(match.start())
+        kind = _rbox_kind(classes)
+        heading_slot = None
+        if kind:
+            parent_start = stack[-1][0] if stack else None
+            raw_headings.append([kind, match.start(), None, parent_start])
+            heading_slot = len(raw_headings) - 1
+        if not match.group(0).endswith(b"/>"):
+            stack.append((match.start(), heading_slot))
+
+    body_close = BODY_CLOSE_PATTERN.search(data)
+    document_end = body_close.start() if body_close else len(data)
+
+    # Titles run until the next title, chapters until the next chapter or title
+    next_title_end, next_chapter_end = [], []
+    title_end = chapter_end = document_end
+    for kind, start, _, _ in reversed(raw_headings):
+        next_title_end.append(title_end)
+        next_chapter_end.append(chapter_end)
+        if kind == "Title":
+            title_end = chapter_end = start
+        elif kind == "Chapter":
+            chapter_end = start
+    next_title_end.reverse()
+    next_chapter_end.reverse()
+
+    headings = []
+    next_section = 0
+    for i, (kind, start, heading_end, parent_start) in enumerate(raw_headings):
+        heading_end = heading_end or start
+        heading_text = html_lib.unescape(
+            MARKUP_PATTERN.sub(b"", data[start:heading_end]).decode("utf-8", errors="replace")
+        ).strip()
+        parent_end = closed_at.get(parent_start, document_end) if parent_start is not None else document_end
+
+        if kind == "Section":
+            section_match = SECTION_PATTERN.search(heading_text)
+            if not section_match:
+                continue
+            key = f"{section_match.group(1)}.{section_match.group(2)}"
+            while next_section < len(section_starts) and section_starts[next_section] <= start:
+                next_section += 1
+            end = section_starts[next_section] if next_section < len(section_starts) else document_end
+            headings.append(["S", key, start, min(end, parent_end)])
+            continue
+
+        if kind == "Chapter":
+            chapter_match = CHAPTER_PATTERN.search(heading_text)
+            key = chapter_match.group(1) if chapter_match else heading_text
+            headings.append(["C", key, start, next_chapter_end[i]])
+        else:
+            headings.append(["T", heading_text, start, next_title_end[i]])
+    return headings
+
+
+def section_references(text, own_section=None):
+    """
+    Return the sections a text cites with §, e.g. "see § 154.032".
+
+    Args:
+        text (str): Section text
+        own_section (str, optional): "chapter.section" number of the text's own section,
+                                     left out since section text starts with its heading
+
+    Returns:
+        list: Sorted, distinct "chapter.section" numbers
+    """
+    references = {
+        number
+        for match in SECTION_REFERENCE_PATTERN.finditer(text)
+        for number in SECTION_NUMBER_PATTERN.findall(match.group(1))
+    }
+    references.discard(own_section)
+    return sorted(references)
+
+def cache_codebook_html(document_id, html_content, data_dir=CODEBOOK_DATA_DIR):
+    """
+    Write a downloaded codebook export to the local cache and index its section offsets.
+
+    Args:
+        document_id (str): Codebook document ID, e.g. "bargersville_in"
+        html_content (str): Raw HTML of the export
+        data_dir (str): Root of the local codebook cache
+
+    Returns:
+        SectionOffsetIndex: The offset index for the cached file
+    """
+    html_dir = os.path.join(data_dir, "html")
+    os.makedirs(html_dir, exist_ok=True)
+    html_path = os.path.join(html_dir, f"{document_id}.html")
+    with open(html_path, "w", encoding="utf-8", newline="") as f:
+        f.write(html_content)
+    return SectionOffsetIndex.build(html_path)
+
+def load_cached_codebook_html(document_id, data_dir=CODEBOOK_DATA_DIR):
+    """
+    Read a previously cached codebook export.
+
+    Args:
+        document_id (str): Codebook document ID, e.g. "bargersville_in"
+        data_dir (str): Root of the local codebook cache
+
+    Returns:
+        str: The cached HTML, or None if the document has not been cached
+    """
+    html_path = cached_codebook_path(document_id, data_dir)
+    if html_path is None:
+        return None
+    with open(html_path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+def load_section_offsets(document_id, data_dir=CODEBOOK_DATA_DIR):
+    """
+    Return the byte-offset index of a cached codebook export, or None if it is not cached.
+
+    Args:
+        document_id (str): Codebook document ID, e.g. "bargersville_in"
+        data_dir (str): Root of the local codebook cache
+    """
+    html_path = cached_codebook_path(document_id, data_dir)
+    if html_path is None:
+        return None
+    return SectionOffsetIndex.load(html_path)
+
+def cached_codebook_path(document_id, data_dir=CODEBOOK_DATA_DIR):
+    """Return the path of a cached codebook export, or None if it is not cached."""
+    html_path = os.path.join(data_dir, "html", f"{document_id}.html")
+    return html_path if os.path.exists(html_path) else None
+
+# Offset index of the shared document, opened once per extraction pool worker
+_worker_offsets = None
+
+def _init_extraction_worker(html_path):
+    """Pool initializer: memory-map the cached export once for the worker's lifetime."""
+    global _worker_offsets
+    _worker_offsets = SectionOffsetIndex.load(html_path)
+
+def extract_section_batch(section_numbers, table_format=DEFAULT_TABLE_FORMAT):
+    """
+    Extract a batch of sections inside an extraction pool worker.
+
+    Args:
+        section_numbers (list): Section numbers such as "154.040"
+        table_format (str): One of TABLE_FORMATS
+
+    Returns:
+        list: One get_section_content result per section number, in order
+    """
+    return [_worker_offsets.get_section_content(number, table_format) for number in section_numbers]
+
+def create_extraction_pool(html_path, workers):
+    """
+    Start a process pool whose workers extract sections from one cached export.
+
+    The document is never pickled to the workers: each one memory-maps the file and
+    parses only the byte range of the sections it is given (see extract_section_batch),
+    so extraction runs in parallel outside the GIL and off the event loop.
+
+    Args:
+        html_path (str): Path to the cached ALP HTML export (see cache_codebook_html)
+        workers (int): Number of worker processes
+
+    Returns:
+        ProcessPoolExecutor: The pool; shut it down (or use it as a context manager) when done
+    """
+    # Build or refresh the sidecar once here rather than racing to do it in every worker
+    SectionOffsetIndex.load(html_path)
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_extraction_worker, initargs=(html_path,))
 
 def find_section_element(soup, chapter_number, section_number):
     """
     Helper function to find a specific section element in a BeautifulSoup object.
     
     Args:
-        soup: BeautifulSoup object of the HTML document
+        soup: BeautifulSoup object of the HTML document, or a CodebookIndex
         chapter_number (str): Chapter number to find
         section_number (str): Section number to find
     
     Returns:
         tuple: (section_element, section_name) if found, (None, None) if not found
     """
+    if isinstance(soup, CodebookIndex):
+        entry = soup.get_section(chapter_number, section_number)
+        if entry is None:
+            return None, None
+        return entry["element"], entry["name"]
+
     # Find all section elements
-    section_elements = soup.select('.Section.toc-destination.rbox, .Section.rbox, .rbox.Section')
+    section_elements = soup.select(SECTION_SELECTOR)
     
     if len(section_elements) == 0:
         return None, None
@@ -249,7 +1344,7 @@ def find_section_element(soup, chapter_number, section_number):
         section_text = section_element.text.strip() or ""
         
         # Parse section info
-        section_match = re.search(r"§\s*(\d+)\.(\d+)\s*(.*)", section_text)
+        section_match = SECTION_PATTERN.search(section_text)
         if not section_match:
             continue
         
@@ -263,19 +1358,28 @@ def find_section_element(soup, chapter_number, section_number):
     
     return None, None
 
-def get_section_content(html_content, section_number):
+def get_section_content(html_content, section_number, parser_backend=DEFAULT_PARSER_BACKEND,
+                        table_format=DEFAULT_TABLE_FORMAT):
     """
     Extract the complete content of a specific section from the municipal code.
     
     Args:
-        html_document_id (str): The ID of the HTML document to load
+        html_content (str, CodebookIndex or SectionOffsetIndex): Raw HTML of the codebook, an
+                      index built from it, or any section source with its own
+                      get_section_content (the byte-offset index of a cached export,
+                      a corpus_store.CorpusDocument)
         section_number (str): The section number to extract (e.g., "154.040")
+        parser_backend (str, optional): Tree builder used if html_content still needs parsing
+        table_format (str, optional): How tables are serialized, one of TABLE_FORMATS
     
     Returns:
         dict: A dictionary containing the section metadata and content or error information
     """
-    # Load HTML
-    soup = load_html(html_content)
+    if hasattr(html_content, "get_section_content"):
+        return html_content.get_section_content(section_number, table_format)
+
+    # Parse the document at most once, no matter how many sections are requested
+    index = get_codebook_index(html_content, parser_backend)
     
     # Parse the section number into chapter and section parts
     section_parts = section_number.split(".")
@@ -286,7 +1390,7 @@ def get_section_content(html_content, section_number):
     section_num = section_parts[1]
     
     # Find the section element
-    section_element, section_name = find_section_element(soup, chapter_number, section_num)
+    section_element, section_name = find_section_element(index, chapter_number, section_num)
     
     if not section_element:
         return {
@@ -296,7 +1400,7 @@ def get_section_content(html_content, section_number):
         }
     
     # Extract content
-    content = extract_section_text(section_element)
+    content = index.section_text(section_element, table_format)
     return {
         "section_number": section_number,
         "section_title": section_name,
@@ -305,12 +1409,13 @@ def get_section_content(html_content, section_number):
     }
 
 def extract_table_of_contents(html_content, hierarchy_depth="titles_only", target_title=None, 
-                              target_chapter=None, include_content=False):
+                              target_chapter=None, include_content=False,
+                              parser_backend=DEFAULT_PARSER_BACKEND, table_format=DEFAULT_TABLE_FORMAT):
     """
     Extract table of contents from an HTML document containing municipal code.
     
     Args:
-        html_document_id (str): The ID of the HTML document to parse
+        html_content (str or CodebookIndex): Raw HTML of the codebook, or an index built from it
         hierarchy_depth (str): Depth of hierarchy to extract:
                               - "titles_only" for titles only
                               - "titles_and_chapters" for titles and chapters only
@@ -322,6 +1427,8 @@ def extract_table_of_contents(html_content, hierarchy_depth="titles_only", targe
                                        sections from the specified chapter.
         include_content (bool, optional): Whether to include section content.
                                           Only applies when hierarchy_depth="full" or target_chapter is set.
+        parser_backend (str, optional): Tree builder used if html_content still needs parsing
+        table_format (str, optional): How tables in included content are serialized
     
     Returns:
         list or dict: A list of dictionaries representing the TOC structure or sections,
@@ -333,44 +1440,36 @@ def extract_table_of_contents(html_content, hierarchy_depth="titles_only", targe
         return {"error": f"Invalid hierarchy_depth. Must be one of {valid_hierarchy_depths}"}
     
     # Load HTML
-    soup = load_html(html_content)
+    index = get_codebook_index(html_content, parser_backend)
+    soup = index.soup
     if not soup:
         return {"error": f"Could not load HTML document"}
     
+    titles, sections_by_chapter = index.outline()
+
+    def section_view(section, chapter_number=None):
+        section_entry = {
+            "title": section["title"],
+            "type": "Section",
+            "level": 2,
+            "id": f"chapter-{section['chapter_number']}-section-{section['section_number']}",
+            "sectionNumber": section["section_number"],
+            "sectionName": section["name"],
+        }
+        if chapter_number is not None:
+            section_entry["chapterNumber"] = chapter_number
+        
+        # Include section content if requested
+        if include_content:
+            section_entry["content"] = index.section_text(section["element"], table_format)
+        return section_entry
+    
     # Special case: If target_chapter is provided, return a flat list of sections for that chapter
     if target_chapter:
-        section_elements = soup.select('.Section.toc-destination.rbox, .Section.rbox, .rbox.Section')
-        chapter_sections = []
-        
-        for section_element in section_elements:
-            section_text = section_element.text.strip() or ""
-            
-            # Parse section info
-            section_match = re.search(r"§\s*(\d+)\.(\d+)\s*(.*)", section_text)
-            if not section_match:
-                continue
-            
-            section_chapter_num = section_match.group(1)
-            section_number = section_match.group(2)
-            section_name = section_match.group(3).strip()
-            
-            # Only include sections from the target chapter
-            if section_chapter_num == target_chapter:
-                section_entry = {
-                    "title": section_text,
-                    "type": "Section",
-                    "level": 2,
-                    "id": f"chapter-{target_chapter}-section-{section_number}",
-                    "sectionNumber": section_number,
-                    "sectionName": section_name,
-                    "chapterNumber": target_chapter,
-                }
-                
-                # Include section content if requested
-                if include_content:
-                    section_entry["content"] = extract_section_text(section_element)
-                
-                chapter_sections.append(section_entry)
+        chapter_sections = [
+            section_view(section, chapter_number=target_chapter)
+            for section in sections_by_chapter.get(target_chapter, [])
+        ]
         
         if not chapter_sections:
             return {"error": f"No sections found for Chapter {target_chapter}"}
@@ -382,130 +1481,37 @@ def extract_table_of_contents(html_content, hierarchy_depth="titles_only", targe
     
     # Normal TOC processing if no target_chapter is specified
     toc = []
-    
-    # Extract titles
-    title_elements = soup.select('.Title.rbox, .rbox.Title')
-    for i, title_element in enumerate(title_elements):
-        title_text = title_element.text.strip() or f"Title {i + 1}"
-        if target_title and title_text != target_title:
+    for title, chapters in titles:
+        if target_title and title["title"] != target_title:
             continue
-
-        title_entry = {
-            "title": title_text,
-            "type": "Title",
-            "level": 0,
-            "id": f"title-{i}"
-        }
+        
+        title_entry = dict(title)
         
         # If titles_only, don't extract chapters or sections
         if hierarchy_depth == "titles_only":
-            # Add the title to the TOC without children
             toc.append(title_entry)
             continue
         
         # For titles_and_chapters or full, add chapters
         title_entry["children"] = []
-        
-        # Find chapters for this title
-        next_element = title_element.find_next_sibling()
-        chapter_elements = []
-        while next_element and not next_element.select_one('.Title.rbox, .rbox.Title'):
-            if next_element.select_one('.Chapter.rbox, .rbox.Chapter'):
-                chapter_elements.append(next_element)
-            next_element = next_element.find_next_sibling()
-        
-        # If no chapters were found through siblings, try the general selector
-        if not chapter_elements:
-            chapter_elements = soup.select('.Chapter.rbox, .rbox.Chapter')
-        
-        # Process chapters
-        for j, chapter_element in enumerate(chapter_elements):
-            chapter_text = chapter_element.text.strip() or ""
-            
-            # Parse chapter info
-            chapter_match = re.search(r"CHAPTER\s+(\d+):\s*(.*)", chapter_text, re.IGNORECASE)
-            if not chapter_match:
-                continue
-            
-            chapter_number = chapter_match.group(1)
-            chapter_name = chapter_match.group(2).strip()
-            
-            chapter_entry = {
-                "title": chapter_text,
-                "type": "Chapter",
-                "level": 1,
-                "id": f"chapter-{chapter_number}",
-                "chapterNumber": chapter_number,
-                "chapterName": chapter_name
-            }
+        for chapter in chapters:
+            chapter_entry = dict(chapter)
             
             # Only process sections if hierarchy_depth is "full"
             if hierarchy_depth == "full":
-                chapter_entry["children"] = []
-                
-                # Find sections for this chapter
-                next_chapter_element = chapter_element.find_next_sibling('.Chapter.rbox, .rbox.Chapter')
-                section_elements = []
-                
-                # Get sections between this chapter and the next chapter
-                current_element = chapter_element.find_next_sibling()
-                while current_element and current_element != next_chapter_element:
-                    if current_element.select_one('.Section.toc-destination.rbox, .Section.rbox, .rbox.Section'):
-                        section_elements.append(current_element)
-                    current_element = current_element.find_next_sibling()
-                
-                # If no sections were found, try the general selector
-                if not section_elements:
-                    section_elements = soup.select('.Section.toc-destination.rbox, .Section.rbox, .rbox.Section')
-                
-                # Process sections
-                for k, section_element in enumerate(section_elements):
-                    section_text = section_element.text.strip() or ""
-                    
-                    # Parse section info
-                    section_match = re.search(r"§\s*(\d+)\.(\d+)\s*(.*)", section_text)
-                    if not section_match:
-                        continue
-                    
-                    section_chapter_number = section_match.group(1)
-                    section_number = section_match.group(2)
-                    section_name = section_match.group(3).strip()
-                    
-                    # Skip sections that don't belong to this chapter
-                    if section_chapter_number != chapter_number:
-                        continue
-                    
-                    # Create section entry with metadata
-                    section_entry = {
-                        "title": section_text,
-                        "type": "Section",
-                        "level": 2,
-                        "id": f"chapter-{chapter_number}-section-{section_number}",
-                        "sectionNumber": section_number,
-                        "sectionName": section_name,
-                    }
-                    
-                    # Include section content if requested
-                    if include_content:
-                        section_entry["content"] = extract_section_text(section_element)
-                    
-                    # Add the section to the chapter
-                    chapter_entry["children"].append(section_entry)
+                chapter_entry["children"] = [
+                    section_view(section)
+                    for section in sections_by_chapter.get(chapter["chapterNumber"], [])
+                ]
                 
                 # Sort sections by section number
                 chapter_entry["children"].sort(key=lambda s: int(s["sectionNumber"]))
             
-            # Add the chapter to the title
             title_entry["children"].append(chapter_entry)
         
         # Sort chapters by chapter number
         title_entry["children"].sort(key=lambda c: int(c["chapterNumber"]))
         
-        # Add the title to the TOC
         toc.append(title_entry)
-
     
     return toc
-
-
-
@@ -0,0 +1,241 @@
+"""
+Local corpus of extracted codebook sections across every ingested municipality.
+
+Section text is stored compressed in one SQLite file, keyed by (document_id,
+codebook_version, table_format, chapter, section), where the version is a prefix of
+the hash of the ALP export it was extracted from plus the SECTION_EXTRACTOR_VERSION
+that extracted it. The extractor fills it once per version; ingestion, rechunking and
+evals then read sections from it instead of downloading and parsing the HTML again.
+Blobs are zlib-compressed by default. zstd is optional: with the zstandard package
+installed (pip install zstandard), new blobs are zstd-compressed instead, which is
+smaller and faster to read. Each row records its codec, so stores written with either
+remain readable.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # Optional; zlib is always available
+    zstandard = None
+
+from src.utils.codebook_helpers import CODEBOOK_DATA_DIR, DEFAULT_TABLE_FORMAT, SECTION_EXTRACTOR_VERSION
+
+CORPUS_STORE_PATH = os.getenv("CORPUS_STORE_PATH", os.path.join(CODEBOOK_DATA_DIR, "corpus.sqlite"))
+CODEBOOK_VERSION_LENGTH = 16
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 6
+
+
+def codebook_version(document_hash):
+    """
+    Return the corpus version of a codebook export from its sha256 (CodebookIndex.document_hash).
+
+    The version also names the extractor, so a new SECTION_EXTRACTOR_VERSION stores
+    (and reads) its sections apart from those of older extractors.
+    """
+    return f"{document_hash[:CODEBOOK_VERSION_LENGTH]}.x{SECTION_EXTRACTOR_VERSION}"
+
+
+def compress_text(text):
+    """Return (codec, blob) for a section text."""
+    data = text.encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress_text(codec, blob):
+    """Return the text of a stored blob."""
+    if codec == "zlib":
+        return zlib.decompress(blob).decode("utf-8")
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This corpus store holds zstd blobs; install the zstandard package to read them")
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    raise ValueError(f"Unknown corpus codec: {codec}")
+
+
+def _split_number(section_number):
+    parts = section_number.split(".")
+    return (parts[0], parts[1]) if len(parts) == 2 else (None, None)
+
+
+class CorpusStore:
+    """SQLite store of compressed section text for every ingested codebook version."""
+
+    def __init__(self, path=CORPUS_STORE_PATH):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sections ("
+                "document_id TEXT NOT NULL, codebook_version TEXT NOT NULL, table_format TEXT NOT NULL, "
+                "chapter_number TEXT NOT NULL, section_number TEXT NOT NULL, section_name TEXT, "
+                "content_hash TEXT NOT NULL, codec TEXT NOT NULL, content BLOB NOT NULL, "
+                "PRIMARY KEY (document_id, codebook_version, table_format, chapter_number, section_number))"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS versions ("
+                "document_id TEXT NOT NULL, codebook_version TEXT NOT NULL, stored_at REAL NOT NULL, "
+                "PRIMARY KEY (document_id, codebook_version))"
+            )
+
+    def put_sections(self, document_id, version, table_format, contents):
+        """
+        Store extracted sections of one codebook version in one transaction.
+
+        Args:
+            document_id (str): Codebook document ID
+            version (str): See codebook_version
+            table_format (str): Table serialization the sections were extracted with
+            contents (list): get_section_content results; errors are skipped
+
+        Returns:
+            int: Number of sections stored
+        """
+        rows = []
+        for content in contents:
+            if "error" in content:
+                continue
+            chapter_number, section_number = _split_number(content["section_number"])
+            if chapter_number is None:
+                continue
+            codec, blob = compress_text(content["content"])
+            content_hash = hashlib.sha256(content["content"].encode("utf-8")).hexdigest()
+            rows.append((document_id, version, table_format, chapter_number, section_number,
+                         content.get("section_title"), content_hash, codec, blob))
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO sections (document_id, codebook_version, table_format, chapter_number, "
+                "section_number, section_name, content_hash, codec, content) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._connection.execute(
+                "INSERT OR IGNORE INTO versions (document_id, codebook_version, stored_at) VALUES (?, ?, ?)",
+                (document_id, version, time.time())
+            )
+        return len(rows)
+
+    def get_sections(self, document_id, version, table_format, section_numbers):
+        """
+        Read stored sections.
+
+        Returns:
+            dict: "chapter.section" -> get_section_content-shaped dict, for the sections found
+        """
+        found = {}
+        with self._lock:
+            for section_number in section_numbers:
+                chapter_number, number = _split_number(section_number)
+                row = self._connection.execute(
+                    "SELECT section_name, codec, content FROM sections WHERE document_id = ? AND codebook_version = ? "
+                    "AND table_format = ? AND chapter_number = ? AND section_number = ?",
+                    (document_id, version, table_format, chapter_number, number)
+                ).fetchone()
+                if row is not None:
+                    found[section_number] = {
+                        "section_number": section_number,
+                        "section_title": row[0],
+                        "chapter_number": chapter_number,
+                        "content": decompress_text(row[1], row[2])
+                    }
+        return found
+
+    def list_sections(self, document_id, version, table_format=DEFAULT_TABLE_FORMAT):
+        """Return the stored sections of a version as section_list entries (chapterNumber, sectionNumber, sectionName)."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT chapter_number, section_number, section_name FROM sections WHERE document_id = ? "
+                "AND codebook_version = ? AND table_format = ? "
+                "ORDER BY CAST(chapter_number AS INTEGER), chapter_number, CAST(section_number AS INTEGER), section_number",
+                (document_id, version, table_format)
+            ).fetchall()
+        return [{"chapterNumber": ch, "sectionNumber": sec, "sectionName": name} for ch, sec, name in rows]
+
+    def latest_version(self, document_id):
+        """Return the most recently stored version of a document by the current extractor, or None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT codebook_version FROM versions WHERE document_id = ? AND codebook_version LIKE ? "
+                "ORDER BY stored_at DESC, rowid DESC LIMIT 1",
+                (document_id, f"%.x{SECTION_EXTRACTOR_VERSION}")
+            ).fetchone()
+        return row[0] if row else None
+
+    def documents(self):
+        """Return the IDs of every stored document."""
+        with self._lock:
+            rows = self._connection.execute("SELECT DISTINCT document_id FROM versions ORDER BY document_id").fetchall()
+        return [row[0] for row in rows]
+
+    def document(self, document_id, version=None, table_format=DEFAULT_TABLE_FORMAT):
+        """
+        Return one stored codebook version as a section source.
+
+        Args:
+            document_id (str): Codebook document ID
+            version (str, optional): Defaults to the latest stored version
+            table_format (str): Table serialization to read
+
+        Returns:
+            CorpusDocument: The document, or None if no version is stored
+        """
+        version = version or self.latest_version(document_id)
+        if version is None:
+            return None
+        return CorpusDocument(self, document_id, version, table_format)
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CorpusDocument:
+    """
+    One stored codebook version.
+
+    get_section_content in codebook_helpers accepts it in place of the HTML, so it can
+    be handed to QdrantIngestor as the document.
+    """
+
+    def __init__(self, store, document_id, version, table_format=DEFAULT_TABLE_FORMAT):
+        self.store = store
+        self.document_id = document_id
+        self.version = version
+        self.table_format = table_format
+
+    def get_sections(self, section_numbers, table_format=None):
+        """Return the stored sections among section_numbers, keyed by number."""
+        return self.store.get_sections(self.document_id, self.version, table_format or self.table_format, section_numbers)
+
+    def put_sections(self, contents, table_format=None):
+        """Store extracted sections under this version."""
+        return self.store.put_sections(self.document_id, self.version, table_format or self.table_format, contents)
+
+    def sections(self, table_format=None):
+        """Return the stored sections as section_list entries."""
+        return self.store.list_sections(self.document_id, self.version, table_format or self.table_format)
+
+    def get_section_content(self, section_number, table_format=None):
+        """Read one section, in the shape codebook_helpers.get_section_content returns."""
+        content = self.get_sections([section_number], table_format).get(section_number)
+        if content is None:
+            return {
+                "error": f"Section {section_number} not found in corpus version {self.version} of {self.document_id}",
+                "section_number": section_number,
+                "content": ""
+            }
+        return content
@@ -0,0 +1,324 @@
+"""
+Dimensional standards of a codebook (setbacks, heights, lot sizes, ...) read from its tables.
+
+Development standards tables give one value per zone and standard, with the zones
+either across the header (one row per standard) or down the first column (one column
+per standard). At ingest each cell whose label matches a querier question is parsed
+into a numeric value and unit with a confidence score and stored in a local SQLite
+table indexed by document and zone. The querier answers from that table and only asks
+the LLM about standards that are missing or not confidently parsed.
+"""
+import os
+import re
+import sqlite3
+import threading
+
+from src.utils.codebook_helpers import CODEBOOK_DATA_DIR, section_tables, table_cell_grid
+from src.utils.zone_codes import is_zone_code, normalize_zone_code, zone_header_row
+
+DIMENSIONAL_STANDARDS_DB = os.getenv(
+    "DIMENSIONAL_STANDARDS_DB", os.path.join(CODEBOOK_DATA_DIR, "dimensional_standards.sqlite")
+)
+STANDARDS_HEADER_ROWS = 3
+# Standards below this confidence are left to the LLM
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+SETBACK = r"setback|yard"
+# (query_type, patterns that must all match the label, pattern that must not), most specific first
+STANDARD_LABELS = [
+    ("accessory_building_setback", [r"accessory", SETBACK], None),
+    ("street_side_setback", [r"street\s*side|side\s*street|corner|exterior\s+side", SETBACK], None),
+    ("front_setback", [r"front", SETBACK], r"accessory"),
+    ("side_yard_setback", [r"side", SETBACK], r"accessory|total|aggregate|combined|sum|both"),
+    ("rear_setback", [r"rear", SETBACK], r"accessory"),
+    ("maximum_building_height", [r"height"], r"accessory|fence|wall|sign|tower"),
+    ("maximum_lot_coverage", [r"coverage"], r"landscap|impervious"),
+    ("lot_frontage", [r"frontage"], None),
+    ("lot_width", [r"lot\s+width|^(?:minimum\s+)?width"], r"frontage"),
+    ("lot_size", [r"lot\s+(?:area|size)|^(?:minimum\s+)?area"], r"per\s+(?:dwelling|unit|family)"),
+    ("living_area", [r"living|floor\s+area|dwelling\s+(?:unit\s+)?size"], r"ratio|far\b"),
+    ("density", [r"density|units?\s*(?:/|per)\s*acre|du/ac"], None),
+]
+STANDARD_LABEL_PATTERNS = [
+    (query_type, [re.compile(p, re.I) for p in required], re.compile(excluded, re.I) if excluded else None)
+    for query_type, required, excluded in STANDARD_LABELS
+]
+
+# Canonical unit of each spelling found in tables
+UNIT_ALIASES = [
+    ("square feet", r"sq\.?\s*ft\.?|square\s+f(?:ee|oo)t|s\.?\s*f\.?"),
+    ("units per acre", r"(?:dwelling\s+)?units?\s*(?:/|per)\s*acre|du\s*/\s*ac(?:re)?"),
+    ("acres", r"acres?|ac\."),
+    ("percent", r"%|percent"),
+    ("feet", r"feet|foot|ft\.?|'"),
+    ("stories", r"stor(?:y|ies)"),
+]
+UNIT_PATTERN = "|".join(f"(?P<u{i}>{pattern})" for i, (_, pattern) in enumerate(UNIT_ALIASES))
+VALUE_PATTERN = re.compile(rf"(?P<number>\d[\d,]*(?:\.\d+)?)\s*(?:{UNIT_PATTERN})?", re.I)
+LABEL_UNIT_PATTERN = re.compile(rf"(?<![A-Za-z])(?:{UNIT_PATTERN})(?![A-Za-z])", re.I)
+# A cell holding nothing but a value: "35", "35 ft.", "30%", "10,000 sq. ft. (a)"
+SINGLE_VALUE_PATTERN = re.compile(rf"^\s*{VALUE_PATTERN.pattern}\s*(?:\(\w{{1,2}}\)|\*+|\[\w{{1,2}}\])?\s*$", re.I)
+
+# Units a question expects, the default first: it applies when neither cell nor label names one
+EXPECTED_UNITS = {
+    "accessory_building_setback": ("feet",),
+    "street_side_setback": ("feet",),
+    "front_setback": ("feet",),
+    "side_yard_setback": ("feet",),
+    "rear_setback": ("feet",),
+    "maximum_building_height": ("feet",),
+    "maximum_lot_coverage": ("percent",),
+    "lot_frontage": ("feet",),
+    "lot_width": ("feet",),
+    "lot_size": ("square feet", "acres"),
+    "living_area": ("square feet",),
+    "density": ("units per acre",),
+}
+
+
+def classify_standard(label):
+    """Return the querier query type a table label describes, or None."""
+    for query_type, required, excluded in STANDARD_LABEL_PATTERNS:
+        if all(pattern.search(label) for pattern in required) and not (excluded and excluded.search(label)):
+            return query_type
+    return None
+
+
+def _unit_of(match):
+    """Return the canonical unit of a VALUE_PATTERN or LABEL_UNIT_PATTERN match, or None."""
+    for i, (unit, _) in enumerate(UNIT_ALIASES):
+        if match.group(f"u{i}"):
+            return unit
+    return None
+
+
+def parse_standard_value(cell, label, query_type):
+    """
+    Parse a standards table cell into a value, unit and confidence.
+
+    A cell holding a single value whose unit is written in the cell or its label scores
+    1.0; a unit taken from the query type's default scores 0.9. Cells with several
+    values or extra wording, and units the question does not expect (e.g. stories for a
+    height in feet), score low so the question goes to the LLM.
+
+    Args:
+        cell (str): Cell text
+        label (str): Row or column label of the cell
+        query_type (str): The standard, see STANDARD_LABELS
+
+    Returns:
+        tuple: (value, unit, confidence), or None if the cell holds no number
+    """
+    matches = list(VALUE_PATTERN.finditer(cell))
+    if not matches:
+        return None
+    match = matches[0]
+    value = float(match.group("number").replace(",", ""))
+    expected = EXPECTED_UNITS[query_type]
+
+    confidence = 1.0 if SINGLE_VALUE_PATTERN.match(cell) else 0.5
+    unit = _unit_of(match)
+    if unit is None:
+        label_units = {_unit_of(m) for m in LABEL_UNIT_PATTERN.finditer(label)}
+        unit = next(iter(label_units)) if len(label_units) == 1 else None
+    if unit is None:
+        unit = expected[0]
+        confidence *= 0.9
+    if unit not in expected:
+        confidence = min(confidence, 0.3)
+    return value, unit, confidence
+
+
+def _header_label(rows, header_count, column):
+    """Join the distinct header cells above a column into one label."""
+    parts = []
+    for row in rows[:header_count]:
+        text = row[column].strip()
+        if text and text not in parts:
+            parts.append(text)
+    return " ".join(parts)
+
+
+def _zone_row_cells(rows, header_row):
+    """Yield (zone, label, cell) for a table with zones across its header row."""
+    header_index, zone_columns = header_row
+    label_columns = [i for i in range(len(rows[header_index])) if i not in zone_columns]
+    category = ""
+    for row in rows[header_index + 1:]:
+        # Rows spanning the whole table ("Minimum Setbacks") prefix the labels below them
+        if len({cell.strip() for cell in row}) == 1:
+            category = row[0].strip()
+            continue
+        labels = []
+        for i in label_columns:
+            if row[i].strip() and row[i].strip() not in labels:
+                labels.append(row[i].strip())
+        label = " ".join([category] + labels).strip()
+        for i in zone_columns:
+            yield rows[header_index][i].strip(), label, row[i]
+
+
+def _zone_column_cells(rows):
+    """Yield (zone, label, cell) for a table with zones down its first column."""
+    zone_rows = [i for i, row in enumerate(rows) if is_zone_code(row[0])]
+    if len(zone_rows) < 2 or zone_rows[0] == 0:
+        return
+    header_count = zone_rows[0]
+    labels = [_header_label(rows, header_count, column) for column in range(len(rows[0]))]
+    for i in zone_rows:
+        for column in range(1, len(rows[i])):
+            yield rows[i][0].strip(), labels[column], rows[i][column]
+
+
+def table_standards(rows):
+    """
+    Read the dimensional standards of a table grid.
+
+    Args:
+        rows (list): Cell grid from table_cell_grid
+
+    Returns:
+        list: (query_type, zone_label, value, unit, confidence, label, cell) tuples
+    """
+    header_row = zone_header_row(rows, STANDARDS_HEADER_ROWS)
+    cells = _zone_row_cells(rows, header_row) if header_row else _zone_column_cells(rows)
+    standards = []
+    for zone, label, cell in cells:
+        query_type = classify_standard(label)
+        if query_type is None:
+            continue
+        parsed = parse_standard_value(cell, label, query_type)
+        if parsed is not None:
+            standards.append((query_type, zone, *parsed, label, cell.strip()))
+    return standards
+
+
+def extract_dimensional_standards(index):
+    """
+    Collect the dimensional standards of every section of a codebook.
+
+    Args:
+        index (CodebookIndex): Parsed codebook
+
+    Returns:
+        list: table_standards tuples with the "chapter.section" number appended
+    """
+    standards = []
+    for entry in index.section_entries:
+        section = f"{entry['chapter_number']}.{entry['section_number']}"
+        for table in section_tables(entry["element"]):
+            rows = table_cell_grid(table)
+            if rows:
+                standards.extend(standard + (section,) for standard in table_standards(rows))
+    return standards
+
+
+class DimensionalStandardStore:
+    """SQLite store of dimensional standards, indexed by (document_id, zone_code, query_type)."""
+
+    def __init__(self, path=DIMENSIONAL_STANDARDS_DB):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS dimensional_standards ("
+                "document_id TEXT NOT NULL, query_type TEXT NOT NULL, zone_code TEXT NOT NULL, "
+                "zone_label TEXT NOT NULL, value REAL NOT NULL, unit TEXT NOT NULL, confidence REAL NOT NULL, "
+                "label TEXT NOT NULL, cell TEXT NOT NULL, section TEXT NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS dimensional_standards_zone "
+                "ON dimensional_standards (document_id, zone_code, query_type)"
+            )
+
+    def replace_document(self, document_id, standards):
+        """
+        Replace the standards of a document in one transaction.
+
+        Args:
+            document_id (str): Codebook document ID
+            standards (list): From extract_dimensional_standards
+
+        Returns:
+            int: Number of standards stored
+        """
+        rows = [
+            (document_id, query_type, normalize_zone_code(zone), zone, value, unit, confidence, label, cell, section)
+            for query_type, zone, value, unit, confidence, label, cell, section in standards
+        ]
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM dimensional_standards WHERE document_id = ?", (document_id,))
+            self._connection.executemany(
+                "INSERT INTO dimensional_standards (document_id, query_type, zone_code, zone_label, value, unit, "
+                "confidence, label, cell, section) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def lookup(self, document_id, zone_code, query_types):
+        """
+        Return the best standard of a zone for each query type.
+
+        When a document gives a standard several different values for one zone (by
+        use, lot type, ...), the confidence is capped at 0.5 so the LLM can explain them.
+
+        Args:
+            document_id (str): Codebook document ID
+            zone_code (str): Zone code in any spelling ("R-1", "r1")
+            query_types (list): Standards to look up
+
+        Returns:
+            dict: query_type -> {"value", "unit", "confidence", "cell", "label", "section"}
+                  for the query types found
+        """
+        placeholders = ", ".join("?" for _ in query_types)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT query_type, value, unit, confidence, cell, label, section FROM dimensional_standards "
+                f"WHERE document_id = ? AND zone_code = ? AND query_type IN ({placeholders}) ORDER BY rowid",
+                (document_id, normalize_zone_code(zone_code), *query_types)
+            ).fetchall()
+        candidates = {}
+        for query_type, value, unit, confidence, cell, label, section in rows:
+            candidates.setdefault(query_type, []).append(
+                {"value": value, "unit": unit, "confidence": confidence, "cell": cell, "label": label, "section": section}
+            )
+        best = {}
+        for query_type, standards in candidates.items():
+            standard = dict(max(standards, key=lambda s: s["confidence"]))
+            if len({(s["value"], s["unit"]) for s in standards}) > 1:
+                standard["confidence"] = min(standard["confidence"], 0.5)
+            best[query_type] = standard
+        return best
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def format_standard(value, unit):
+    """Format a standard the way querier answers state it: "35 feet", "30%", "10,000 square feet"."""
+    number = f"{value:,.0f}" if value.is_integer() else f"{value:,}"
+    return f"{number}%" if unit == "percent" else f"{number} {unit}"
+
+
+def standard_answer(standard):
+    """
+    Build a querier result from a stored standard.
+
+    Returns:
+        dict: {"answer", "section_list", "chunks"}, the shape of send_query results
+    """
+    return {
+        "answer": format_standard(standard["value"], standard["unit"]),
+        "section_list": [standard["section"]],
+        "chunks": []
+    }
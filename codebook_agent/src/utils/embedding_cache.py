@@ -0,0 +1,186 @@
+"""
+Local embedding cache keyed by (model name, sha256 of the text).
+
+Re-indexing a codebook whose text has not changed (purge_and_repopulate, rechunking,
+refreshing a collection) would otherwise pay for every embedding again. Vectors are
+stored as float32 blobs in SQLite; the least recently used entries are evicted once
+the cache holds more than max_entries vectors. Recency is a counter stored with each
+entry, bumped on every read or write.
+"""
+import asyncio
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from src.utils.codebook_helpers import CODEBOOK_DATA_DIR
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(CODEBOOK_DATA_DIR, "embeddings.sqlite"))
+# About 6 KB per 1536-dimension vector, so the default bound is ~600 MB
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+# SQLite's default limit on bound parameters is 999
+LOOKUP_BATCH_SIZE = 500
+
+
+def text_hash(text: str) -> str:
+    """Return the cache key of a text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite store of embedding vectors with LRU eviction and hit/miss counters."""
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, last_used INTEGER NOT NULL, "
+                "PRIMARY KEY (model, text_hash))"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._clock = self._connection.execute("SELECT COALESCE(MAX(last_used), 0) FROM embeddings").fetchone()[0]
+            # Kept up to date by put_many, so eviction does not count the table on every write
+            self._rows = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up cached vectors and mark them as used.
+
+        Returns:
+            dict: text hash -> vector, for the texts found
+        """
+        keys = [text_hash(text) for text in texts]
+        hashes = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock, self._connection:
+            for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND text_hash IN ({', '.join('?' * len(batch))})",
+                    [model, *batch]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = self._tick()
+                self._connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, key) for key in found]
+                )
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        """Store vectors, then evict the least recently used entries above max_entries."""
+        with self._lock:
+            now = self._tick()
+        rows = {text_hash(text): (model, text_hash(text), array("f", vector).tobytes(), now)
+                for text, vector in zip(texts, vectors)}
+        hashes = list(rows)
+        with self._lock, self._connection:
+            existing = 0
+            for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+                existing += self._connection.execute(
+                    f"SELECT COUNT(*) FROM embeddings WHERE model = ? AND text_hash IN ({', '.join('?' * len(batch))})",
+                    [model, *batch]
+                ).fetchone()[0]
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                list(rows.values())
+            )
+            self._rows += len(rows) - existing
+            excess = self._rows - self.max_entries
+            if excess > 0:
+                deleted = self._connection.execute(
+                    "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                ).rowcount
+                self._rows -= deleted
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit and miss counts since the cache was opened."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+@functools.lru_cache(maxsize=None)
+def shared_embedding_cache(path=EMBEDDING_CACHE_PATH) -> EmbeddingCache:
+    """Return the process-wide cache of a path, so every Qdrant client shares one connection."""
+    return EmbeddingCache(path)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings that answer from an EmbeddingCache and only send the misses to the model."""
+
+    def __init__(self, embeddings: Embeddings, cache: Optional[EmbeddingCache] = None, model: Optional[str] = None):
+        self.embeddings = embeddings
+        # Without a cache, the shared one is opened on first use
+        self._cache = cache
+        self.model = model or getattr(embeddings, "model", type(embeddings).__name__)
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        if self._cache is None:
+            self._cache = shared_embedding_cache()
+        return self._cache
+
+    def _split(self, texts):
+        found = self.cache.get_many(self.model, texts)
+        missing = list(dict.fromkeys(text for text in texts if text_hash(text) not in found))
+        return found, missing
+
+    def _merge(self, texts, found, missing, vectors):
+        if missing:
+            self.cache.put_many(self.model, missing, vectors)
+            found.update(zip((text_hash(text) for text in missing), vectors))
+        return [found[text_hash(text)] for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        found, missing = self._split(texts)
+        vectors = self.embeddings.embed_documents(missing) if missing else []
+        return self._merge(texts, found, missing, vectors)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # SQLite calls run in a thread so concurrent embedding requests keep the loop free
+        found, missing = await asyncio.to_thread(self._split, texts)
+        vectors = await self.embeddings.aembed_documents(missing) if missing else []
+        return await asyncio.to_thread(self._merge, texts, found, missing, vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
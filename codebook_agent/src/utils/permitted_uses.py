@@ -0,0 +1,184 @@
+"""
+Permitted-use tables of a codebook as (document_id, use, zone_code, cell_value, section) triples.
+
+Use tables list land uses down the first column and zoning districts across the header,
+with a marker such as P (permitted), S (special use) or C (conditional) in each cell.
+They are parsed at ingest into a local SQLite store indexed by document and zone, so
+"which uses are permitted in R-1?" is answered by a query instead of an LLM reading
+the whole table.
+"""
+import os
+import re
+import sqlite3
+import threading
+
+from src.utils.codebook_helpers import CODEBOOK_DATA_DIR, section_tables, table_cell_grid
+from src.utils.zone_codes import normalize_zone_code, zone_header_row
+
+PERMITTED_USES_DB = os.getenv("PERMITTED_USES_DB", os.path.join(CODEBOOK_DATA_DIR, "permitted_uses.sqlite"))
+# The zone header row is one of the first rows of a use table
+USE_TABLE_HEADER_ROWS = 3
+# Share of filled zone cells that must be markers for a table to count as a use table
+USE_TABLE_MARKER_SHARE = 0.8
+# Short, non-numeric cell values: P, S, C, SE, A*, P(1), ...
+USE_MARKER_PATTERN = re.compile(r"^[A-Za-z•✓✔*-]{1,3}(?:\*|\(\d{1,2}\)|\d)?$")
+# Markers answering "permitted uses": permitted (P) or special use (S), with any footnote
+PERMITTED_VALUE_PATTERN = re.compile(r"^[PS](?![A-Za-z])")
+
+
+def use_table_triples(rows):
+    """
+    Read a table grid as a use table.
+
+    Args:
+        rows (list): Cell grid from table_cell_grid
+
+    Returns:
+        list: (use, zone_label, cell_value) for every filled use/zone cell, or an empty
+              list if the table is not a use table
+    """
+    header_row = zone_header_row(rows, USE_TABLE_HEADER_ROWS)
+    if header_row is None:
+        return []
+    header_index, zone_columns = header_row
+    header = rows[header_index]
+    use_column = next((i for i in range(len(header)) if i not in zone_columns), None)
+    if use_column is None:
+        return []
+
+    triples = []
+    markers = 0
+    for row in rows[header_index + 1:]:
+        use = row[use_column].strip()
+        # Category rows ("Residential Uses") span the whole table
+        if not use or all(row[i] == use for i in zone_columns):
+            continue
+        for i in zone_columns:
+            value = row[i].strip()
+            if value:
+                markers += bool(USE_MARKER_PATTERN.match(value))
+                triples.append((use, header[i].strip(), value))
+    if not triples or markers / len(triples) < USE_TABLE_MARKER_SHARE:
+        return []
+    return triples
+
+
+def extract_permitted_use_triples(index):
+    """
+    Collect the use table cells of every section of a codebook.
+
+    Args:
+        index (CodebookIndex): Parsed codebook
+
+    Returns:
+        list: (use, zone_label, cell_value, section) tuples, section as "chapter.section"
+    """
+    triples = []
+    for entry in index.section_entries:
+        section = f"{entry['chapter_number']}.{entry['section_number']}"
+        for table in section_tables(entry["element"]):
+            rows = table_cell_grid(table)
+            if rows:
+                triples.extend((use, zone, value, section) for use, zone, value in use_table_triples(rows))
+    return triples
+
+
+def is_permitted_value(cell_value):
+    """Return True if a use table cell marks the use as permitted or special use."""
+    return bool(PERMITTED_VALUE_PATTERN.match(cell_value.strip()))
+
+
+class PermittedUseStore:
+    """SQLite store of permitted-use triples, indexed by (document_id, zone_code)."""
+
+    def __init__(self, path=PERMITTED_USES_DB):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS permitted_uses ("
+                "document_id TEXT NOT NULL, use_name TEXT NOT NULL, zone_code TEXT NOT NULL, "
+                "zone_label TEXT NOT NULL, cell_value TEXT NOT NULL, section TEXT NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS permitted_uses_zone ON permitted_uses (document_id, zone_code)"
+            )
+
+    def replace_document(self, document_id, triples):
+        """
+        Replace the triples of a document in one transaction.
+
+        Args:
+            document_id (str): Codebook document ID
+            triples (list): (use, zone_label, cell_value, section) tuples
+
+        Returns:
+            int: Number of triples stored
+        """
+        rows = [
+            (document_id, use, normalize_zone_code(zone), zone, value, section)
+            for use, zone, value, section in triples
+        ]
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM permitted_uses WHERE document_id = ?", (document_id,))
+            self._connection.executemany(
+                "INSERT INTO permitted_uses (document_id, use_name, zone_code, zone_label, cell_value, section) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def lookup(self, document_id, zone_code):
+        """
+        Return every use table cell of a zone, in document order.
+
+        Args:
+            document_id (str): Codebook document ID
+            zone_code (str): Zone code in any spelling ("R-1", "r1")
+
+        Returns:
+            list: {"use", "zone_code", "value", "section"} dicts; empty if no use table
+                  of the document has a column for the zone
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT use_name, zone_label, cell_value, section FROM permitted_uses "
+                "WHERE document_id = ? AND zone_code = ? ORDER BY rowid",
+                (document_id, normalize_zone_code(zone_code))
+            ).fetchall()
+        return [{"use": use, "zone_code": zone, "value": value, "section": section} for use, zone, value, section in rows]
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def permitted_uses_answer(rows, zone_code):
+    """
+    Build a querier result from the store rows of a zone.
+
+    Args:
+        rows (list): From PermittedUseStore.lookup
+        zone_code (str): The requested zone code
+
+    Returns:
+        dict: {"answer", "section_list", "chunks"}, the shape of send_query results
+    """
+    permitted = [row for row in rows if is_permitted_value(row["value"])]
+    if permitted:
+        answer = "\n".join(f"{row['use']} ({row['value']})" for row in permitted)
+    else:
+        answer = f"No uses are marked P or S for zone {zone_code}."
+    return {
+        "answer": answer,
+        "section_list": sorted({row["section"] for row in rows}),
+        "chunks": []
+    }
@@ -0,0 +1,220 @@
+"""
+Content-addressed storage for parsed codebook tables.
+
+Tables are keyed by a hash of their content, so a table repeated across sections or
+municipalities is stored once. The default store keeps a bounded number of tables in
+memory; the JSONL and SQLite stores persist them to a single file, written in batches
+on flush() rather than once per table, and read them back from disk on demand. Only
+tables not flushed yet are held in memory by a persistent store.
+"""
+import os
+import json
+import atexit
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+FLUSH_BATCH_SIZE = 100
+# Tables kept by the in-memory store; the oldest are dropped beyond this
+MEMORY_STORE_MAX_TABLES = 10000
+TABLE_STORE_PATH = os.getenv("TABLE_STORE_PATH")
+
+
+def table_key(table):
+    """Return the content hash used as the key of a parsed table."""
+    canonical = json.dumps(table, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class TableStore:
+    """In-memory table store bounded to max_tables; the base for the persistent stores."""
+
+    def __init__(self, flush_batch_size=FLUSH_BATCH_SIZE, max_tables=MEMORY_STORE_MAX_TABLES):
+        self.flush_batch_size = flush_batch_size
+        self.max_tables = max_tables
+        self._memory = OrderedDict()
+        # Tables added since the last flush, by key
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def put(self, table):
+        """
+        Add a table, unless an identical one is already stored.
+
+        Args:
+            table (dict): Parsed table
+
+        Returns:
+            str: The table's content key
+        """
+        key = table_key(table)
+        with self._lock:
+            if key in self._pending or self._contains_persisted(key):
+                return key
+            self._pending[key] = table
+            should_flush = len(self._pending) >= self.flush_batch_size
+        if should_flush:
+            self.flush()
+        return key
+
+    def get(self, key):
+        """Return the table stored under key, or None."""
+        table = self._pending.get(key)
+        if table is None:
+            table = self._load_persisted(key)
+        return table
+
+    def __contains__(self, key):
+        return key in self._pending or self._contains_persisted(key)
+
+    def __len__(self):
+        return self._persisted_count() + len(self._pending)
+
+    def flush(self):
+        """Persist every table added since the last flush in one write."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if pending:
+                self._write(list(pending.items()))
+
+    def close(self):
+        """Flush outstanding tables and release the backing file, if any."""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # Persistence hooks; the in-memory store keeps the newest max_tables tables
+    def _write(self, items):
+        for key, table in items:
+            self._memory[key] = table
+        while len(self._memory) > self.max_tables:
+            self._memory.popitem(last=False)
+
+    def _contains_persisted(self, key):
+        return key in self._memory
+
+    def _load_persisted(self, key):
+        return self._memory.get(key)
+
+    def _persisted_count(self):
+        return len(self._memory)
+
+
+class JsonlTableStore(TableStore):
+    """Table store persisted to one append-only JSONL file; only the line offsets are kept in memory."""
+
+    def __init__(self, path, flush_batch_size=FLUSH_BATCH_SIZE):
+        super().__init__(flush_batch_size)
+        self.path = path
+        # Table key -> byte offset of its line
+        self._offsets = {}
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                offset = 0
+                for line in f:
+                    if line.strip():
+                        self._offsets[json.loads(line)["key"]] = offset
+                    offset += len(line)
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _write(self, items):
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            for key, table in items:
+                line = (json.dumps({"key": key, "table": table}, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                self._offsets[key] = offset
+                offset += len(line)
+
+    def _contains_persisted(self, key):
+        return key in self._offsets
+
+    def _load_persisted(self, key):
+        offset = self._offsets.get(key)
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())["table"]
+
+    def _persisted_count(self):
+        return len(self._offsets)
+
+
+class SqliteTableStore(TableStore):
+    """Table store persisted to a SQLite file; persisted tables are read on demand."""
+
+    def __init__(self, path, flush_batch_size=FLUSH_BATCH_SIZE):
+        super().__init__(flush_batch_size)
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS tables (key TEXT PRIMARY KEY, table_json TEXT NOT NULL)"
+        )
+        self._connection.commit()
+
+    def _write(self, items):
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO tables (key, table_json) VALUES (?, ?)",
+                [(key, json.dumps(table, ensure_ascii=False)) for key, table in items]
+            )
+
+    def _contains_persisted(self, key):
+        return self._connection.execute("SELECT 1 FROM tables WHERE key = ?", (key,)).fetchone() is not None
+
+    def _load_persisted(self, key):
+        row = self._connection.execute("SELECT table_json FROM tables WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _persisted_count(self):
+        return self._connection.execute("SELECT COUNT(*) FROM tables").fetchone()[0]
+
+    def close(self):
+        super().close()
+        self._connection.close()
+
+
+def open_table_store(path=None, flush_batch_size=FLUSH_BATCH_SIZE):
+    """
+    Open the table store for a path.
+
+    Args:
+        path (str, optional): A .jsonl file or a SQLite file (.sqlite, .sqlite3, .db).
+                              None keeps tables in memory only.
+        flush_batch_size (int): Number of new tables buffered before they are written
+
+    Returns:
+        TableStore: The store
+    """
+    if path is None:
+        return TableStore(flush_batch_size)
+    if path.endswith(".jsonl"):
+        return JsonlTableStore(path, flush_batch_size)
+    if path.endswith((".sqlite", ".sqlite3", ".db")):
+        return SqliteTableStore(path, flush_batch_size)
+    raise ValueError(f"Unsupported table store path: {path}. Use a .jsonl or .sqlite file")
+
+
+_default_table_store = None
+
+
+def get_default_table_store():
+    """
+    Return the process-wide table store, opened from TABLE_STORE_PATH (in memory if unset).
+
+    It is closed at interpreter exit, so tables still buffered are written.
+    """
+    global _default_table_store
+    if _default_table_store is None:
+        _default_table_store = open_table_store(TABLE_STORE_PATH)
+        atexit.register(_default_table_store.close)
+    return _default_table_store
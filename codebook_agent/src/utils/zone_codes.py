@@ -0,0 +1,127 @@
+"""
+Zone district codes of a codebook, and where its sections mention them.
+
+A codebook's zoning districts (R-1, C-2, PUD, ...) are the column headers of its use
+and standards tables. The vocabulary is collected from those headers once per document,
+and every chunk is tagged at ingest with the codes its text mentions so retrieval can be
+restricted to chunks about the requested zone (or about no zone in particular).
+"""
+import re
+
+# Short upper-case codes, optionally with a hyphenated or numeric suffix: R-1, RR, C-2A, PUD
+ZONE_CODE_PATTERN = re.compile(r"^[A-Z]{1,4}(?:-[A-Z0-9]{1,3}|[0-9]{1,2}[A-Z]?)?$")
+# Header words that look like codes but are not districts
+ZONE_CODE_STOPWORDS = {
+    "USE", "USES", "ALL", "AND", "OR", "NO", "YES", "NA", "NOTE", "NOTES", "FT", "SF", "SQ", "MIN", "MAX", "TYPE"
+}
+
+
+def normalize_zone_code(code):
+    """Return the comparable form of a zone code: upper case, no spaces or hyphens."""
+    return re.sub(r"[\s\-]", "", code).upper()
+
+
+def is_zone_code(text):
+    """Return True if a header cell looks like a zone district code."""
+    text = text.strip()
+    return len(text) >= 2 and bool(ZONE_CODE_PATTERN.match(text)) and text not in ZONE_CODE_STOPWORDS
+
+
+def table_header_zone_codes(table_element):
+    """
+    Collect the zone codes used as headers of one table.
+
+    Header cells are the <th> cells plus the cells of the first row, since many ALP
+    tables mark their header row with plain <td>s.
+
+    Args:
+        table_element: BeautifulSoup <table> element
+
+    Returns:
+        set: Zone codes as written in the table
+    """
+    cells = table_element.find_all('th')
+    first_row = table_element.find('tr')
+    if first_row is not None:
+        cells += first_row.find_all(['td', 'th'])
+    return {cell.get_text(strip=True) for cell in cells if is_zone_code(cell.get_text(strip=True))}
+
+
+def zone_header_row(rows, max_rows=3):
+    """
+    Find the header row of a table grid whose columns are zone districts.
+
+    Args:
+        rows (list): Cell grid, e.g. from table_cell_grid
+        max_rows (int): Number of leading rows that may hold the header
+
+    Returns:
+        tuple: (row_index, zone_columns), or None if no leading row names two or more zones
+    """
+    for row_index, row in enumerate(rows[:max_rows]):
+        zone_columns = [i for i, cell in enumerate(row) if is_zone_code(cell)]
+        if len(zone_columns) >= 2:
+            return row_index, zone_columns
+    return None
+
+
+def document_zone_codes(soup, extra_codes=()):
+    """
+    Build the zone code vocabulary of a codebook from its table headers.
+
+    Args:
+        soup: Parsed codebook (BeautifulSoup), e.g. CodebookIndex.soup
+        extra_codes (iterable): Codes known from elsewhere, e.g. the requested zone code
+
+    Returns:
+        list: Sorted zone codes as written in the document
+    """
+    codes = set(code.strip() for code in extra_codes if code and code.strip())
+    if soup:
+        for table in soup.find_all('table'):
+            codes |= table_header_zone_codes(table)
+    return sorted(codes)
+
+
+def zone_code_pattern(code):
+    """
+    Return a regex source matching a zone code however it is spelled.
+
+    The code is normalized first and a space or hyphen is allowed wherever letters
+    and digits meet, so "R-1", "R1" and "R 1" all match a vocabulary code of "R-1".
+    """
+    groups = re.findall(r"[A-Z]+|[0-9]+", normalize_zone_code(code))
+    return r"[\s\-]?".join(re.escape(group) for group in groups)
+
+
+def zone_code_matcher(vocabulary):
+    """
+    Compile a regex that finds whole-token mentions of any code in the vocabulary.
+
+    Mentions match in any spelling of a code (see zone_code_pattern).
+
+    Returns:
+        re.Pattern: The matcher, or None for an empty vocabulary
+    """
+    codes = {normalize_zone_code(code) for code in vocabulary or ()} - {""}
+    if not codes:
+        return None
+    # Longest first so "R-1A" wins over "R-1"
+    alternatives = "|".join(zone_code_pattern(code) for code in sorted(codes, key=len, reverse=True))
+    return re.compile(rf"(?<![A-Za-z0-9\-])(?:{alternatives})(?![A-Za-z0-9\-])")
+
+
+def zone_codes_in_text(text, matcher):
+    """
+    Return the normalized zone codes mentioned in a text.
+
+    Args:
+        text (str): Chunk text
+        matcher (re.Pattern): From zone_code_matcher, or None
+
+    Returns:
+        list: Sorted, normalized zone codes (see normalize_zone_code)
+    """
+    if matcher is None:
+        return []
+    return sorted({normalize_zone_code(match) for match in matcher.findall(text)})
@@ -0,0 +1 @@
+"""Benchmarks of the codebook parsing helpers on synthetic ALP exports."""
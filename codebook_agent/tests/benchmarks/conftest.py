@@ -0,0 +1,26 @@
+import os
+import tracemalloc
+
+import pytest
+
+from src.evals.synthetic_codebook import generate_codebook
+
+# Codebook sizes in sections, e.g. BENCHMARK_SECTIONS=100,5000,50000
+BENCHMARK_SECTIONS = [int(size) for size in os.getenv("BENCHMARK_SECTIONS", "100,1000").split(",")]
+BENCHMARK_ROUNDS = int(os.getenv("BENCHMARK_ROUNDS", "3"))
+
+
+@pytest.fixture(scope="session", params=BENCHMARK_SECTIONS, ids=lambda size: f"{size}_sections")
+def codebook_html(request):
+    return generate_codebook(request.param)
+
+
+def record_peak_memory(benchmark, target, *args, **kwargs):
+    """Run target once under tracemalloc and record its peak allocation in the benchmark's extra_info."""
+    tracemalloc.start()
+    try:
+        target(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["peak_mb"] = round(peak / 2**20, 2)
@@ -0,0 +1,78 @@
+"""
+Time and peak memory of the codebook helpers.
+
+Run with: PYTHONPATH=src python -m pytest tests/benchmarks --benchmark-only
+Peak traced memory (MB) of one run is reported in each benchmark's extra_info, e.g.
+with --benchmark-json or --benchmark-columns.
+"""
+import pytest
+from bs4 import BeautifulSoup
+
+from src.utils.codebook_helpers import (
+    TABLE_ENGINES,
+    CodebookIndex,
+    extract_table_of_contents,
+    get_section_content,
+    iter_section_records,
+    load_html,
+    normalize_table,
+)
+from tests.benchmarks.conftest import BENCHMARK_ROUNDS, record_peak_memory
+
+# Sections extracted per get_section_content round
+SECTION_SAMPLE = 50
+
+
+def fresh_index(html):
+    """Pedantic setup: a new index each round, so memoized outlines and texts are not reused."""
+    return (CodebookIndex(html, "lxml"),), {}
+
+
+@pytest.mark.parametrize("parser_backend", ["html.parser", "lxml"])
+def test_load_html(benchmark, codebook_html, parser_backend):
+    record_peak_memory(benchmark, load_html, codebook_html, parser_backend)
+    soup = benchmark.pedantic(load_html, args=(codebook_html, parser_backend), rounds=BENCHMARK_ROUNDS)
+    assert soup.find("div", class_="Section") is not None
+
+
+def test_iter_section_records_stream(benchmark, codebook_html):
+    def consume():
+        return sum(1 for _ in iter_section_records(codebook_html, "lxml-stream"))
+
+    record_peak_memory(benchmark, consume)
+    assert benchmark.pedantic(consume, rounds=BENCHMARK_ROUNDS) > 0
+
+
+@pytest.mark.parametrize("hierarchy_depth", ["titles_only", "titles_and_chapters", "full", "chapter"])
+def test_extract_table_of_contents(benchmark, codebook_html, hierarchy_depth):
+    def extract(index):
+        if hierarchy_depth == "chapter":
+            return extract_table_of_contents(index, target_chapter="150")
+        return extract_table_of_contents(index, hierarchy_depth)
+
+    record_peak_memory(benchmark, extract, *fresh_index(codebook_html)[0])
+    toc = benchmark.pedantic(extract, setup=lambda: fresh_index(codebook_html), rounds=BENCHMARK_ROUNDS)
+    assert isinstance(toc, list) and toc
+
+
+def test_get_section_content(benchmark, codebook_html):
+    numbers = list(fresh_index(codebook_html)[0][0].sections)
+    sample = numbers[::max(1, len(numbers) // SECTION_SAMPLE)][:SECTION_SAMPLE]
+
+    def extract(index):
+        return [get_section_content(index, number) for number in sample]
+
+    record_peak_memory(benchmark, extract, *fresh_index(codebook_html)[0])
+    sections = benchmark.pedantic(extract, setup=lambda: fresh_index(codebook_html), rounds=BENCHMARK_ROUNDS)
+    assert all("error" not in section for section in sections)
+
+
+@pytest.mark.parametrize("engine", TABLE_ENGINES)
+def test_normalize_table(benchmark, codebook_html, engine):
+    tables = [str(table) for table in BeautifulSoup(codebook_html, "lxml").find_all("table")]
+
+    def normalize():
+        return [normalize_table(table, engine=engine) for table in tables]
+
+    record_peak_memory(benchmark, normalize)
+    assert len(benchmark.pedantic(normalize, rounds=BENCHMARK_ROUNDS)) == len(tables)
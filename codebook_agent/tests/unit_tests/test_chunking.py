@@ -0,0 +1,40 @@
+from src.utils.chunking import StructuredChunker
+from src.utils.codebook_helpers import render_section_text
+
+
+def word_count(text):
+    return len(text.split())
+
+
+TABLE_ROWS = [["Use", "R-1", "C-1"]] + [[f"Use number {i}", "P", ""] for i in range(12)]
+
+
+def test_table_split_repeats_header_in_every_chunk() -> None:
+    text = render_section_text("§ 154.040 PERMITTED USE TABLE.", ["(A) Uses are permitted as follows.", TABLE_ROWS], "pipe")
+    chunker = StructuredChunker("pipe", max_tokens=25, length_function=word_count)
+
+    chunks = chunker.split_text(text)
+
+    table_chunks = [chunk for chunk in chunks if "Use number" in chunk]
+    assert len(table_chunks) > 1
+    for chunk in table_chunks:
+        assert chunk.startswith("§ 154.040 PERMITTED USE TABLE.")
+        assert "|Use|R-1|C-1|\n|---|---|---|" in chunk
+    rows = [line for chunk in table_chunks for line in chunk.split("\n") if line.startswith("|Use number")]
+    assert rows == [f"|Use number {i}|P||" for i in range(12)]
+    assert all(word_count(chunk) <= 25 for chunk in chunks)
+
+
+def test_small_units_stay_whole() -> None:
+    chunks_in = ["(A) General.", "(1) First item of the list.", "(2) Second item.", "(B) Other rules apply here.", TABLE_ROWS[:3]]
+    text = render_section_text("§ 154.001 TITLE.", chunks_in, "pretty")
+    chunker = StructuredChunker("pretty", max_tokens=40, length_function=word_count)
+
+    title, units = chunker.section_units(text)
+    chunks = chunker.split_text(text)
+
+    assert title == "§ 154.001 TITLE."
+    assert units[0] == "(A) General.\n(1) First item of the list.\n(2) Second item."
+    assert chunks[0] == "§ 154.001 TITLE.\n(A) General.\n(1) First item of the list.\n(2) Second item.\n(B) Other rules apply here."
+    assert len(chunks) == 2 and chunks[1].count("Use number") == 2 and "| R-1 |" in chunks[1]
+    assert "块" not in "".join(chunks)
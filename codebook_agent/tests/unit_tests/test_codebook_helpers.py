@@ -0,0 +1,199 @@
+from src.utils.codebook_helpers import (
+    CodebookIndex,
+    SectionOffsetIndex,
+    cache_codebook_html,
+    create_extraction_pool,
+    extract_section_batch,
+    extract_section_text,
+    extract_table_of_contents,
+    find_section_element,
+    get_codebook_index,
+    get_section_content,
+    iter_section_records,
+    load_html,
+    normalize_table,
+    render_table_rows,
+)
+
+CODEBOOK_HTML = """
+<html><body>
+<div class="Title rbox">TITLE XV: LAND USAGE</div>
+<div class="Chapter rbox">CHAPTER 154: ZONING CODE</div>
+<div class="Section toc-destination rbox">§ 154.001 TITLE.</div>
+<div class="para"><p>This chapter shall be known as the Zoning Code.</p></div>
+<div class="Section toc-destination rbox">§ 154.040 PERMITTED USE TABLE.</div>
+<div class="para">
+  <p>Uses are permitted as shown below.</p>
+  <div class="xsl-table">
+    <table>
+      <tr><th>Use</th><th>R-1</th><th>C-1</th></tr>
+      <tr><td colspan="3">Residential Uses</td></tr>
+      <tr><td>Dwelling, single-family</td><td>P</td><td></td></tr>
+      <tr><td>Retail store</td><td></td><td>P</td></tr>
+    </table>
+  </div>
+</div>
+<div class="Section toc-destination rbox">§ 154.041 DEVELOPMENT STANDARDS.</div>
+<div class="para"><p>See § 154.040 for permitted uses.</p></div>
+<div class="Chapter rbox">CHAPTER 155: SUBDIVISIONS</div>
+<div class="Section toc-destination rbox">§ 155.001 PURPOSE.</div>
+<div class="para"><p>The purpose of this chapter.</p></div>
+</body></html>
+"""
+
+
+def test_index_maps_section_numbers_to_headings() -> None:
+    index = CodebookIndex(CODEBOOK_HTML)
+    assert list(index.sections) == ["154.001", "154.040", "154.041", "155.001"]
+    assert index.get_section("154", "040")["name"] == "PERMITTED USE TABLE."
+    assert index.get_section("154", "999") is None
+
+
+def test_find_section_element_accepts_index_or_soup() -> None:
+    index = CodebookIndex(CODEBOOK_HTML)
+    element, name = find_section_element(index, "155", "001")
+    soup_element, soup_name = find_section_element(load_html(CODEBOOK_HTML), "155", "001")
+    assert name == soup_name == "PURPOSE."
+    assert element.get_text(strip=True) == soup_element.get_text(strip=True)
+
+
+def test_get_section_content_is_stable_across_lookups() -> None:
+    index = CodebookIndex(CODEBOOK_HTML)
+    first = get_section_content(index, "154.040")
+    second = get_section_content(index, "154.040")
+    assert first == second
+    assert "Dwelling, single-family" in first["content"]
+    assert first == get_section_content(CODEBOOK_HTML, "154.040")
+
+
+def test_get_section_content_reports_missing_sections() -> None:
+    result = get_section_content(CODEBOOK_HTML, "154.999")
+    assert "error" in result
+    assert get_section_content(CODEBOOK_HTML, "154")["error"].startswith("Invalid")
+
+
+def test_get_codebook_index_reuses_index_for_identical_content() -> None:
+    index = get_codebook_index(CODEBOOK_HTML)
+    assert get_codebook_index(CODEBOOK_HTML) is index
+    assert get_codebook_index(index) is index
+
+
+def test_target_chapter_lists_only_that_chapter() -> None:
+    sections = extract_table_of_contents(CODEBOOK_HTML, target_chapter="154")
+    assert [s["sectionNumber"] for s in sections] == ["001", "040", "041"]
+    assert all(s["chapterNumber"] == "154" for s in sections)
+    missing = extract_table_of_contents(CODEBOOK_HTML, target_chapter="999")
+    assert "error" in missing
+
+
+def test_streaming_backend_matches_tree_backends() -> None:
+    expected = list(iter_section_records(CODEBOOK_HTML))
+    assert [r["type"] for r in expected] == [
+        "Title", "Chapter", "Section", "Section", "Section", "Chapter", "Section"
+    ]
+    assert list(iter_section_records(CODEBOOK_HTML, "lxml")) == expected
+    assert list(iter_section_records(CODEBOOK_HTML, "lxml-stream")) == expected
+
+
+def test_full_hierarchy_attaches_sections_to_their_chapter() -> None:
+    toc = extract_table_of_contents(CODEBOOK_HTML, hierarchy_depth="full")
+    assert len(toc) == 1
+    chapters = toc[0]["children"]
+    assert [c["chapterNumber"] for c in chapters] == ["154", "155"]
+    assert [s["sectionNumber"] for s in chapters[0]["children"]] == ["001", "040", "041"]
+    assert [s["id"] for s in chapters[1]["children"]] == ["chapter-155-section-001"]
+
+    titles_only = extract_table_of_contents(CODEBOOK_HTML)
+    assert titles_only == [{"title": "TITLE XV: LAND USAGE", "type": "Title", "level": 0, "id": "title-0"}]
+
+
+def test_outline_is_memoized_per_document() -> None:
+    index = get_codebook_index(CODEBOOK_HTML)
+    assert index.outline() is index.outline()
+    extract_table_of_contents(index, hierarchy_depth="full")[0]["children"].clear()
+    assert extract_table_of_contents(index, hierarchy_depth="full")[0]["children"]
+
+
+def test_offset_index_slices_sections_like_a_full_parse(tmp_path) -> None:
+    offsets = cache_codebook_html("test_in", CODEBOOK_HTML, data_dir=str(tmp_path))
+    assert [h[:2] for h in offsets.headings] == [
+        ["T", "TITLE XV: LAND USAGE"], ["C", "154"], ["S", "154.001"], ["S", "154.040"],
+        ["S", "154.041"], ["C", "155"], ["S", "155.001"],
+    ]
+    for section_number in ["154.001", "154.040", "154.041", "155.001"]:
+        assert get_section_content(offsets, section_number) == get_section_content(CODEBOOK_HTML, section_number)
+    assert "error" in get_section_content(offsets, "154.999")
+
+    reloaded = SectionOffsetIndex.load(offsets.html_path)
+    assert reloaded.headings == offsets.headings
+    offsets.close()
+
+
+def test_grid_table_engine_matches_pandas_engine() -> None:
+    tables = [
+        load_html(CODEBOOK_HTML).find("table"),
+        "<table><thead><tr><th rowspan='2'>Zone</th><th colspan='2'>Setback (ft)</th></tr>"
+        "<tr><th>Front</th><th>Side</th></tr></thead>"
+        "<tbody><tr><td>R-1</td><td>1,000</td><td>7.5</td></tr>"
+        "<tr><td>R-2</td><td>25</td><td>N/A</td></tr>"
+        "<tr><td>R-2</td><td>25</td><td>N/A</td></tr></tbody></table>",
+        "<table><tr><td>Lot area</td><td>35</td><td>40.5</td></tr><tr><td>Height</td><td>-</td><td>3</td></tr></table>",
+    ]
+    for table in tables:
+        assert normalize_table(table) == normalize_table(table, engine="pandas")
+    assert "Dwelling, single-family" in normalize_table(tables[0])
+
+
+def test_table_formats_serialize_the_same_rows() -> None:
+    rows = [["Use", "R-1", "C-1"], ["Dwelling, single-family", "P", ""], ["Retail store", "", "P"]]
+    assert render_table_rows(rows, "pipe") == (
+        "|Use|R-1|C-1|\n|---|---|---|\n|Dwelling, single-family|P||\n|Retail store||P|"
+    )
+    assert render_table_rows(rows, "csv") == 'Use,R-1,C-1\n"Dwelling, single-family",P,\nRetail store,,P'
+    assert render_table_rows(rows, "zone_rows") == (
+        "Use | R-1 | C-1\nDwelling, single-family: R-1=P\nRetail store: C-1=P"
+    )
+    assert render_table_rows(None, "csv") is None
+
+
+def test_index_renders_each_table_format_from_one_extraction() -> None:
+    index = CodebookIndex(CODEBOOK_HTML)
+    pretty = get_section_content(index, "154.040")["content"]
+    pipe = get_section_content(index, "154.040", table_format="pipe")["content"]
+    assert "|Retail store||P|" in pipe and len(pipe) < len(pretty)
+    # Every format is rendered from the same extracted chunks
+    assert "Retail store: column 3=P" in get_section_content(index, "154.040", table_format="zone_rows")["content"]
+    assert get_section_content(index, "154.040")["content"] == pretty
+    streamed = {r["title"]: r.get("content") for r in iter_section_records(CODEBOOK_HTML, "lxml-stream", "csv")}
+    assert streamed["§ 154.040 PERMITTED USE TABLE."] == get_section_content(index, "154.040", table_format="csv")["content"]
+
+
+def test_extraction_pool_matches_in_process_extraction(tmp_path) -> None:
+    offsets = cache_codebook_html("test_in", CODEBOOK_HTML, data_dir=str(tmp_path))
+    numbers = ["154.001", "154.040", "154.041", "155.001", "154.999"]
+    with create_extraction_pool(offsets.html_path, workers=2) as pool:
+        batches = list(pool.map(extract_section_batch, [numbers[:2], numbers[2:]], ["pipe", "pipe"]))
+    contents = batches[0] + batches[1]
+    assert contents[:4] == [get_section_content(CODEBOOK_HTML, n, table_format="pipe") for n in numbers[:4]]
+    assert "error" in contents[4]
+
+
+def test_section_extraction_leaves_the_tree_untouched() -> None:
+    soup = load_html(CODEBOOK_HTML)
+    before = str(soup)
+    element, _ = find_section_element(soup, "154", "040")
+    first = extract_section_text(element)
+    assert str(soup) == before
+    assert extract_section_text(element) == first
+    assert first == get_section_content(CODEBOOK_HTML, "154.040")["content"]
+
+
+def test_tables_nested_in_tables_are_rendered_once() -> None:
+    html = CODEBOOK_HTML.replace(
+        "<td>Retail store</td>",
+        "<td>Retail store<table><tr><td>Grocery</td><td>P</td></tr><tr><td>Pharmacy</td><td>C</td></tr></table></td>",
+    )
+    content = get_section_content(html, "154.040")["content"]
+    assert content.count("Pharmacy") == 1
+    streamed = [r for r in iter_section_records(html, "lxml-stream") if r["type"] == "Section"]
+    assert streamed[1]["content"] == content
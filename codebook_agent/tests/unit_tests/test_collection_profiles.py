@@ -0,0 +1,34 @@
+import asyncio
+from types import SimpleNamespace
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import Distance, PointStruct
+
+from qdrant_wrapper.collection_profiles import COLLECTION_PROFILES, search_params_for
+
+
+def test_profiles_create_searchable_collections() -> None:
+    async def run():
+        client = AsyncQdrantClient(":memory:")
+        results = {}
+        for name, profile in COLLECTION_PROFILES.items():
+            await client.create_collection(name, **profile.collection_config(4, Distance.COSINE))
+            await client.upsert(name, points=[PointStruct(id=i, vector=[1.0, i, 0.0, 0.5], payload={}) for i in range(1, 6)])
+            # Local mode does not report quantization, so the config is passed in directly
+            config = profile.collection_config(4, Distance.COSINE)
+            params = search_params_for(SimpleNamespace(config=SimpleNamespace(
+                quantization_config=config.get("quantization_config")
+            )))
+            hits = (await client.query_points(name, query=[1.0, 5.0, 0.0, 0.5], limit=1, search_params=params)).points
+            results[name] = (params, hits[0].id)
+        return results
+
+    results = asyncio.run(run())
+    assert results["ram"] == (None, 5)
+    assert results["balanced"][0].quantization.rescore and results["balanced"][1] == 5
+    assert results["disk"][1] == 5
+
+
+def test_quantized_profiles_use_less_memory() -> None:
+    memory = {name: profile.memory_estimate(100_000, 1536) for name, profile in COLLECTION_PROFILES.items()}
+    assert memory["ram"] > 3 * memory["balanced"] > 3 * memory["disk"]
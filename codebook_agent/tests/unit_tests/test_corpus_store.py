@@ -0,0 +1,70 @@
+import asyncio
+
+from qdrant_client import AsyncQdrantClient
+
+from src.utils import corpus_store
+from src.utils.codebook_helpers import CodebookIndex, get_section_content
+from src.utils.corpus_store import CorpusStore, codebook_version
+from tests.unit_tests.test_codebook_helpers import CODEBOOK_HTML
+from tests.unit_tests.test_qdrant_ingestor import all_sections, make_ingestor, points_by_section
+
+
+def test_sections_round_trip_with_either_codec(tmp_path, monkeypatch) -> None:
+    index = CodebookIndex(CODEBOOK_HTML)
+    version = codebook_version(index.document_hash)
+    contents = [get_section_content(index, number) for number in ["154.040", "154.999"]]
+    with CorpusStore(str(tmp_path / "corpus.sqlite")) as store:
+        assert store.put_sections("test_in", version, "pretty", contents) == 1
+        with monkeypatch.context() as m:
+            m.setattr(corpus_store, "zstandard", None)
+            store.put_sections("test_in", version, "pipe", [get_section_content(index, "154.040", table_format="pipe")])
+
+        document = store.document("test_in")
+        assert document.version == version
+        assert get_section_content(document, "154.040") == contents[0]
+        assert get_section_content(document, "154.040", table_format="pipe")["content"].count("|") > 4
+        assert "error" in get_section_content(document, "154.001")
+        assert document.sections() == [{"chapterNumber": "154", "sectionNumber": "040", "sectionName": "PERMITTED USE TABLE."}]
+        assert store.document("other_in") is None
+
+
+def test_ingest_stores_sections_and_reingest_reads_them(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def run(store):
+        client = AsyncQdrantClient(":memory:")
+        index = CodebookIndex(CODEBOOK_HTML)
+        ingestor = make_ingestor(index, tmp_path, client)
+        ingestor.corpus_document = store.document("test_in", codebook_version(index.document_hash), "pretty")
+        await ingestor.create_empty_codebook()
+        await ingestor.process_all_sections(all_sections(CODEBOOK_HTML), get_section_content)
+        before = await points_by_section(client)
+
+        # Rebuild from the corpus alone: no HTML is involved
+        document = store.document("test_in")
+        await client.delete_collection("test_in")
+        rebuilt = make_ingestor(document, tmp_path, client)
+        rebuilt.corpus_document = document
+        await rebuilt.create_empty_codebook()
+        await rebuilt.process_all_sections(document.sections(), get_section_content)
+        return before, await points_by_section(client)
+
+    with CorpusStore(str(tmp_path / "corpus.sqlite")) as store:
+        before, after = asyncio.run(run(store))
+    assert sorted(before) == ["154.001", "154.040", "154.041", "155.001"]
+    assert {n: p["text"] for n, p in after.items()} == {n: p["text"] for n, p in before.items()}
+
+
+def test_sections_are_listed_in_numeric_order_for_the_current_extractor(tmp_path, monkeypatch) -> None:
+    contents = [
+        {"section_number": number, "section_title": number, "content": number}
+        for number in ["10.002", "9.010", "9.9", "10.001"]
+    ]
+    with CorpusStore(str(tmp_path / "corpus.sqlite")) as store:
+        store.put_sections("test_in", codebook_version("a" * 64), "pretty", contents)
+        listed = [f"{s['chapterNumber']}.{s['sectionNumber']}" for s in store.document("test_in").sections()]
+        assert listed == ["9.9", "9.010", "10.001", "10.002"]
+
+        # Text stored by an older extractor is not served once the extractor changes
+        monkeypatch.setattr(corpus_store, "SECTION_EXTRACTOR_VERSION", 2)
+        assert store.document("test_in") is None
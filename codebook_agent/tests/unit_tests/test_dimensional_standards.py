@@ -0,0 +1,84 @@
+import asyncio
+import importlib
+from functools import partial
+
+from agent_graphs.configurations import QuerierConfiguration
+from src.utils.codebook_helpers import CodebookIndex
+from src.utils.dimensional_standards import (
+    DimensionalStandardStore,
+    extract_dimensional_standards,
+    parse_standard_value,
+)
+
+# agent_graphs re-exports the compiled graph under the module's name
+querier_graph = importlib.import_module("agent_graphs.querier_graph")
+
+STANDARDS_HTML = """
+<div class="Section toc-destination rbox">§ 154.050 DEVELOPMENT STANDARDS.</div>
+<div class="para"><table>
+  <tr><th>Standard</th><th>R-1</th><th>C-1</th></tr>
+  <tr><td colspan="3">Minimum Setbacks</td></tr>
+  <tr><td>Front</td><td>30 ft.</td><td>10'</td></tr>
+  <tr><td>Side</td><td>8</td><td>0 (a)</td></tr>
+  <tr><td>Maximum Height</td><td>35 ft. or 2.5 stories</td><td>3 stories</td></tr>
+  <tr><td>Maximum Lot Coverage</td><td>30%</td><td>60</td></tr>
+</table></div>
+<div class="Section toc-destination rbox">§ 154.051 LOT STANDARDS.</div>
+<div class="para"><table>
+  <tr><th rowspan="2">District</th><th colspan="2">Minimum Lot</th><th>Minimum Yards (feet)</th></tr>
+  <tr><th>Area</th><th>Width</th><th>Front</th></tr>
+  <tr><td>R-1</td><td>1 acre</td><td>100</td><td>40</td></tr>
+  <tr><td>R-2</td><td>7,500 sf</td><td>60</td><td>25</td></tr>
+</table></div>
+"""
+
+
+def test_standards_are_read_from_both_table_orientations() -> None:
+    standards = {
+        (query_type, zone): (value, unit, confidence)
+        for query_type, zone, value, unit, confidence, *_ in extract_dimensional_standards(CodebookIndex(STANDARDS_HTML))
+    }
+    assert standards[("front_setback", "C-1")] == (10.0, "feet", 1.0)
+    assert standards[("side_yard_setback", "R-1")] == (8.0, "feet", 0.9)
+    assert standards[("maximum_lot_coverage", "C-1")] == (60.0, "percent", 0.9)
+    assert standards[("lot_size", "R-1")] == (1.0, "acres", 1.0)
+    assert standards[("lot_size", "R-2")] == (7500.0, "square feet", 1.0)
+    assert standards[("front_setback", "R-2")] == (25.0, "feet", 1.0)
+    assert standards[("maximum_building_height", "R-1")][2] < 0.8
+    assert standards[("maximum_building_height", "C-1")][2] < 0.8
+
+
+def test_parse_standard_value_takes_units_from_the_label() -> None:
+    assert parse_standard_value("10,000", "Minimum Lot Area (sq. ft.)", "lot_size") == (10000.0, "square feet", 1.0)
+    assert parse_standard_value("-", "Front yard", "front_setback") is None
+
+
+def test_querier_asks_the_llm_only_for_missing_or_uncertain_standards(tmp_path, monkeypatch) -> None:
+    path = str(tmp_path / "standards.sqlite")
+    with DimensionalStandardStore(path) as store:
+        store.replace_document("test_in", extract_dimensional_standards(CodebookIndex(STANDARDS_HTML)))
+        lookup = store.lookup("test_in", "r1", ["front_setback", "lot_width"])
+        assert lookup["front_setback"]["confidence"] == 0.5  # 30 feet and 40 feet in two tables
+        assert lookup["lot_width"]["value"] == 100.0
+
+    asked = []
+
+    class FakeRetriever:
+        def __init__(self, document_id, expand_references=False):
+            pass
+
+        async def initialize(self):
+            pass
+
+        async def execute_queries_in_parallel(self, questions, structured_output, zone_code=None):
+            asked.extend(questions)
+            return [{"answer": "llm", "section_list": [], "chunks": []} for _ in questions]
+
+    monkeypatch.setattr(querier_graph, "DimensionalStandardStore", partial(DimensionalStandardStore, path))
+    monkeypatch.setattr(querier_graph, "QdrantRetriever", FakeRetriever)
+    queries = {"maximum_lot_coverage": "coverage?", "front_setback": "front?", "density": "density?"}
+    results = asyncio.run(querier_graph.answer_standards_queries("test_in", "C-1", queries, QuerierConfiguration()))
+    assert list(results) == list(queries)
+    assert results["maximum_lot_coverage"] == {"answer": "60%", "section_list": ["154.050"], "chunks": []}
+    assert results["front_setback"]["answer"] == "10 feet"
+    assert asked == ["density?"]
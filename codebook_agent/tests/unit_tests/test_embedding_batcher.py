@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from qdrant_wrapper.embedding_batcher import EmbeddingBatcher
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.requests = []
+
+    async def aembed_documents(self, texts):
+        self.requests.append(list(texts))
+        await asyncio.sleep(0)
+        return [[float(len(text))] for text in texts]
+
+
+def test_batcher_coalesces_sections_and_routes_vectors() -> None:
+    embeddings = CountingEmbeddings()
+
+    async def run():
+        batcher = EmbeddingBatcher(embeddings, max_items=16, linger=0.01)
+        sections = [["x" * (i + 1), "y" * (i + 100)] for i in range(20)]
+        results = await asyncio.gather(*[batcher.embed(texts) for texts in sections])
+        return sections, results
+
+    sections, results = asyncio.run(run())
+    assert [len(request) for request in embeddings.requests] == [16, 16, 8]
+    for texts, vectors in zip(sections, results):
+        assert vectors == [[float(len(text))] for text in texts]
+
+
+def test_batcher_respects_token_budget() -> None:
+    embeddings = CountingEmbeddings()
+
+    async def run():
+        batcher = EmbeddingBatcher(embeddings, max_tokens=100, linger=0.01)
+        return await batcher.embed(["a" * 150, "b" * 150, "c" * 150])
+
+    assert len(asyncio.run(run())) == 3
+    assert [len(request) for request in embeddings.requests] == [1, 1, 1]
+
+
+def test_batcher_does_not_retry_request_errors() -> None:
+    class RejectingEmbeddings(CountingEmbeddings):
+        async def aembed_documents(self, texts):
+            self.requests.append(list(texts))
+            raise ValueError("invalid input")
+
+    embeddings = RejectingEmbeddings()
+
+    async def run():
+        batcher = EmbeddingBatcher(embeddings, linger=0.01)
+        with pytest.raises(ValueError, match="invalid input"):
+            await batcher.embed(["a", "b"])
+
+    asyncio.run(run())
+    assert len(embeddings.requests) == 1
@@ -0,0 +1,56 @@
+import asyncio
+
+from src.utils.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbeddings:
+    model = "test-model"
+
+    def __init__(self):
+        self.embedded = []
+
+    async def aembed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 0.5] for text in texts]
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 0.5] for text in texts]
+
+
+def test_cached_embeddings_only_embed_misses() -> None:
+    inner = CountingEmbeddings()
+    embeddings = CachedEmbeddings(inner, EmbeddingCache(":memory:"))
+
+    first = asyncio.run(embeddings.aembed_documents(["a", "bb", "a"]))
+    second = asyncio.run(embeddings.aembed_documents(["bb", "ccc"]))
+
+    assert first == [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]]
+    assert second == [[2.0, 0.5], [3.0, 0.5]]
+    assert embeddings.embed_query("ccc") == [3.0, 0.5]
+    assert inner.embedded == ["a", "bb", "ccc"]
+    assert embeddings.cache.stats() == {"hits": 2, "misses": 4}
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    cache = EmbeddingCache(":memory:", max_entries=2)
+    cache.put_many("m", ["old"], [[1.0]])
+    cache.put_many("m", ["newer"], [[2.0]])
+    cache.get_many("m", ["old"])
+    cache.put_many("m", ["newest"], [[3.0]])
+
+    assert len(cache) == 2
+    assert sorted(cache.get_many("m", ["old", "newer", "newest"]).values()) == [[1.0], [3.0]]
+    assert cache.get_many("other-model", ["old"]) == {}
+
+
+def test_cache_row_count_follows_replacements_and_evictions() -> None:
+    cache = EmbeddingCache(":memory:", max_entries=3)
+    cache.put_many("m", ["a", "b"], [[1.0], [2.0]])
+    cache.put_many("m", ["b", "c"], [[2.5], [3.0]])
+    assert len(cache) == cache._rows == 3
+    cache.put_many("m", ["d", "e"], [[4.0], [5.0]])
+
+    assert len(cache) == cache._rows == 3
+    found = cache.get_many("m", ["a", "b", "c", "d", "e"])
+    assert len(found) == 3 and [[4.0], [5.0]] == sorted(found.values())[1:]
@@ -0,0 +1,36 @@
+from src.utils.codebook_helpers import CodebookIndex
+from src.utils.permitted_uses import (
+    PermittedUseStore,
+    extract_permitted_use_triples,
+    permitted_uses_answer,
+    use_table_triples,
+)
+from tests.unit_tests.test_codebook_helpers import CODEBOOK_HTML
+
+
+def test_use_tables_become_triples() -> None:
+    triples = extract_permitted_use_triples(CodebookIndex(CODEBOOK_HTML))
+    assert triples == [
+        ("Dwelling, single-family", "R-1", "P", "154.040"),
+        ("Retail store", "C-1", "P", "154.040"),
+    ]
+
+
+def test_tables_without_markers_are_not_use_tables() -> None:
+    standards = [["Standard", "R-1", "C-1"], ["Minimum lot area", "10,000", "5,000"], ["Maximum height", "35", "45"]]
+    assert use_table_triples(standards) == []
+    assert use_table_triples([["Use", "Notes"], ["Retail", "P"]]) == []
+
+
+def test_store_lookup_answers_by_zone(tmp_path) -> None:
+    triples = extract_permitted_use_triples(CodebookIndex(CODEBOOK_HTML))
+    with PermittedUseStore(str(tmp_path / "permitted_uses.sqlite")) as store:
+        assert store.replace_document("test_in", triples) == 2
+        assert store.replace_document("test_in", triples) == 2
+        rows = store.lookup("test_in", "r1")
+        assert rows == [{"use": "Dwelling, single-family", "zone_code": "R-1", "value": "P", "section": "154.040"}]
+        assert store.lookup("test_in", "PUD") == []
+        assert store.lookup("other_in", "R-1") == []
+    assert permitted_uses_answer(rows, "R-1") == {
+        "answer": "Dwelling, single-family (P)", "section_list": ["154.040"], "chunks": []
+    }
@@ -0,0 +1,250 @@
+import asyncio
+
+import pytest
+
+from qdrant_client import AsyncQdrantClient
+
+from qdrant_wrapper.qdrant_base import DocumentStatus
+from qdrant_wrapper.qdrant_ingestor import QdrantIngestor
+from src.utils.codebook_helpers import extract_table_of_contents, get_section_content
+from tests.unit_tests.test_codebook_helpers import CODEBOOK_HTML
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.embedded = []
+
+    async def aembed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[1.0] + [0.0] * 1535 for _ in texts]
+
+
+def make_ingestor(html, tmp_path, client=None):
+    ingestor = QdrantIngestor("test_in", html, data_dir=str(tmp_path))
+    ingestor.async_client = client or AsyncQdrantClient(":memory:")
+    ingestor.embeddings = FakeEmbeddings()
+    return ingestor
+
+
+def all_sections(html):
+    sections = []
+    for chapter in ["154", "155"]:
+        chapter_sections = extract_table_of_contents(html, target_chapter=chapter)
+        if isinstance(chapter_sections, list):
+            sections.extend(chapter_sections)
+    return sections
+
+
+async def points_by_section(client):
+    points, _ = await client.scroll("test_in", limit=100, with_payload=True)
+    return {f"{p.payload['chapter_number']}.{p.payload['section_number']}": p.payload for p in points}
+
+
+def test_sync_reembeds_only_changed_sections(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def run():
+        ingestor = make_ingestor(CODEBOOK_HTML, tmp_path)
+        await ingestor.create_empty_codebook()
+        await ingestor.process_all_sections(all_sections(CODEBOOK_HTML), get_section_content)
+        before = await points_by_section(ingestor.async_client)
+        assert all(payload["content_hash"] for payload in before.values())
+        assert before["154.041"]["references"] == ["154.040"]
+        assert ingestor.manifest["154.041"]["references"] == ["154.040"]
+
+        amended = CODEBOOK_HTML.replace("known as the Zoning Code", "known as the Unified Development Code")
+        amended = amended[:amended.index('<div class="Section toc-destination rbox">§ 155.001')] + "</body></html>"
+        updated = make_ingestor(amended, tmp_path, ingestor.async_client)
+        stats = await updated.sync_sections(all_sections(amended), get_section_content)
+
+        # Without a local manifest the section hashes are read back from the payloads
+        (tmp_path / "manifests" / "test_in.json").unlink()
+        resynced = make_ingestor(amended, tmp_path, ingestor.async_client)
+        restats = await resynced.sync_sections(all_sections(amended), get_section_content)
+        assert restats == {"added": 0, "changed": 0, "removed": 0, "unchanged": 3, "chunks": 0}
+        return before, stats, updated.embeddings.embedded, await points_by_section(ingestor.async_client)
+
+    before, stats, embedded, after = asyncio.run(run())
+    assert stats == {"added": 0, "changed": 1, "removed": 1, "unchanged": 2, "chunks": 1}
+    assert len(embedded) == 1 and "Unified Development Code" in embedded[0]
+    assert sorted(after) == ["154.001", "154.040", "154.041"]
+    assert after["154.040"] == before["154.040"]
+    assert after["154.001"]["content_hash"] != before["154.001"]["content_hash"]
+
+
+def test_pipeline_reports_every_stage(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def run():
+        ingestor = make_ingestor(CODEBOOK_HTML, tmp_path)
+        await ingestor.create_empty_codebook()
+        pipeline = ingestor.ingest_pipeline(get_section_content)
+        pipeline.queue_size = 1
+        chunks = await pipeline.run(all_sections(CODEBOOK_HTML))
+        count = await ingestor.async_client.count("test_in")
+        return pipeline, chunks, count.count
+
+    pipeline, chunks, count = asyncio.run(run())
+    sections = len(all_sections(CODEBOOK_HTML))
+    assert chunks == count == sections
+    assert pipeline.stats["extract"].items_out == sections
+    assert [pipeline.stats[stage].items_in for stage in ["split", "embed", "upsert"]] == [sections] * 3
+    assert not any(stats.errors for stats in pipeline.stats.values())
+
+
+def test_pipeline_raises_when_a_section_fails(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    class FailingEmbeddings(FakeEmbeddings):
+        async def aembed_documents(self, texts):
+            if any("154.040" in text for text in texts):
+                raise ValueError("embedding request failed")
+            return await super().aembed_documents(texts)
+
+    async def run():
+        ingestor = make_ingestor(CODEBOOK_HTML, tmp_path)
+        ingestor.embeddings = FailingEmbeddings()
+        await ingestor.create_empty_codebook()
+        with pytest.raises(RuntimeError, match="failed in the ingest pipeline"):
+            await ingestor.process_all_sections(all_sections(CODEBOOK_HTML), get_section_content)
+        # The extractor graph resumes the ingest instead of treating the codebook as done
+        assert ingestor.ingest_unfinished("test_in")
+
+        ingestor.embeddings = FakeEmbeddings()
+        ingestor._embedding_batcher = None
+        await ingestor.process_all_sections(all_sections(CODEBOOK_HTML), get_section_content)
+        assert not ingestor.ingest_unfinished("test_in")
+
+    asyncio.run(run())
+def test_reingest_skips_existing_points(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def run():
+        ingestor = make_ingestor(CODEBOOK_HTML, tmp_path)
+        await ingestor.create_empty_codebook()
+        sections = all_sections(CODEBOOK_HTML)
+        await ingestor.process_all_sections(sections[:2], get_section_content)
+        # A plain re-run overwrites the same points instead of adding duplicates
+        await ingestor.process_all_sections(sections[:2], get_section_content)
+        first_count = (await ingestor.async_client.count("test_in")).count
+
+        resumed = make_ingestor(CODEBOOK_HTML, tmp_path, ingestor.async_client)
+        resumed.skip_existing = True
+        chunks = await resumed.process_all_sections(sections, get_section_content)
+        return first_count, chunks, resumed, (await ingestor.async_client.count("test_in")).count
+
+    first_count, chunks, resumed, count = asyncio.run(run())
+    sections = len(all_sections(CODEBOOK_HTML))
+    assert first_count == 2
+    assert chunks == sections - 2 and resumed.skipped_chunks == 2
+    assert len(resumed.embeddings.embedded) == sections - 2
+    assert count == sections
+
+
+def test_shared_collection_keeps_documents_apart(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    def shared_ingestor(document_id, html, client):
+        ingestor = QdrantIngestor(document_id, html, data_dir=str(tmp_path))
+        ingestor.async_client = client
+        ingestor.embeddings = FakeEmbeddings()
+        ingestor.shared_collection = "codebooks"
+        return ingestor
+
+    async def run():
+        client = AsyncQdrantClient(":memory:")
+        for document_id in ["test_in", "other_in"]:
+            ingestor = shared_ingestor(document_id, CODEBOOK_HTML, client)
+            assert await ingestor.create_empty_codebook()
+            await ingestor.process_all_sections(all_sections(CODEBOOK_HTML), get_section_content)
+
+        amended = CODEBOOK_HTML[:CODEBOOK_HTML.index('<div class="Section toc-destination rbox">§ 155.001')] + "</body></html>"
+        updated = shared_ingestor("test_in", amended, client)
+        stats = await updated.sync_sections(all_sections(amended), get_section_content)
+        (tmp_path / "manifests" / "other_in.json").unlink()
+        other = await shared_ingestor("other_in", CODEBOOK_HTML, client).indexed_sections()
+        collections = [c.name for c in (await client.get_collections()).collections]
+        new_status = await shared_ingestor("new_in", CODEBOOK_HTML, client).document_exists_and_is_indexed("new_in")
+        counts = {
+            document_id: (await client.count("codebooks", count_filter=updated.scoped_filter(document_id))).count
+            for document_id in ["test_in", "other_in"]
+        }
+        return stats, sorted(other), collections, counts, new_status
+
+    stats, other, collections, counts, new_status = asyncio.run(run())
+    assert new_status is DocumentStatus.NOT_EXISTS
+    sections = len(all_sections(CODEBOOK_HTML))
+    assert collections == ["codebooks"]
+    assert stats["removed"] == 1 and stats["chunks"] == 0
+    assert len(other) == sections
+    assert counts == {"test_in": sections - 1, "other_in": sections}
+
+
+def test_sync_repairs_failed_sections_and_cleared_collections(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from qdrant_wrapper.qdrant_rechunk import QdrantRechunk
+
+    class FailingEmbeddings(FakeEmbeddings):
+        async def aembed_documents(self, texts):
+            if any("PERMITTED USE TABLE" in text for text in texts):
+                raise ValueError("embedding request failed")
+            return await super().aembed_documents(texts)
+
+    async def run():
+        ingestor = make_ingestor(CODEBOOK_HTML, tmp_path)
+        ingestor.embeddings = FailingEmbeddings()
+        ingestor.embedding_batcher.max_items = 1
+        await ingestor.create_empty_codebook()
+        with pytest.raises(RuntimeError):
+            await ingestor.process_all_sections(all_sections(CODEBOOK_HTML), get_section_content)
+        failed_manifest = sorted(ingestor.load_manifest())
+
+        repaired = make_ingestor(CODEBOOK_HTML, tmp_path, ingestor.async_client)
+        stats = await repaired.sync_sections(all_sections(CODEBOOK_HTML), get_section_content)
+        repaired_count = (await ingestor.async_client.count("test_in")).count
+
+        rechunk = QdrantRechunk()
+        rechunk.async_client = ingestor.async_client
+        rechunk.data_dir = str(tmp_path)
+        assert await rechunk.clear_collection_points("test_in")
+        resynced = make_ingestor(CODEBOOK_HTML, tmp_path, ingestor.async_client)
+        restats = await resynced.sync_sections(all_sections(CODEBOOK_HTML), get_section_content)
+        return failed_manifest, stats, repaired_count, restats, (await ingestor.async_client.count("test_in")).count
+
+    failed_manifest, stats, repaired_count, restats, count = asyncio.run(run())
+    sections = len(all_sections(CODEBOOK_HTML))
+    assert "154.040" not in failed_manifest and len(failed_manifest) == sections - 1
+    assert stats["added"] == 1 and stats["unchanged"] == sections - 1
+    assert repaired_count == count == sections
+    assert restats["added"] == sections
+
+
+def test_clear_and_purge_all_reach_legacy_collections_in_shared_mode(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from qdrant_wrapper.qdrant_rechunk import QdrantRechunk
+
+    async def run():
+        client = AsyncQdrantClient(":memory:")
+        for document_id, shared_collection in [("legacy_in", None), ("test_in", "codebooks")]:
+            ingestor = QdrantIngestor(document_id, CODEBOOK_HTML, data_dir=str(tmp_path))
+            ingestor.async_client = client
+            ingestor.embeddings = FakeEmbeddings()
+            ingestor.shared_collection = shared_collection
+            assert await ingestor.create_empty_codebook()
+            await ingestor.process_all_sections(all_sections(CODEBOOK_HTML), get_section_content)
+
+        rechunk = QdrantRechunk()
+        rechunk.async_client = client
+        rechunk.shared_collection = "codebooks"
+        rechunk.data_dir = str(tmp_path)
+        cleared = await rechunk.clear_all_collection_points()
+        counts = {name: (await client.count(name)).count for name in ["legacy_in", "codebooks"]}
+        manifests = sorted(p.name for p in (tmp_path / "manifests").glob("*.json"))
+        purged = await rechunk.purge_all_collections()
+        collections = [c.name for c in (await client.get_collections()).collections]
+        return cleared, counts, manifests, purged, collections
+
+    cleared, counts, manifests, purged, collections = asyncio.run(run())
+    assert cleared and counts == {"legacy_in": 0, "codebooks": 0}
+    assert manifests == []
+    assert purged and collections == []
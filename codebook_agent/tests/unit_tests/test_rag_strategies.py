@@ -0,0 +1,78 @@
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from qdrant_wrapper.rag_strategies import SectionBasedRetrieval
+from src.utils.codebook_helpers import section_references
+
+
+class FakeRetriever:
+    def __init__(self, hits):
+        self.hits = hits
+
+    def invoke(self, query, **kwargs):
+        return self.hits
+
+
+def make_client():
+    client = QdrantClient(":memory:")
+    client.create_collection("test_in", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    payloads = [
+        {"chapter_number": "154", "section_number": "041", "references": ["154.040", "154.999"], "text": "See § 154.040."},
+        {"chapter_number": "154", "section_number": "040", "references": [], "text": "Permitted use table"},
+        {"chapter_number": "155", "section_number": "001", "references": [], "text": "Purpose"},
+    ]
+    client.upsert("test_in", [PointStruct(id=i, vector=[1.0, 0.0], payload=p) for i, p in enumerate(payloads, start=1)])
+    return client
+
+
+def test_section_references_skip_the_own_section() -> None:
+    text = "§ 154.041 STANDARDS. See § 154.040(B) and §§ 154.030 through 154.032."
+    assert section_references(text, "154.041") == ["154.030", "154.032", "154.040"]
+
+
+def test_expansion_adds_cited_sections_by_payload_lookup() -> None:
+    client = make_client()
+    hits = FakeRetriever([Document(page_content="See § 154.040.", metadata={"_id": 1})])
+
+    plain = SectionBasedRetrieval(client, "test_in").retrieve(hits, "standards")
+    assert plain["section_list"] == ["154.041"]
+
+    expanded = SectionBasedRetrieval(client, "test_in", expand_references=True).retrieve(hits, "standards")
+    assert expanded["section_list"] == ["154.040", "154.041"]
+    assert "Permitted use table" in expanded["raw_content"]
+    assert "Purpose" not in expanded["raw_content"]
+
+
+def test_zone_search_falls_back_to_unfiltered_when_empty() -> None:
+    class ZoneRetriever:
+        def __init__(self):
+            self.filters = []
+
+        def invoke(self, query, **kwargs):
+            self.filters.append(kwargs.get("filter"))
+            if kwargs.get("filter") is not None:
+                return []
+            return [Document(page_content="Permitted use table", metadata={"_id": 2})]
+
+    retriever = ZoneRetriever()
+    result = SectionBasedRetrieval(make_client(), "test_in").retrieve(retriever, "uses", zone_code="AG-9")
+    assert retriever.filters[0] is not None and retriever.filters[1] is None
+    assert result["section_list"] == ["154.040"]
+
+
+def test_expansion_keeps_the_most_cited_sections() -> None:
+    client = make_client()
+    client.upsert("test_in", [
+        PointStruct(id=4, vector=[1.0, 0.0], payload={
+            "chapter_number": "154", "section_number": "050", "references": ["155.001", "154.040"], "text": "See § 155.001."
+        }),
+    ])
+    hits = FakeRetriever([
+        Document(page_content="See § 155.001.", metadata={"_id": 4}),
+        Document(page_content="See § 154.040.", metadata={"_id": 1}),
+    ])
+
+    expanded = SectionBasedRetrieval(client, "test_in", expand_references=True, reference_limit=1).retrieve(hits, "standards")
+    assert expanded["section_list"] == ["154.040", "154.041", "154.050"]
+    assert "Purpose" not in expanded["raw_content"]
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+from bs4 import BeautifulSoup
+
+from src.utils.codebook_helpers import parse_table
+from src.utils.table_store import TableStore, open_table_store
+
+TABLE_HTML = """
+<table>
+  <tr><th>Zone</th><th>Max Height</th></tr>
+  <tr><td>R-1</td><td>35 ft</td></tr>
+</table>
+"""
+
+
+def test_identical_tables_are_stored_once() -> None:
+    store = TableStore()
+    first = parse_table(BeautifulSoup(TABLE_HTML, "html.parser").table, store=store)
+    second = parse_table(BeautifulSoup(TABLE_HTML, "html.parser").table, store=store)
+    assert first["table_id"] == second["table_id"]
+    assert len(store) == 1
+    assert store.get(first["table_id"])["rows"][0]["Max Height"]["value"] == "35 ft"
+
+
+def test_persistent_stores_flush_in_batches_and_reload(tmp_path) -> None:
+    for filename in ["tables.jsonl", "tables.sqlite"]:
+        path = str(tmp_path / filename)
+        store = open_table_store(path, flush_batch_size=2)
+        keys = [store.put({"headers": [str(i)], "rows": []}) for i in range(3)]
+        store.put({"headers": ["0"], "rows": []})
+        # Two tables reached the batch size and were written; the third is still buffered
+        assert len(open_table_store(path)) == 2
+        store.close()
+
+        reopened = open_table_store(path)
+        assert len(reopened) == 3
+        assert reopened.get(keys[2]) == {"headers": ["2"], "rows": []}
+        # Flushed tables are read back from the file, not held in memory
+        assert not reopened._pending and not reopened._memory
+        reopened.close()
+
+
+def test_memory_store_is_bounded() -> None:
+    store = TableStore(flush_batch_size=1, max_tables=2)
+    keys = [store.put({"headers": [str(i)], "rows": []}) for i in range(3)]
+    assert len(store) == 2
+    assert store.get(keys[0]) is None and store.get(keys[2]) == {"headers": ["2"], "rows": []}
+
+
+def test_default_store_is_flushed_at_exit(tmp_path) -> None:
+    path = str(tmp_path / "tables.sqlite")
+    script = "from src.utils.table_store import get_default_table_store; get_default_table_store().put({'rows': []})"
+    subprocess.run([sys.executable, "-c", script], check=True, env={**os.environ, "TABLE_STORE_PATH": path})
+    assert len(open_table_store(path)) == 1
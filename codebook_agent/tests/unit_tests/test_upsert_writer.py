@@ -0,0 +1,25 @@
+import asyncio
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from qdrant_wrapper.upsert_writer import UpsertWriter, point_bytes
+
+
+def make_points(start, count):
+    return [PointStruct(id=i, vector=[1.0, 0.0], payload={"text": "x" * 100}) for i in range(start, start + count)]
+
+
+def test_writer_batches_by_bytes_and_flushes_every_point() -> None:
+    async def run():
+        client = AsyncQdrantClient(":memory:")
+        await client.create_collection("test_writer", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+        max_bytes = point_bytes(make_points(1, 1)[0]) * 3
+        writer = UpsertWriter(client, "test_writer", max_in_flight=2, wait=False, max_batch_bytes=max_bytes)
+        await asyncio.gather(*[writer.write(make_points(1 + 5 * i, 5)) for i in range(4)])
+        await writer.flush()
+        return writer, (await client.count("test_writer")).count
+
+    writer, count = asyncio.run(run())
+    assert count == writer.point_count == 20
+    assert writer.batch_count == 7
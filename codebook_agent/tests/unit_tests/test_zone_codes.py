@@ -0,0 +1,33 @@
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from qdrant_wrapper.rag_strategies import zone_filter
+from src.utils.codebook_helpers import load_html
+from src.utils.zone_codes import document_zone_codes, zone_code_matcher, zone_codes_in_text
+from tests.unit_tests.test_codebook_helpers import CODEBOOK_HTML
+
+
+def test_vocabulary_comes_from_table_headers_and_known_codes() -> None:
+    assert document_zone_codes(load_html(CODEBOOK_HTML), ["RR"]) == ["C-1", "R-1", "RR"]
+
+
+def test_mentions_are_whole_tokens_and_normalized() -> None:
+    matcher = zone_code_matcher(["R-1", "R-10", "C-1"])
+    text = "In the R-1 and R-10 districts (not R-100), see also C-1; r-1 is not a code."
+    assert zone_codes_in_text(text, matcher) == ["C1", "R1", "R10"]
+    assert zone_codes_in_text(text, zone_code_matcher([])) == []
+
+
+def test_mentions_match_other_spellings_of_a_code() -> None:
+    matcher = zone_code_matcher(["R-1", "C2A"])
+    text = "The R1 and R 1 districts, C-2A, and R-1A."
+    assert zone_codes_in_text(text, matcher) == ["C2A", "R1"]
+
+
+def test_zone_filter_keeps_matching_and_zone_agnostic_chunks() -> None:
+    client = QdrantClient(":memory:")
+    client.create_collection("test_in", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    payloads = [{"zone_codes": ["R1"]}, {"zone_codes": ["C1"]}, {"zone_codes": []}, {}]
+    client.upsert("test_in", [PointStruct(id=i, vector=[1.0, 0.0], payload=p) for i, p in enumerate(payloads)])
+    points, _ = client.scroll("test_in", scroll_filter=zone_filter("R-1"), limit=10)
+    assert sorted(point.id for point in points) == [0, 2, 3]